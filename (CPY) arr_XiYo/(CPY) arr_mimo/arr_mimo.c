@@ -3,6 +3,9 @@
 /* Header file */
 #include "arr_mimo.h"
 
+/* Buffer protocol inputs and outputs (lists are the slow path) */
+#include "pybuffer.h"
+
 // <function input_2x_PyList1D__output_2x_PyList1D(PyObject* list1,
 //		PyObject* list2)>
 // 	@argument <PyObject* list1> : input Python list (C API)
@@ -12,7 +15,8 @@
 //		Python list with two lists inside (C API)
 //
 // 	@description : Python list treatment of 2 input 1D lists with 2 new output
-//		1D lists
+//		1D lists, buffers of doubles (numpy arrays, array.array...) are read
+//		without copies and the outputs are new buffers
 //
 //	@name : input_2x_PyList1D__output_2x_PyList1D
 //		    |     |  |     |   |      |  |     |
@@ -31,57 +35,60 @@
 //
 PyObject* input_2x_PyList1D__output_2x_PyList1D(PyObject* list1, PyObject* list2) {
 
+	/* Inputs, buffers of doubles (without copies) or Python lists */
+	doubles input1, input2;
+	if (doubles_get(list1, 1, 0, &input1) != 0) return NULL;
+	if (doubles_get(list2, 1, 0, &input2) != 0) {
+		doubles_release(&input1);
+		return NULL;
+	}
+
 	/* Check list size */
-	int N1 = PyList_Size(list1);
-	int N2 = PyList_Size(list2);
+	int N1 = (int) input1.N;
+	int N2 = (int) input2.N;
 
 	/* Declare array */
-	double array1[N1];
-	double array2[N2];
-
-	/* Python list<float> to C double array */
-	for (int i = 0 ; i < N1 ; i++)
-		array1[i] = PyFloat_AsDouble(PyList_GetItem(list1, i));
-	for (int i = 0 ; i < N2 ; i++)
-		array2[i] = PyFloat_AsDouble(PyList_GetItem(list2, i));
-	/* End of Python list fill */
+	double* array1 = input1.data;
+	double* array2 = input2.data;
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* Declare output array */
-	double output1[N1];
-	double output2[N2];
+	/* Declare output arrays (new buffers, or lists for list inputs) */
+	doubles output1, output2;
+	PyObject* result1 = doubles_new(input1.list, 1, N1, 1, &output1);
+	PyObject* result2 = doubles_new(input2.list, 1, N2, 1, &output2);
+	if (result1 == NULL || result2 == NULL) {
+		Py_XDECREF(result1);
+		Py_XDECREF(result2);
+		doubles_release(&output1);
+		doubles_release(&output2);
+		doubles_release(&input1);
+		doubles_release(&input2);
+		return NULL;
+	}
 
 
 
 	// Do what you wanna do, for example, duplicate all values in the input list
 	for (int i = 0 ; i < N1 ; i++)
-		output1[i] = array1[i] * 2;
+		output1.data[i] = array1[i] * 2;
 
 	for (int i = 0 ; i < N2 ; i++)
-		output2[i] = array2[i] * 3;
+		output2.data[i] = array2[i] * 3;
 
 
 
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* C double array to Python list<float> */
-	// Output 1
-	PyObject* result1 = PyList_New(N1);
-    for (int i = 0; i < N1; i++)
-    	PyList_SetItem(result1, i, PyFloat_FromDouble(output1[i]));
-
-	// Output 2
-	PyObject* result2 = PyList_New(N2);
-    for (int i = 0; i < N2; i++)
-    	PyList_SetItem(result2, i, PyFloat_FromDouble(output2[i]));
+	/* Output buffers or Python lists */
+	doubles_release(&input1);
+	doubles_release(&input2);
 
 	// Final output
 	PyObject* result = PyTuple_New(2);
-	PyTuple_SetItem(result, 0, result1);
-	PyTuple_SetItem(result, 1, result2);
-	/* End of Python list fill */
+	PyTuple_SetItem(result, 0, doubles_result(result1, &output1));
+	PyTuple_SetItem(result, 1, doubles_result(result2, &output2));
 
     return result;
 }
@@ -95,7 +102,8 @@ PyObject* input_2x_PyList1D__output_2x_PyList1D(PyObject* list1, PyObject* list2
 //		Python list with two lists inside (C API)
 //
 // 	@description : Python list treatment of 2 input 1D lists with 2 new output
-//		2D lists
+//		2D lists, buffers of doubles (numpy arrays, array.array...) are read
+//		without copies and the outputs are new buffers
 //
 //	@name : input_2x_PyList2D__output_2x_PyList2D
 //		    |     |  |     |   |      |  |     |
@@ -114,48 +122,50 @@ PyObject* input_2x_PyList1D__output_2x_PyList1D(PyObject* list1, PyObject* list2
 //
 PyObject* input_2x_PyList2D__output_2x_PyList2D(PyObject* list1, PyObject* list2) {
 
+	/* Inputs, buffers of doubles (without copies) or Python lists */
+	doubles input1, input2;
+	if (doubles_get(list1, 2, 0, &input1) != 0) return NULL;
+	if (doubles_get(list2, 2, 0, &input2) != 0) {
+		doubles_release(&input1);
+		return NULL;
+	}
+
 	/* Check list size */
-	int N1 = PyList_Size(list1);
-	int M1 = PyList_Size(PyList_GetItem(list1, 0));
-	int N2 = PyList_Size(list2);
-	int M2 = PyList_Size(PyList_GetItem(list2, 0));
+	int N1 = (int) input1.N;
+	int M1 = (int) input1.M;
+	int N2 = (int) input2.N;
+	int M2 = (int) input2.M;
 
 	/* Declare array */
-	double array1[N1][M1];
-	PyObject* list1_i = PyList_New(M1);
-	double array2[N2][M2];
-	PyObject* list2_i = PyList_New(M2);
-
-	/* Python list<float> to C double array */
-	for (int i = 0 ; i < N1 ; i++) {
-		list1_i = PyList_GetItem(list1, i);
-		for (int j = 0 ; j < M1 ; j++)
-			array1[i][j] = PyFloat_AsDouble(PyList_GetItem(list1_i, j));
-
-	}
-	for (int i = 0 ; i < N2 ; i++) {
-		list2_i = PyList_GetItem(list2, i);
-		for (int j = 0 ; j < M2 ; j++)
-			array2[i][j] = PyFloat_AsDouble(PyList_GetItem(list2_i, j));
-	}
-	/* End of Python list fill */
+	double* array1 = input1.data;
+	double* array2 = input2.data;
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* Declare output array */
-	double output1[N1][M1];
-	double output2[N2][M2];
+	/* Declare output arrays (new buffers, or lists for list inputs) */
+	doubles output1, output2;
+	PyObject* result1 = doubles_new(input1.list, 2, N1, M1, &output1);
+	PyObject* result2 = doubles_new(input2.list, 2, N2, M2, &output2);
+	if (result1 == NULL || result2 == NULL) {
+		Py_XDECREF(result1);
+		Py_XDECREF(result2);
+		doubles_release(&output1);
+		doubles_release(&output2);
+		doubles_release(&input1);
+		doubles_release(&input2);
+		return NULL;
+	}
 
 
 
 	// Do what you wanna do, for example, duplicate all values in the input list
 	for (int i = 0 ; i < N1 ; i++) {
 		for (int j = 0 ; j < M1 ; j++)
-			output1[i][j] = 2 * array1[i][j];
+			output1.data[i*M1+j] = 2 * array1[i*M1+j];
 	}
 	for (int i = 0 ; i < N2 ; i++) {
 		for (int j = 0 ; j < M2 ; j++)
-			output2[i][j] = 3 * array2[i][j];
+			output2.data[i*M2+j] = 3 * array2[i*M2+j];
 	}
 
 
@@ -164,30 +174,14 @@ PyObject* input_2x_PyList2D__output_2x_PyList2D(PyObject* list1, PyObject* list2
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* C double array to Python list<float> */
-	// Output 1
-	PyObject* result1 = PyList_New(N1);
-	for (int i = 0 ; i < N1 ; i++) {
-		PyObject* result1_i = PyList_New(M1);
-		for (int j = 0 ; j < M1 ; j++)
-			PyList_SetItem(result1_i, j, PyFloat_FromDouble(output1[i][j]));
-		PyList_SetItem(result1, i, result1_i);
-	}
-
-	// Output 2
-	PyObject* result2 = PyList_New(N2);
-	for (int i = 0 ; i < N2 ; i++) {
-		PyObject* result2_i = PyList_New(M2);
-		for (int j = 0 ; j < M2 ; j++)
-			PyList_SetItem(result2_i, j, PyFloat_FromDouble(output2[i][j]));
-		PyList_SetItem(result2, i, result2_i);
-	}
+	/* Output buffers or Python lists */
+	doubles_release(&input1);
+	doubles_release(&input2);
 
 	// Final output
 	PyObject* result = PyTuple_New(2);
-	PyTuple_SetItem(result, 0, result1);
-	PyTuple_SetItem(result, 1, result2);
-	/* End of Python list fill */
+	PyTuple_SetItem(result, 0, doubles_result(result1, &output1));
+	PyTuple_SetItem(result, 1, doubles_result(result2, &output2));
 
     return result;
 }
@@ -6,6 +6,9 @@
 /* Python C API */
 #include <Python.h>
 
+/* Buffer protocol inputs and outputs (lists are the slow path) */
+#include "pybuffer.h"
+
 
 // <function input_2x_PyList1D__output_1x_PyList1D(PyObject* list)>
 // 	@argument <PyObject* list1> : input Python list 1 (C API)
@@ -13,7 +16,9 @@
 //
 //	@returns <PyObject* list> : output Python list (C API)
 //
-// 	@description : Python list treatment of 1 input list with 1 new output list
+// 	@description : Python list treatment of 1 input list with 1 new output list,
+//		buffers of doubles (numpy arrays, array.array...) are read without
+//		copies and the output is a new buffer
 //
 //	@name : input_2x_PyList1D__output_1x_PyList1D
 //		    |     |  |       |      |  |
@@ -30,47 +35,53 @@
 //
 PyObject* input_2x_PyList1D__output_1x_PyList1D(PyObject* list1, PyObject* list2) {
 
-	/* Check if list is a PyList_Type */
-	if (!PyList_Check(list1)) return NULL;
-	if (!PyList_Check(list2)) return NULL;
+	/* Check if list is a PyList_Type or a buffer */
+	if (!PyList_Check(list1) && !PyObject_CheckBuffer(list1)) return NULL;
+	if (!PyList_Check(list2) && !PyObject_CheckBuffer(list2)) return NULL;
+
+	/* Inputs, buffers of doubles (without copies) or Python list<float> */
+	doubles input1, input2;
+	if (doubles_get(list1, 1, 0, &input1) != 0) return NULL;
+	if (doubles_get(list2, 1, 0, &input2) != 0) {
+		doubles_release(&input1);
+		return NULL;
+	}
 
 	/* Check list size */
-	int N1 = PyList_Size(list1);
-	int N2 = PyList_Size(list2);
+	int N1 = (int) input1.N;
+	int N2 = (int) input2.N;
 
 	/* Declare arrays */
-	double array1[N1];
-	double array2[N2];
-
-	/* Python list<float> to C double array */
-	for (int i = 0 ; i < N1 ; i++)
-		array1[i] = PyFloat_AsDouble(PyList_GetItem(list1, (Py_ssize_t) i));
-	for (int i = 0 ; i < N2 ; i++)
-		array2[i] = PyFloat_AsDouble(PyList_GetItem(list2, (Py_ssize_t) i));
-	/* End of Python list fill */
+	double* array1 = input1.data;
+	double* array2 = input2.data;
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* Declare output array */
-	double output[N1];
+	/* Declare output array (a new buffer, or a list for list inputs) */
+	doubles output;
+	PyObject* result = doubles_new(input1.list, 1, N1, 1, &output);
+	if (result == NULL || N2 < N1) {
+		if (result != NULL) PyErr_SetString(PyExc_ValueError, "Inputs of different lengths");
+		Py_XDECREF(result);
+		doubles_release(&output);
+		doubles_release(&input1);
+		doubles_release(&input2);
+		return NULL;
+	}
 
 	// Do what you wanna do, for example, dot multiplication
 	for (int i = 0 ; i < N1 ; i++)
-		output[i] = array1[i] * array2[i];
+		output.data[i] = array1[i] * array2[i];
 
 
 
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* C double array to Python list<float> */
-	PyObject* result = PyList_New(N1);
-
-    for (int i = 0; i < N1; i++)
-    	PyList_SetItem(result, i, PyFloat_FromDouble(output[i]));
-	/* End of Python list fill */
-
-    return result;
+	/* Output buffer or Python list<float> */
+	doubles_release(&input1);
+	doubles_release(&input2);
+	return doubles_result(result, &output);
 }
 
 // <function input_3x_PyList1D__output_1x_PyList1D(PyObject* list)>
@@ -80,7 +91,9 @@ PyObject* input_2x_PyList1D__output_1x_PyList1D(PyObject* list1, PyObject* list2
 //
 //	@returns <PyObject* list> : output Python list (C API)
 //
-// 	@description : Python list treatment of 1 input list with 1 new output list
+// 	@description : Python list treatment of 1 input list with 1 new output list,
+//		buffers of doubles (numpy arrays, array.array...) are read without
+//		copies and the output is a new buffer
 //
 //	@name : input_3x_PyList1D__output_1x_PyList1D
 //		    |     |  |       |      |  |
@@ -97,52 +110,63 @@ PyObject* input_2x_PyList1D__output_1x_PyList1D(PyObject* list1, PyObject* list2
 //
 PyObject* input_3x_PyList1D__output_1x_PyList1D(PyObject* list1, PyObject* list2, PyObject* list3) {
 
-	/* Check if list is a PyList_Type */
-	if (!PyList_Check(list1)) return NULL;
-	if (!PyList_Check(list2)) return NULL;
-	if (!PyList_Check(list3)) return NULL;
+	/* Check if list is a PyList_Type or a buffer */
+	if (!PyList_Check(list1) && !PyObject_CheckBuffer(list1)) return NULL;
+	if (!PyList_Check(list2) && !PyObject_CheckBuffer(list2)) return NULL;
+	if (!PyList_Check(list3) && !PyObject_CheckBuffer(list3)) return NULL;
+
+	/* Inputs, buffers of doubles (without copies) or Python list<float> */
+	doubles input1, input2, input3;
+	if (doubles_get(list1, 1, 0, &input1) != 0) return NULL;
+	if (doubles_get(list2, 1, 0, &input2) != 0) {
+		doubles_release(&input1);
+		return NULL;
+	}
+	if (doubles_get(list3, 1, 0, &input3) != 0) {
+		doubles_release(&input1);
+		doubles_release(&input2);
+		return NULL;
+	}
 
 	/* Check list size */
-	int N1 = PyList_Size(list1);
-	int N2 = PyList_Size(list2);
-	int N3 = PyList_Size(list3);
+	int N1 = (int) input1.N;
+	int N2 = (int) input2.N;
+	int N3 = (int) input3.N;
 
 	/* Declare arrays */
-	double array1[N1];
-	double array2[N2];
-	double array3[N3];
-
-	/* Python list<float> to C double array */
-	for (int i = 0 ; i < N1 ; i++)
-		array1[i] = PyFloat_AsDouble(PyList_GetItem(list1, (Py_ssize_t) i));
-	for (int i = 0 ; i < N2 ; i++)
-		array2[i] = PyFloat_AsDouble(PyList_GetItem(list2, (Py_ssize_t) i));
-	for (int i = 0 ; i < N3 ; i++)
-		array3[i] = PyFloat_AsDouble(PyList_GetItem(list3, (Py_ssize_t) i));
-	/* End of Python list fill */
+	double* array1 = input1.data;
+	double* array2 = input2.data;
+	double* array3 = input3.data;
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* Declare output array */
-	double output[N1];
+	/* Declare output array (a new buffer, or a list for list inputs) */
+	doubles output;
+	PyObject* result = doubles_new(input1.list, 1, N1, 1, &output);
+	if (result == NULL || N2 < N1 || N3 < N1) {
+		if (result != NULL) PyErr_SetString(PyExc_ValueError, "Inputs of different lengths");
+		Py_XDECREF(result);
+		doubles_release(&output);
+		doubles_release(&input1);
+		doubles_release(&input2);
+		doubles_release(&input3);
+		return NULL;
+	}
 
 	// Do what you wanna do, for example, dot multiplication
 	for (int i = 0 ; i < N1 ; i++)
-		output[i] = array1[i] * array2[i] * array3[i];
+		output.data[i] = array1[i] * array2[i] * array3[i];
 
 
 
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* C double array to Python list<float> */
-	PyObject* result = PyList_New(N1);
-
-    for (int i = 0; i < N1; i++)
-    	PyList_SetItem(result, i, PyFloat_FromDouble(output[i]));
-	/* End of Python list fill */
-
-    return result;
+	/* Output buffer or Python list<float> */
+	doubles_release(&input1);
+	doubles_release(&input2);
+	doubles_release(&input3);
+	return doubles_result(result, &output);
 }
 
 // <function input_3x_PyList1D__output_1x_PyList1D(PyObject* list)>
@@ -152,7 +176,9 @@ PyObject* input_3x_PyList1D__output_1x_PyList1D(PyObject* list1, PyObject* list2
 //
 //	@returns <PyObject* list> : output Python list (C API)
 //
-// 	@description : Python list treatment of 1 input list with 1 new output list
+// 	@description : Python list treatment of 1 input list with 1 new output list,
+//		buffers of doubles (numpy arrays, array.array...) are read without
+//		copies and the output is a new buffer
 //
 //	@name : input_3x_PyList1D__output_1x_PyList1D
 //		    |     |  |       |      |  |
@@ -169,56 +195,72 @@ PyObject* input_3x_PyList1D__output_1x_PyList1D(PyObject* list1, PyObject* list2
 //
 PyObject* input_4x_PyList1D__output_1x_PyList1D(PyObject* list1, PyObject* list2, PyObject* list3, PyObject* list4) {
 
-	/* Check if list is a PyList_Type */
-	if (!PyList_Check(list1)) return NULL;
-	if (!PyList_Check(list2)) return NULL;
-	if (!PyList_Check(list3)) return NULL;
-	if (!PyList_Check(list4)) return NULL;
+	/* Check if list is a PyList_Type or a buffer */
+	if (!PyList_Check(list1) && !PyObject_CheckBuffer(list1)) return NULL;
+	if (!PyList_Check(list2) && !PyObject_CheckBuffer(list2)) return NULL;
+	if (!PyList_Check(list3) && !PyObject_CheckBuffer(list3)) return NULL;
+	if (!PyList_Check(list4) && !PyObject_CheckBuffer(list4)) return NULL;
+
+	/* Inputs, buffers of doubles (without copies) or Python list<float> */
+	doubles input1, input2, input3, input4;
+	if (doubles_get(list1, 1, 0, &input1) != 0) return NULL;
+	if (doubles_get(list2, 1, 0, &input2) != 0) {
+		doubles_release(&input1);
+		return NULL;
+	}
+	if (doubles_get(list3, 1, 0, &input3) != 0) {
+		doubles_release(&input1);
+		doubles_release(&input2);
+		return NULL;
+	}
+	if (doubles_get(list4, 1, 0, &input4) != 0) {
+		doubles_release(&input1);
+		doubles_release(&input2);
+		doubles_release(&input3);
+		return NULL;
+	}
 
 	/* Check list size */
-	int N1 = PyList_Size(list1);
-	int N2 = PyList_Size(list2);
-	int N3 = PyList_Size(list3);
-	int N4 = PyList_Size(list4);
-
+	int N1 = (int) input1.N;
+	int N2 = (int) input2.N;
+	int N3 = (int) input3.N;
+	int N4 = (int) input4.N;
 
 	/* Declare arrays */
-	double array1[N1];
-	double array2[N2];
-	double array3[N3];
-	double array4[N4];
-
-	/* Python list<float> to C double array */
-	for (int i = 0 ; i < N1 ; i++)
-		array1[i] = PyFloat_AsDouble(PyList_GetItem(list1, (Py_ssize_t) i));
-	for (int i = 0 ; i < N2 ; i++)
-		array2[i] = PyFloat_AsDouble(PyList_GetItem(list2, (Py_ssize_t) i));
-	for (int i = 0 ; i < N3 ; i++)
-		array3[i] = PyFloat_AsDouble(PyList_GetItem(list3, (Py_ssize_t) i));
-	for (int i = 0 ; i < N4 ; i++)
-		array4[i] = PyFloat_AsDouble(PyList_GetItem(list4, (Py_ssize_t) i));
-	/* End of Python list fill */
+	double* array1 = input1.data;
+	double* array2 = input2.data;
+	double* array3 = input3.data;
+	double* array4 = input4.data;
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* Declare output array */
-	double output[N1];
+	/* Declare output array (a new buffer, or a list for list inputs) */
+	doubles output;
+	PyObject* result = doubles_new(input1.list, 1, N1, 1, &output);
+	if (result == NULL || N2 < N1 || N3 < N1 || N4 < N1) {
+		if (result != NULL) PyErr_SetString(PyExc_ValueError, "Inputs of different lengths");
+		Py_XDECREF(result);
+		doubles_release(&output);
+		doubles_release(&input1);
+		doubles_release(&input2);
+		doubles_release(&input3);
+		doubles_release(&input4);
+		return NULL;
+	}
 
 	// Do what you wanna do, for example, dot multiplication
 	for (int i = 0 ; i < N1 ; i++)
-		output[i] = array1[i] * array2[i] * array3[i] * array4[i];
+		output.data[i] = array1[i] * array2[i] * array3[i] * array4[i];
 
 
 
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* C double array to Python list<float> */
-	PyObject* result = PyList_New(N1);
-
-    for (int i = 0; i < N1; i++)
-    	PyList_SetItem(result, i, PyFloat_FromDouble(output[i]));
-	/* End of Python list fill */
-
-    return result;
+	/* Output buffer or Python list<float> */
+	doubles_release(&input1);
+	doubles_release(&input2);
+	doubles_release(&input3);
+	doubles_release(&input4);
+	return doubles_result(result, &output);
 }
@@ -3,13 +3,18 @@
 /* Header file */
 #include "arr_simo.h"
 
+/* Buffer protocol inputs and outputs (lists are the slow path) */
+#include "pybuffer.h"
+
 // <function input_1x_PyList1D__output_2x_PyList1D(PyObject* list)>
 // 	@argument <PyObject* list> : input Python list (C API)
 //
 //	@returns <PyObject tuple{<PyObject* list>,<PyObject* list>}> : output Python
 //		list with two lists inside (C API)
 //
-// 	@description : Python list treatment of 1 input list with 2 new output list
+// 	@description : Python list treatment of 1 input list with 2 new output list,
+//		a buffer of doubles (numpy array, array.array...) is read without
+//		copies and the outputs are new buffers
 //
 //	@name : input_1x_PyList1D__output_2x_PyList1D
 //		    |     |  |     |   |      |  |     |
@@ -28,32 +33,33 @@
 //
 PyObject* input_1x_PyList1D__output_2x_PyList1D(PyObject* list) {
 
-	/* Check if list is a PyList_Type */
-	//if (!PyList_Check(list)) return NULL;
-
-	/* Check list size */
-	int N = PyList_Size(list);
-
-	/* Declare array */
-	double array[N];
-
-	/* Python list<float> to C double array */
-	for (int i = 0 ; i < N ; i++)
-		array[i] = PyFloat_AsDouble(PyList_GetItem(list, (Py_ssize_t) i));
-	/* End of Python list fill */
+	/* Input, a buffer of doubles (without copies) or a Python list<float> */
+	doubles input;
+	if (doubles_get(list, 1, 0, &input) != 0) return NULL;
+	int N = (int) input.N;
+	double* array = input.data;
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* Declare output array */
-	double output1[N];
-	double output2[N];
+	/* Declare output arrays (new buffers, or lists for list inputs) */
+	doubles output1, output2;
+	PyObject* result1 = doubles_new(input.list, 1, N, 1, &output1);
+	PyObject* result2 = doubles_new(input.list, 1, N, 1, &output2);
+	if (result1 == NULL || result2 == NULL) {
+		Py_XDECREF(result1);
+		doubles_release(&output1);
+		Py_XDECREF(result2);
+		doubles_release(&output2);
+		doubles_release(&input);
+		return NULL;
+	}
 
 
 
 	// Do what you wanna do, for example, duplicate all values in the input list
 	for (int i = 0 ; i < N ; i++) {
-		output1[i] = array[i] * 2;
-		output2[i] = array[i] * 3;
+		output1.data[i] = array[i] * 2;
+		output2.data[i] = array[i] * 3;
 	}
 
 
@@ -61,22 +67,13 @@ PyObject* input_1x_PyList1D__output_2x_PyList1D(PyObject* list) {
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* C double array to Python list<float> */
-	// Output 1
-	PyObject* result1 = PyList_New(N);
-    for (int i = 0; i < N; i++)
-    	PyList_SetItem(result1, i, PyFloat_FromDouble(output1[i]));
-
-	// Output 2
-	PyObject* result2 = PyList_New(N);
-    for (int i = 0; i < N; i++)
-    	PyList_SetItem(result2, i, PyFloat_FromDouble(output2[i]));
+	/* Output buffers or Python list<float> */
+	doubles_release(&input);
 
 	// Final output
 	PyObject* result = PyList_New(2);
-	PyList_SetItem(result, 0, result1);
-	PyList_SetItem(result, 1, result2);
-	/* End of Python list fill */
+	PyList_SetItem(result, 0, doubles_result(result1, &output1));
+	PyList_SetItem(result, 1, doubles_result(result2, &output2));
 
     return result;
 }
@@ -87,7 +84,9 @@ PyObject* input_1x_PyList1D__output_2x_PyList1D(PyObject* list) {
 //	@returns <PyObject tuple{<PyObject* list>,<PyObject* list>,
 //		<PyObject* list>}> : output Python list with two lists inside (C API)
 //
-// 	@description : Python list treatment of 1 input list with 2 new output list
+// 	@description : Python list treatment of 1 input list with 2 new output list,
+//		a buffer of doubles (numpy array, array.array...) is read without
+//		copies and the outputs are new buffers
 //
 //	@name : input_1x_PyList1D__output_3x_PyList1D
 //		    |     |  |     |   |      |  |     |
@@ -106,34 +105,37 @@ PyObject* input_1x_PyList1D__output_2x_PyList1D(PyObject* list) {
 //
 PyObject* input_1x_PyList1D__output_3x_PyList1D(PyObject* list) {
 
-	/* Check if list is a PyList_Type */
-	//if (!PyList_Check(list)) return NULL;
-
-	/* Check list size */
-	int N = PyList_Size(list);
-
-	/* Declare array */
-	double array[N];
-
-	/* Python list<float> to C double array */
-	for (int i = 0 ; i < N ; i++)
-		array[i] = PyFloat_AsDouble(PyList_GetItem(list, (Py_ssize_t) i));
-	/* End of Python list fill */
+	/* Input, a buffer of doubles (without copies) or a Python list<float> */
+	doubles input;
+	if (doubles_get(list, 1, 0, &input) != 0) return NULL;
+	int N = (int) input.N;
+	double* array = input.data;
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* Declare output array */
-	double output1[N];
-	double output2[N];
-	double output3[N];
+	/* Declare output arrays (new buffers, or lists for list inputs) */
+	doubles output1, output2, output3;
+	PyObject* result1 = doubles_new(input.list, 1, N, 1, &output1);
+	PyObject* result2 = doubles_new(input.list, 1, N, 1, &output2);
+	PyObject* result3 = doubles_new(input.list, 1, N, 1, &output3);
+	if (result1 == NULL || result2 == NULL || result3 == NULL) {
+		Py_XDECREF(result1);
+		doubles_release(&output1);
+		Py_XDECREF(result2);
+		doubles_release(&output2);
+		Py_XDECREF(result3);
+		doubles_release(&output3);
+		doubles_release(&input);
+		return NULL;
+	}
 
 
 
 	// Do what you wanna do, for example, duplicate all values in the input list
 	for (int i = 0 ; i < N ; i++) {
-		output1[i] = array[i] * 2;
-		output2[i] = array[i] * 3;
-		output3[i] = array[i] * 4;
+		output1.data[i] = array[i] * 2;
+		output2.data[i] = array[i] * 3;
+		output3.data[i] = array[i] * 4;
 	}
 
 
@@ -141,28 +143,14 @@ PyObject* input_1x_PyList1D__output_3x_PyList1D(PyObject* list) {
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* C double array to Python list<float> */
-	// Output 1
-	PyObject* result1 = PyList_New(N);
-    for (int i = 0; i < N; i++)
-    	PyList_SetItem(result1, i, PyFloat_FromDouble(output1[i]));
-
-	// Output 2
-	PyObject* result2 = PyList_New(N);
-    for (int i = 0; i < N; i++)
-    	PyList_SetItem(result2, i, PyFloat_FromDouble(output2[i]));
-
-	// Output 2
-	PyObject* result3 = PyList_New(N);
-    for (int i = 0; i < N; i++)
-    	PyList_SetItem(result3, i, PyFloat_FromDouble(output3[i]));
+	/* Output buffers or Python list<float> */
+	doubles_release(&input);
 
 	// Final output
 	PyObject* result = PyList_New(3);
-	PyList_SetItem(result, 0, result1);
-	PyList_SetItem(result, 1, result2);
-	PyList_SetItem(result, 2, result3);
-	/* End of Python list fill */
+	PyList_SetItem(result, 0, doubles_result(result1, &output1));
+	PyList_SetItem(result, 1, doubles_result(result2, &output2));
+	PyList_SetItem(result, 2, doubles_result(result3, &output3));
 
     return result;
 }
@@ -174,7 +162,9 @@ PyObject* input_1x_PyList1D__output_3x_PyList1D(PyObject* list) {
 //		<PyObject* list>, <PyObject* list>}> : output Python list with two lists
 //		inside (C API)
 //
-// 	@description : Python list treatment of 1 input list with 2 new output list
+// 	@description : Python list treatment of 1 input list with 2 new output list,
+//		a buffer of doubles (numpy array, array.array...) is read without
+//		copies and the outputs are new buffers
 //
 //	@name : input_1x_PyList1D__output_4x_PyList1D
 //		    |     |  |     |   |      |  |     |
@@ -193,36 +183,41 @@ PyObject* input_1x_PyList1D__output_3x_PyList1D(PyObject* list) {
 //
 PyObject* input_1x_PyList1D__output_4x_PyList1D(PyObject* list) {
 
-	/* Check if list is a PyList_Type */
-	//if (!PyList_Check(list)) return NULL;
-
-	/* Check list size */
-	int N = PyList_Size(list);
-
-	/* Declare array */
-	double array[N];
-
-	/* Python list<float> to C double array */
-	for (int i = 0 ; i < N ; i++)
-		array[i] = PyFloat_AsDouble(PyList_GetItem(list, (Py_ssize_t) i));
-	/* End of Python list fill */
+	/* Input, a buffer of doubles (without copies) or a Python list<float> */
+	doubles input;
+	if (doubles_get(list, 1, 0, &input) != 0) return NULL;
+	int N = (int) input.N;
+	double* array = input.data;
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* Declare output array */
-	double output1[N];
-	double output2[N];
-	double output3[N];
-	double output4[N];
+	/* Declare output arrays (new buffers, or lists for list inputs) */
+	doubles output1, output2, output3, output4;
+	PyObject* result1 = doubles_new(input.list, 1, N, 1, &output1);
+	PyObject* result2 = doubles_new(input.list, 1, N, 1, &output2);
+	PyObject* result3 = doubles_new(input.list, 1, N, 1, &output3);
+	PyObject* result4 = doubles_new(input.list, 1, N, 1, &output4);
+	if (result1 == NULL || result2 == NULL || result3 == NULL || result4 == NULL) {
+		Py_XDECREF(result1);
+		doubles_release(&output1);
+		Py_XDECREF(result2);
+		doubles_release(&output2);
+		Py_XDECREF(result3);
+		doubles_release(&output3);
+		Py_XDECREF(result4);
+		doubles_release(&output4);
+		doubles_release(&input);
+		return NULL;
+	}
 
 
 
 	// Do what you wanna do, for example, duplicate all values in the input list
 	for (int i = 0 ; i < N ; i++) {
-		output1[i] = array[i] * 2;
-		output2[i] = array[i] * 3;
-		output3[i] = array[i] * 4;
-		output4[i] = array[i] * 5;
+		output1.data[i] = array[i] * 2;
+		output2.data[i] = array[i] * 3;
+		output3.data[i] = array[i] * 4;
+		output4.data[i] = array[i] * 5;
 	}
 
 
@@ -230,34 +225,15 @@ PyObject* input_1x_PyList1D__output_4x_PyList1D(PyObject* list) {
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* C double array to Python list<float> */
-	// Output 1
-	PyObject* result1 = PyList_New(N);
-    for (int i = 0; i < N; i++)
-    	PyList_SetItem(result1, i, PyFloat_FromDouble(output1[i]));
-
-	// Output 2
-	PyObject* result2 = PyList_New(N);
-    for (int i = 0; i < N; i++)
-    	PyList_SetItem(result2, i, PyFloat_FromDouble(output2[i]));
-
-	// Output 3
-	PyObject* result3 = PyList_New(N);
-    for (int i = 0; i < N; i++)
-    	PyList_SetItem(result3, i, PyFloat_FromDouble(output3[i]));
-
-	// Output 4
-	PyObject* result4 = PyList_New(N);
-	for (int i = 0; i < N; i++)
-		PyList_SetItem(result4, i, PyFloat_FromDouble(output4[i]));
+	/* Output buffers or Python list<float> */
+	doubles_release(&input);
 
 	// Final output
 	PyObject* result = PyList_New(4);
-	PyList_SetItem(result, 0, result1);
-	PyList_SetItem(result, 1, result2);
-	PyList_SetItem(result, 2, result3);
-	PyList_SetItem(result, 3, result4);
-	/* End of Python list fill */
+	PyList_SetItem(result, 0, doubles_result(result1, &output1));
+	PyList_SetItem(result, 1, doubles_result(result2, &output2));
+	PyList_SetItem(result, 2, doubles_result(result3, &output3));
+	PyList_SetItem(result, 3, doubles_result(result4, &output4));
 
     return result;
 }
@@ -6,12 +6,17 @@
 /* Python C API */
 #include <Python.h>
 
+/* Buffer protocol inputs and outputs (lists are the slow path) */
+#include "pybuffer.h"
+
 // <function input_1x_PyList1D__output_1x_PyList1D(PyObject* list)>
 // 	@argument <PyObject* list> : input Python list (C API)
 //
 //	@returns <PyObject* list> : output Python list (C API)
 //
-// 	@description : Python list treatment of 1 input list with 1 new output list
+// 	@description : Python list treatment of 1 input list with 1 new output list,
+//		a buffer of doubles (numpy array, array.array...) is read without
+//		copies and the output is a new buffer
 //
 //	@name : input_1x_PyList1D__output_1x_PyList1D
 //		    |     |  |     |   |      |  |     |
@@ -30,41 +35,36 @@
 //
 PyObject* input_1x_PyList1D__output_1x_PyList1D(PyObject* list) {
 
-	/* Check list size */
-	int N = PyList_Size(list);
-
-	/* Declare array */
-	double array[N];
-
-	/* Python list<float> to C double array */
-	for (int i = 0 ; i < N ; i++)
-		array[i] = PyFloat_AsDouble(PyList_GetItem(list, (Py_ssize_t) i));
-	/* End of Python list fill */
+	/* Input, a buffer of doubles (without copies) or a Python list<float> */
+	doubles input;
+	if (doubles_get(list, 1, 0, &input) != 0) return NULL;
+	int N = (int) input.N;
+	double* array = input.data;
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* Declare output array */
-	double output[N];
+	/* Declare output array (a new buffer, or a list for list inputs) */
+	doubles output;
+	PyObject* result = doubles_new(input.list, 1, N, 1, &output);
+	if (result == NULL) {
+		doubles_release(&input);
+		return NULL;
+	}
 
 
 
 	// Do what you wanna do, for example, duplicate all values in the input list
 	for (int i = 0 ; i < N ; i++)
-		output[i] = array[i] * 2;
+		output.data[i] = array[i] * 2;
 
 
 
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* C double array to Python list<float> */
-	PyObject* result = PyList_New(N);
-
-    for (int i = 0; i < N; i++)
-    	PyList_SetItem(result, i, PyFloat_FromDouble(output[i]));
-	/* End of Python list fill */
-
-    return result;
+	/* Output buffer or Python list<float> */
+	doubles_release(&input);
+	return doubles_result(result, &output);
 }
 
 // <function input_1x_PyList2D__output_1x_PyList2D(PyObject* list)>
@@ -72,7 +72,9 @@ PyObject* input_1x_PyList1D__output_1x_PyList1D(PyObject* list) {
 //
 //	@returns <PyObject* list> : output Python 2D list (C API)
 //
-// 	@description : Python list treatment of 1 input list with 1 new output list
+// 	@description : Python list treatment of 1 input list with 1 new output list,
+//		a buffer of doubles (numpy array, array.array...) is read without
+//		copies and the output is a new buffer
 //
 //	@name : input_1x_PyList2D__output_1x_PyList2D
 //		    |     |  |     |   |      |  |     |
@@ -91,32 +93,29 @@ PyObject* input_1x_PyList1D__output_1x_PyList1D(PyObject* list) {
 //
 PyObject* input_1x_PyList2D__output_1x_PyList2D(PyObject* list) {
 
-	/* Check list size */
-	int N = PyList_Size(list);
-	int M = PyList_Size(PyList_GetItem(list, 0));
-
-	/* Declare array */
-	double array[N][M];
-
-	/* Python list<float> to C double array */
-	for (int i = 0 ; i < N ; i++) {
-		for (int j = 0 ; j < M ; j++)
-			array[i][j] = PyFloat_AsDouble(PyList_GetItem(PyList_GetItem(list, i), j));
-
-	}
-	/* End of Python list fill */
+	/* Input, a 2D buffer of doubles (without copies) or a Python list<list> */
+	doubles input;
+	if (doubles_get(list, 2, 0, &input) != 0) return NULL;
+	int N = (int) input.N;
+	int M = (int) input.M;
+	double* array = input.data;
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* Declare output array */
-	double output[N][M];
+	/* Declare output array (a new buffer, or a list for list inputs) */
+	doubles output;
+	PyObject* result = doubles_new(input.list, 2, N, M, &output);
+	if (result == NULL) {
+		doubles_release(&input);
+		return NULL;
+	}
 
 
 
 	// Do what you wanna do, for example, duplicate all values in the input list
 	for (int i = 0 ; i < N ; i++) {
 		for (int j = 0 ; j < M ; j++)
-			output[i][j] = 2 * array[i][j];
+			output.data[i*M+j] = 2 * array[i*M+j];
 	}
 
 
@@ -125,15 +124,7 @@ PyObject* input_1x_PyList2D__output_1x_PyList2D(PyObject* list) {
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* C double array to Python list<float> */
-	PyObject* result = PyList_New(N);
-	for (int i = 0 ; i < N ; i++) {
-		PyObject* result_i = PyList_New(M);
-		for (int j = 0 ; j < M ; j++)
-			PyList_SetItem(result_i, j, PyFloat_FromDouble(output[i][j]));
-		PyList_SetItem(result, i, result_i);
-	}
-	/* End of Python list fill */
-
-    return result;
+	/* Output buffer or Python list<list<float>> */
+	doubles_release(&input);
+	return doubles_result(result, &output);
 }
@@ -0,0 +1,212 @@
+/* pybuffer.h */
+
+/* Python C API */
+#include <Python.h>
+
+/* Memory of the list slow path */
+#include <stdlib.h>
+#include <string.h>
+
+// <struct doubles>
+// 	@variable <double* data> : N x M doubles (row major), the memory of the
+//		buffer (zero copy) or a copy of the Python list (slow path)
+// 	@variable <Py_ssize_t N> : rows (items of a 1D input)
+// 	@variable <Py_ssize_t M> : columns (1 for a 1D input)
+// 	@variable <int ndim> : 1 or 2 dimensions
+// 	@variable <int list> : 1 if the object is a list (or another sequence
+//		without buffer), the results are returned as lists then
+// 	@variable <int copy> : 1 if data is a copy (freed by doubles_release)
+// 	@variable <Py_buffer view> : exported buffer of the object (list == 0)
+//
+// 	@description : input or output array of doubles of the C-API modules,
+//		any object with the buffer protocol (numpy arrays, array.array,
+//		memoryview...) of C contiguous doubles is used without copies, the
+//		rest of the sequences are converted element by element
+//
+typedef struct {
+	double* data;
+	Py_ssize_t N;
+	Py_ssize_t M;
+	int ndim;
+	int list;
+	int copy;
+	Py_buffer view;
+} doubles;
+
+// <function doubles_format(const char* format)>
+// 	@returns <int> : 1 if format is a native double of the struct module
+static int doubles_format(const char* format) {
+	if (format == NULL || strcmp(format, "d") == 0 || strcmp(format, "@d") == 0 || strcmp(format, "=d") == 0)
+		return 1;
+	return strcmp(format, PY_LITTLE_ENDIAN ? "<d" : ">d") == 0;
+}
+
+// <function doubles_get(PyObject* object, int ndim, int writable, doubles* d)>
+// 	@argument <PyObject* object> : buffer or sequence (list of lists if 2D)
+// 	@argument <int ndim> : 1 or 2 dimensions
+// 	@argument <int writable> : 1 for outputs (only buffers are accepted)
+// 	@argument <doubles* d> : filled with the data of object
+//
+//	@returns <int> : 0 if success, -1 with the Python exception set if not
+//
+// 	@description : the buffers of other types or not contiguous are copied
+//		as sequences (the slow path), release d with doubles_release
+//
+static int doubles_get(PyObject* object, int ndim, int writable, doubles* d) {
+	d->data = NULL;
+	d->N = 0;
+	d->M = 1;
+	d->ndim = ndim;
+	d->list = 0;
+	d->copy = 0;
+	d->view.obj = NULL;
+
+	/* Buffer protocol, zero copy */
+	if (PyObject_CheckBuffer(object)) {
+		int flags = PyBUF_C_CONTIGUOUS | PyBUF_FORMAT | (writable ? PyBUF_WRITABLE : 0);
+		if (PyObject_GetBuffer(object, &d->view, flags) == 0) {
+			if (d->view.itemsize == sizeof(double) && doubles_format(d->view.format) && d->view.ndim == ndim) {
+				d->data = (double*) d->view.buf;
+				d->N = d->view.shape[0];
+				d->M = ndim == 2 ? d->view.shape[1] : 1;
+				return 0;
+			}
+			PyBuffer_Release(&d->view);
+			d->view.obj = NULL;
+			if (writable) {
+				PyErr_SetString(PyExc_ValueError, ndim == 2 ? "Output must be a 2D buffer of doubles" : "Output must be a 1D buffer of doubles");
+				return -1;
+			}
+		} else if (writable) {
+			return -1;
+		} else {
+			PyErr_Clear();
+		}
+	} else if (writable) {
+		PyErr_SetString(PyExc_TypeError, "Output must be a writable buffer of doubles (numpy array, array.array...)");
+		return -1;
+	}
+
+	/* Slow path, sequence converted element by element */
+	PyObject* rows = PySequence_Fast(object, "Sequence or buffer of doubles required");
+	if (rows == NULL) return -1;
+	d->list = !PyObject_CheckBuffer(object);
+	d->copy = 1;
+	d->N = PySequence_Fast_GET_SIZE(rows);
+	if (ndim == 2 && d->N > 0) {
+		PyObject* row = PySequence_Fast(PySequence_Fast_GET_ITEM(rows, 0), "Sequence of rows required");
+		if (row == NULL) {
+			Py_DECREF(rows);
+			return -1;
+		}
+		d->M = PySequence_Fast_GET_SIZE(row);
+		Py_DECREF(row);
+	}
+	d->data = malloc(sizeof(double) * (d->N * d->M > 0 ? d->N * d->M : 1));
+	if (d->data == NULL) {
+		Py_DECREF(rows);
+		PyErr_NoMemory();
+		return -1;
+	}
+	for (Py_ssize_t i = 0 ; i < d->N ; i++) {
+		PyObject* item = PySequence_Fast_GET_ITEM(rows, i);
+		if (ndim == 1) {
+			d->data[i] = PyFloat_AsDouble(item);
+		} else {
+			PyObject* row = PySequence_Fast(item, "Sequence of rows required");
+			if (row != NULL && PySequence_Fast_GET_SIZE(row) != d->M) {
+				PyErr_SetString(PyExc_ValueError, "Rows of different lengths");
+				Py_DECREF(row);
+				row = NULL;
+			}
+			if (row == NULL) break;
+			for (Py_ssize_t j = 0 ; j < d->M ; j++)
+				d->data[i*d->M+j] = PyFloat_AsDouble(PySequence_Fast_GET_ITEM(row, j));
+			Py_DECREF(row);
+		}
+		if (PyErr_Occurred()) break;
+	}
+	Py_DECREF(rows);
+	if (PyErr_Occurred()) {
+		free(d->data);
+		d->data = NULL;
+		return -1;
+	}
+	return 0;
+}
+
+// <function doubles_release(doubles* d)>
+// 	@description : releases the buffer or frees the copy of the list
+static void doubles_release(doubles* d) {
+	if (d->view.obj != NULL) {
+		PyBuffer_Release(&d->view);
+		d->view.obj = NULL;
+	} else if (d->copy) {
+		free(d->data);
+	}
+	d->data = NULL;
+	d->copy = 0;
+}
+
+// <function doubles_new(int list, int ndim, Py_ssize_t N, Py_ssize_t M, doubles* d)>
+// 	@argument <int list> : 1 to return a list (the inputs were lists)
+// 	@argument <int ndim> : 1 (N doubles) or 2 (N x M doubles)
+// 	@argument <doubles* d> : memory of the result, filled with zeros (with
+//		a list it must be released with doubles_release if the function
+//		fails before doubles_result)
+//
+//	@returns <PyObject*> : new buffer (a memoryview of doubles over a
+//		bytearray, numpy.asarray doesn't copy it) or None for a list (it is
+//		built by doubles_result), NULL with the Python exception set if fails
+//
+static PyObject* doubles_new(int list, int ndim, Py_ssize_t N, Py_ssize_t M, doubles* d) {
+	d->N = N;
+	d->M = ndim == 2 ? M : 1;
+	d->ndim = ndim;
+	d->list = list;
+	d->copy = list;
+	d->view.obj = NULL;
+	if (list) {
+		d->data = calloc(N * d->M > 0 ? N * d->M : 1, sizeof(double));
+		if (d->data == NULL) return PyErr_NoMemory();
+		Py_INCREF(Py_None);
+		return Py_None;
+	}
+	d->data = NULL;
+	PyObject* bytes = PyByteArray_FromStringAndSize(NULL, sizeof(double) * N * d->M);
+	if (bytes == NULL) return NULL;
+	memset(PyByteArray_AS_STRING(bytes), 0, sizeof(double) * N * d->M);
+	d->data = (double*) PyByteArray_AS_STRING(bytes);
+	PyObject* view = PyMemoryView_FromObject(bytes);
+	Py_DECREF(bytes);
+	if (view == NULL) return NULL;
+	PyObject* result;
+	if (ndim == 2 && N * d->M > 0) result = PyObject_CallMethod(view, "cast", "s(nn)", "d", N, d->M);
+	else result = PyObject_CallMethod(view, "cast", "s", "d");
+	Py_DECREF(view);
+	return result;
+}
+
+// <function doubles_result(PyObject* result, doubles* d)>
+// 	@argument <PyObject* result> : object of doubles_new
+//
+//	@returns <PyObject*> : the buffer, or the Python list (1D or 2D) of the
+//		values of d for the slow path (then d is freed)
+//
+static PyObject* doubles_result(PyObject* result, doubles* d) {
+	if (!d->list) return result;
+	Py_XDECREF(result);
+	PyObject* list = PyList_New(d->N);
+	for (Py_ssize_t i = 0 ; list != NULL && i < d->N ; i++) {
+		if (d->ndim == 1) {
+			PyList_SetItem(list, i, PyFloat_FromDouble(d->data[i]));
+		} else {
+			PyObject* row = PyList_New(d->M);
+			for (Py_ssize_t j = 0 ; row != NULL && j < d->M ; j++)
+				PyList_SetItem(row, j, PyFloat_FromDouble(d->data[i*d->M+j]));
+			PyList_SetItem(list, i, row);
+		}
+	}
+	doubles_release(d);
+	return list;
+}
@@ -3,82 +3,49 @@
 /* Header file */
 #include "inpsp_cX.h"
 
-// <function inpsp_cs>
-// 	@argument <PyObject* PyList_Xnew> : new mesh to be calculated
-// 	@argument <PyObject* PyList_X> : Known abscissa
-// 	@argument <PyObject* PyList_Y> : Known ordinate
-// 	@argument <PyObject* PyFloat_Mi> : initial momentum (second derivative)
-// 	@argument <PyObject* PyFloat_Mf> : final momentum (second derivative)
+/* Buffer protocol inputs and outputs (lists are the slow path) */
+#include "pybuffer.h"
+
+// <function inpsp_core>
+// 	@argument <double* Xnew>, <int L> : new mesh to be calculated
+// 	@argument <double* X>, <double* Y>, <int N> : known abscissa and ordinate
+// 	@argument <double Mi>, <double Mf> : initial and final momentums
+// 	@argument <double* Ynew> : L values, new ordinate
+// 	@argument <double* A> : (N+1) x 4 values, polynomial coefficients
+// 	@argument <double* M> : N+1 values, momentums
 //
-//	@returns <PyObject* tuple{PyList_Ynew,PyList_A,PyList_M}>
-//		@element <PyObject* PyList_Ynew> : new ordinate base on PyList_Xnew
-//		@element <PyObject* PyList_A> : polynomial coefficients
-//		@element <PyObject* PyList_M> : momentums
+//	@returns <int> : 0 if success, -1 if there is no memory
 //
-// 	@description : interpolation of a set X,Y returning a new oversampled values
-//		for Y given X, the polynomial coefficients and the momentums. The bounds
-//		must be passed via M_i and M_f (initial and final momentums).
+// 	@description : cubic spline of inpsp_cs over C arrays, the temporal
+//		arrays are in the heap (large N would overflow the stack)
 //
-//	@name : inpsp_cs
-//		    |  |  ||
-//		    |  |  |Given second derivative value
-//		    |  |  Cubic
-//		    |  Spline
-//		    Interpolation
-//
-// 	@author : Daniel Ríos Linares
-//
-//	@version : 0.1.0 (July 7, 2017) - first coding
-//
-PyObject* inpsp_cs(
-    // New mesh to interpolate
-    PyObject* PyList_Xnew,
-    // Known X vs Y
-    PyObject* PyList_X,
-    PyObject* PyList_Y,
-    // Momentums, initial and final,typically will be both 0 (natural spline)
-    PyObject* PyFloat_Mi,
-    PyObject* PyFloat_Mf
-    ) {
-
-	/* Check list sizes */
-	int N = PyList_Size(PyList_X);
-	int L = PyList_Size(PyList_Xnew);
-
-	/* Declare arrays */
-	double X[N];
-	double Y[N];
-    double Xnew[L];
-	double Ynew[L];
-    double H[N];
-    double A[N+1][4]; // Polynomial coefficients
-    double M[N]; // Momentums vector
-    double Aupp[N-2]; // tridiagonal system of linear equations (upper diagonal)
-    double Adia[N-2]; // tridiagonal system of linear equations (main diagonal)
-    double Alow[N-2]; // tridiagonal system of linear equations (lower diagonal)
-    double B[N-2]; // tridiagonal system of linear equations (B vector)
-
-	/* Python list<float> to C double array */
-	for (int i = 0 ; i < N ; i++) {
-		X[i] = PyFloat_AsDouble(PyList_GetItem(PyList_X, i));
-        Y[i] = PyFloat_AsDouble(PyList_GetItem(PyList_Y, i));
-    }
-	for (int i = 0 ; i < L ; i++) {
-		Xnew[i] = PyFloat_AsDouble(PyList_GetItem(PyList_Xnew, i));
+static int inpsp_core(const double* Xnew, int L, const double* X, const double* Y, int N, double Mi, double Mf, double* Ynew, double* A, double* M) {
+
+	/* Temporal arrays */
+	int n = N+1;
+	double* H = malloc(sizeof(double) * n);
+	double* Aupp = malloc(sizeof(double) * n); // tridiagonal system of linear equations (upper diagonal)
+	double* Adia = malloc(sizeof(double) * n); // tridiagonal system of linear equations (main diagonal)
+	double* Alow = malloc(sizeof(double) * n); // tridiagonal system of linear equations (lower diagonal)
+	double* B = malloc(sizeof(double) * n); // tridiagonal system of linear equations (B vector)
+	double* P = malloc(sizeof(double) * n);
+	double* Q = malloc(sizeof(double) * n);
+	if (H == NULL || Aupp == NULL || Adia == NULL || Alow == NULL || B == NULL || P == NULL || Q == NULL) {
+		free(H); free(Aupp); free(Adia); free(Alow); free(B); free(P); free(Q);
+		return -1;
 	}
-	/* End of Python list fill */
 
 	////////////////////////////////////////////////////////////////////////////
 
     if (N == 1) { /** For 1 simple point **/
         for (int j = 0 ; j < N+1 ; j++) {
-            A[j][0] = Y[0];
-            A[j][1] = 0;
-            A[j][2] = 0;
-            A[j][3] = 0;
+            A[j*4+0] = Y[0];
+            A[j*4+1] = 0;
+            A[j*4+2] = 0;
+            A[j*4+3] = 0;
             M[j] = 0;
         }
-    } else { /** For the rest **/
+    } else if (N > 1) { /** For the rest **/
         // H[0] will never be used
         H[0] = 0;
 
@@ -97,7 +64,7 @@ PyObject* inpsp_cs(
             Alow[j] = H[j+1] / (H[j+1] + H[j+2]);
 
         // Fill upper diagonal with H(i) division and with Aupp(N-3) = 0
-        Aupp[N-3] = 0;
+        if (N > 2) Aupp[N-3] = 0;
         for (int j = 0 ; j < N-3 ; j++)
             Aupp[j] = H[j+2] / (H[j+1] + H[j+2]);
 
@@ -106,62 +73,61 @@ PyObject* inpsp_cs(
             B[j] = 6 / (H[j+1] + H[j+2]) * ( (Y[j+2] - Y[j+1]) / H[j+2] - (Y[j+1] - Y[j]) / H[j+1] );
 
 		/* Solve the tridiagonal system of linear equations */
-		// Temporal arrays
-		double P[N-2];
-		double Q[N-2];
-
-		// Alow[0] and Aupp[-1] are 0 (this must be met)
-		Alow[0] = 0;
-		Aupp[N-3] = 0;
-
-		// P[0] and Q[0] are known because Alow[0] = 0 always
-		P[0] = - Aupp[0] / Adia[0];
-		Q[0] = B[0] / Adia[0];
-
-		// Obtain temporal vectors of gaussian elimination
-		for (int i = 1 ; i < N-2 ; i++) {
-			P[i] = - Aupp[i] / (Adia[i] + Alow[i] * P[i-1]);
-			Q[i] = (B[i] - Alow[i] * Q[i-1]) / (Adia[i] + Alow[i] * P[i-1]);
+		if (N > 2) {
+			// Alow[0] and Aupp[-1] are 0 (this must be met)
+			Alow[0] = 0;
+			Aupp[N-3] = 0;
+
+			// P[0] and Q[0] are known because Alow[0] = 0 always
+			P[0] = - Aupp[0] / Adia[0];
+			Q[0] = B[0] / Adia[0];
+
+			// Obtain temporal vectors of gaussian elimination
+			for (int i = 1 ; i < N-2 ; i++) {
+				P[i] = - Aupp[i] / (Adia[i] + Alow[i] * P[i-1]);
+				Q[i] = (B[i] - Alow[i] * Q[i-1]) / (Adia[i] + Alow[i] * P[i-1]);
+			}
+
+			// X[-1] is known because Aupp[-1] = 0 -> P[-1] = 0
+			M[N-2] = Q[N-3];
+
+			// X[i] is obtainable from X[-1]
+			for (int i = N-4 ; i >= 0 ; i--)
+				M[i+1] = P[i] * M[i+2] + Q[i];
 		}
 
-		// X[-1] is known because Aupp[-1] = 0 -> P[-1] = 0
-		M[N-2] = Q[N-3];
-
-		// X[i] is obtainable from X[-1]
-		for (int i = N-4 ; i >= 0 ; i--)
-			M[i+1] = P[i] * X[i+1] + Q[i];
-
 		// Bounds conditions
-		M[0] = PyFloat_AsDouble(PyFloat_Mi);
-	    M[N-1] = PyFloat_AsDouble(PyFloat_Mf);
+		M[0] = Mi;
+	    M[N-1] = Mf;
+	    M[N] = 0;
 
         /* Fill the coefficients of the cubic polynomial */
         for (int j = 0 ; j < N-1 ; j++) {
-            A[j+1][3] = 1 / (6 * H[j+1]) * (M[j+1] - M[j]);
-			A[j+1][2] = (X[j+1] * M[j] - X[j] * M[j+1]) / (2 * H[j+1]);
-            A[j+1][1] = X[j]*X[j] / (2 * H[j+1]) * M[j+1] + (Y[j+1] - Y[j]) / H[j+1] - H[j+1] / 6 * (M[j+1] - M[j]) - X[j+1]*X[j+1] / (2 * H[j+1]) * M[j];
-			A[j+1][0] = (X[j+1]*X[j+1]*X[j+1] * M[j] - X[j]*X[j]*X[j] * M[j+1]) / (6 * H[j+1]) + Y[j] - H[j+1]*H[j+1] / 6 * M[j] - ((Y[j+1] - Y[j]) / H[j+1] - H[j+1] / 6 * (M[j+1] - M[j])) * X[j];
+            A[(j+1)*4+3] = 1 / (6 * H[j+1]) * (M[j+1] - M[j]);
+			A[(j+1)*4+2] = (X[j+1] * M[j] - X[j] * M[j+1]) / (2 * H[j+1]);
+            A[(j+1)*4+1] = X[j]*X[j] / (2 * H[j+1]) * M[j+1] + (Y[j+1] - Y[j]) / H[j+1] - H[j+1] / 6 * (M[j+1] - M[j]) - X[j+1]*X[j+1] / (2 * H[j+1]) * M[j];
+			A[(j+1)*4+0] = (X[j+1]*X[j+1]*X[j+1] * M[j] - X[j]*X[j]*X[j] * M[j+1]) / (6 * H[j+1]) + Y[j] - H[j+1]*H[j+1] / 6 * M[j] - ((Y[j+1] - Y[j]) / H[j+1] - H[j+1] / 6 * (M[j+1] - M[j])) * X[j];
         }
-        A[0][3] = 0;
-        A[0][2] = 0;
-        A[0][1] = 3 * A[1][3] * X[0]*X[0] + 2 * A[1][2] * X[0] + A[1][1];
-        A[0][0] = Y[0] - A[0][1] * X[0];
-        A[N][3] = 0;
-        A[N][2] = 0;
-        A[N][1] = 3 * A[N-1][3] * X[N-1]*X[N-1] + 2 * A[N-1][2] * X[N-1] + A[N-1][1];
-        A[N][0] = Y[N-1] - A[N][1] * X[N-1];
+        A[0*4+3] = 0;
+        A[0*4+2] = 0;
+        A[0*4+1] = 3 * A[1*4+3] * X[0]*X[0] + 2 * A[1*4+2] * X[0] + A[1*4+1];
+        A[0*4+0] = Y[0] - A[0*4+1] * X[0];
+        A[N*4+3] = 0;
+        A[N*4+2] = 0;
+        A[N*4+1] = 3 * A[(N-1)*4+3] * X[N-1]*X[N-1] + 2 * A[(N-1)*4+2] * X[N-1] + A[(N-1)*4+1];
+        A[N*4+0] = Y[N-1] - A[N*4+1] * X[N-1];
     }
 
     /* Evaluate the new mesh (last_i speeds up the loop for sorted new_X) */
     int last_i = 1;
-    int i;
+    int i = 0;
 
-    for (int j = 0 ; j < L ; j++) {
+    for (int j = 0 ; j < L && N > 0 ; j++) {
         if (Xnew[j] <= X[0]) {
             i = 0;
         } else if (Xnew[j] >= X[N-1]) {
             i = N;
-        } else if (Xnew[j] >= X[last_i] && Xnew[j] <= X[last_i+1]) {
+        } else if (last_i+1 < N && Xnew[j] >= X[last_i] && Xnew[j] <= X[last_i+1]) {
             i = last_i+1;
         } else {
             // For all intervals
@@ -177,38 +143,166 @@ PyObject* inpsp_cs(
         last_i = i;
 
         // Fill the new mesh output Ynew
-        Ynew[j] = A[i][3] * Xnew[j]*Xnew[j]*Xnew[j] + A[i][2] * Xnew[j]*Xnew[j] + A[i][1] * Xnew[j] + A[i][0];
-		//printf("f(Xnew[%i] = %f) = %f\n",j,Xnew[j],Ynew[j]);
+        Ynew[j] = A[i*4+3] * Xnew[j]*Xnew[j]*Xnew[j] + A[i*4+2] * Xnew[j]*Xnew[j] + A[i*4+1] * Xnew[j] + A[i*4+0];
     }
 
-    ////////////////////////////////////////////////////////////////////////////
+	////////////////////////////////////////////////////////////////////////////
 
-	/* C double array to Python list<float> */
-	PyObject* PyTuple_out = PyTuple_New(3);
+	free(H); free(Aupp); free(Adia); free(Alow); free(B); free(P); free(Q);
+	return 0;
+}
 
-	// New mesh
-	PyObject* PyList_Ynew = PyList_New(L);
-    for (int j = 0; j < L; j++)
-    	PyList_SetItem(PyList_Ynew, j, PyFloat_FromDouble( Ynew[j] ));
-	PyTuple_SetItem(PyTuple_out, 0, PyList_Ynew);
-	// Polynomial coefficients
-	PyObject* PyList_A = PyList_New(N+1);
-    for (int j = 0; j < N+1; j++) {
-		PyObject* PyList_A_j = PyList_New(4);
-		for (int i = 0 ; i < 4 ; i++)
-			PyList_SetItem(PyList_A_j, i, PyFloat_FromDouble( A[j][i] ));
-    	PyList_SetItem(PyList_A, j, PyList_A_j);
+// <function inpsp_run>
+// 	@argument <int first> : 1 for the first derivative bounds (inpsp_cf),
+//		0 for the momentums (inpsp_cs)
+// 	@argument <PyObject* out> : writable buffer for Ynew, or None
+//
+//	@returns <PyObject* tuple{Ynew,A,M}> : outputs of inpsp_cs and inpsp_cf
+//
+// 	@description : conversion of the inputs and outputs of inpsp_cs and
+//		inpsp_cf (lists or buffers) around inpsp_core
+//
+static PyObject* inpsp_run(int first, PyObject* PyList_Xnew, PyObject* PyList_X, PyObject* PyList_Y, PyObject* PyFloat_Ci, PyObject* PyFloat_Cf, PyObject* out) {
+
+	/* Bounds */
+	double Ci = PyFloat_AsDouble(PyFloat_Ci);
+	double Cf = PyFloat_AsDouble(PyFloat_Cf);
+	if (PyErr_Occurred()) return NULL;
+
+	/* Inputs, without copies if they are buffers */
+	PyObject* objects[3] = {PyList_Xnew, PyList_X, PyList_Y};
+	doubles in[3];
+	int n = 0;
+	for ( ; n < 3 ; n++) {
+		if (doubles_get(objects[n], 1, 0, &in[n]) != 0) break;
+	}
+	if (n == 3 && in[1].N != in[2].N) PyErr_SetString(PyExc_ValueError, "X and Y must have the same length");
+	if (n < 3 || PyErr_Occurred()) {
+		for (int k = 0 ; k < n ; k++) doubles_release(&in[k]);
+		return NULL;
+	}
+	int L = (int) in[0].N;
+	int N = (int) in[1].N;
+	const double* X = in[1].data;
+	const double* Y = in[2].data;
+
+	/* Outputs, new (lists or buffers) and Ynew of the caller */
+	int list = in[0].list;
+	doubles ynew, a, m;
+	PyObject* results[3];
+	if (out == Py_None) {
+		results[0] = doubles_new(list, 1, L, 1, &ynew);
+	} else if (doubles_get(out, 1, 1, &ynew) == 0) {
+		results[0] = out;
+		Py_INCREF(out);
+		if (ynew.N != L) {
+			PyErr_SetString(PyExc_ValueError, "Output of a wrong length");
+			Py_CLEAR(results[0]);
+		}
+	} else {
+		results[0] = NULL;
+	}
+	results[1] = doubles_new(list, 2, N+1, 4, &a);
+	results[2] = doubles_new(list, 1, N+1, 1, &m);
+
+	////////////////////////////////////////////////////////////////////////////
+
+	int error = results[0] == NULL || results[1] == NULL || results[2] == NULL;
+	/* Numeric section without the GIL (the buffers are held until the end) */
+	if (!error) {
+		Py_BEGIN_ALLOW_THREADS
+		if (first && N > 1) {
+			// Momentums from the first derivatives, with the natural spline
+			error = inpsp_core(in[0].data, 0, X, Y, N, 0, 0, ynew.data, a.data, m.data) != 0;
+			double* M = m.data;
+			double Mi = M[1] * (X[1]-X[0])*(X[1]-X[0]) - 6 * (X[1]-X[0]) * Ci + 6 * (Y[1]-Y[0]) / (X[1]-X[0])*(X[1]-X[0]) + 6 * X[1] * X[0] - 3 * (X[0]*X[0] + X[1]*X[1]);
+			double Mf = -M[N-2] * (X[N-1]-X[N-2]) + 6 * (X[N-1]-X[N-2]) * Cf + 6 * (Y[N-1]-Y[N-2]) / ((X[N-1]-X[N-2])*(X[N-1]-X[N-2])) + 6 * X[N-1] * X[N-2] - 3 * (X[N-1]*X[N-1] + X[N-2]*X[N-2]);
+			Ci = Mi;
+			Cf = Mf;
+		}
+		if (!error)
+			error = inpsp_core(in[0].data, L, X, Y, N, Ci, Cf, ynew.data, a.data, m.data) != 0;
+		Py_END_ALLOW_THREADS
+		if (error) PyErr_NoMemory();
 	}
-	PyTuple_SetItem(PyTuple_out, 1, PyList_A);
-	// Momentums vector
-	PyObject* PyList_M = PyList_New(N+1);
-    for (int j = 0; j < N+1; j++)
-    	PyList_SetItem(PyList_M, j, PyFloat_FromDouble( M[j] ));
-	PyTuple_SetItem(PyTuple_out, 2, PyList_M);
+
+	////////////////////////////////////////////////////////////////////////////
+
+	for (int k = 0 ; k < 3 ; k++) doubles_release(&in[k]);
+	if (error) {
+		for (int k = 0 ; k < 3 ; k++) Py_XDECREF(results[k]);
+		doubles_release(&ynew);
+		doubles_release(&a);
+		doubles_release(&m);
+		return NULL;
+	}
+
+	/* C double array to Python list<float> (lists) or the buffers */
+	PyObject* PyTuple_out = PyTuple_New(3);
+	if (out != Py_None) {
+		doubles_release(&ynew);
+		PyTuple_SetItem(PyTuple_out, 0, results[0]);
+	} else {
+		PyTuple_SetItem(PyTuple_out, 0, doubles_result(results[0], &ynew));
+	}
+	PyTuple_SetItem(PyTuple_out, 1, doubles_result(results[1], &a));
+	PyTuple_SetItem(PyTuple_out, 2, doubles_result(results[2], &m));
 
 	/* Return */
-    return PyTuple_out;
+	return PyTuple_out;
+}
 
+// <function inpsp_cs>
+// 	@argument <PyObject* PyList_Xnew> : new mesh to be calculated
+// 	@argument <PyObject* PyList_X> : Known abscissa
+// 	@argument <PyObject* PyList_Y> : Known ordinate
+// 	@argument <PyObject* PyFloat_Mi> : initial momentum (second derivative)
+// 	@argument <PyObject* PyFloat_Mf> : final momentum (second derivative)
+//
+//	@returns <PyObject* tuple{PyList_Ynew,PyList_A,PyList_M}>
+//		@element <PyObject* PyList_Ynew> : new ordinate base on PyList_Xnew
+//		@element <PyObject* PyList_A> : polynomial coefficients
+//		@element <PyObject* PyList_M> : momentums
+//		(new buffers of doubles instead of lists if PyList_Xnew is a buffer)
+//
+// 	@description : interpolation of a set X,Y returning a new oversampled values
+//		for Y given X, the polynomial coefficients and the momentums. The bounds
+//		must be passed via M_i and M_f (initial and final momentums).
+//		Xnew, X and Y can be lists or buffers of doubles (numpy arrays,
+//		array.array, memoryview), the buffers are read without copies.
+//
+//	@name : inpsp_cs
+//		    |  |  ||
+//		    |  |  |Given second derivative value
+//		    |  |  Cubic
+//		    |  Spline
+//		    Interpolation
+//
+// 	@author : Daniel Ríos Linares
+//
+//	@version : 0.1.0 (July 7, 2017) - first coding
+//
+PyObject* inpsp_cs(
+    // New mesh to interpolate
+    PyObject* PyList_Xnew,
+    // Known X vs Y
+    PyObject* PyList_X,
+    PyObject* PyList_Y,
+    // Momentums, initial and final,typically will be both 0 (natural spline)
+    PyObject* PyFloat_Mi,
+    PyObject* PyFloat_Mf
+    ) {
+	return inpsp_run(0, PyList_Xnew, PyList_X, PyList_Y, PyFloat_Mi, PyFloat_Mf, Py_None);
+}
+
+// <function inpsp_cs_into>
+// 	@argument <PyObject* out> : writable buffer of doubles (length of
+//		PyList_Xnew) for Ynew, the rest of the arguments as inpsp_cs
+//
+//	@returns <PyObject* tuple{out,A,M}> : outputs of inpsp_cs with Ynew in out
+//
+PyObject* inpsp_cs_into(PyObject* PyList_Xnew, PyObject* PyList_X, PyObject* PyList_Y, PyObject* PyFloat_Mi, PyObject* PyFloat_Mf, PyObject* out) {
+	return inpsp_run(0, PyList_Xnew, PyList_X, PyList_Y, PyFloat_Mi, PyFloat_Mf, out);
 }
 /******************************************************************************/
 
@@ -227,7 +321,8 @@ PyObject* inpsp_cs(
 //
 // 	@description : interpolation of a set X,Y returning a new oversampled values
 //		for Y given X, the polynomial coefficients and the momentums. The bounds
-//		must be passed via Ci and Cf (first derivative).
+//		must be passed via Ci and Cf (first derivative). Xnew, X and Y can be
+//		lists or buffers of doubles as in inpsp_cs.
 //
 //	@name : inpsp_cf
 //		    |  |  ||
@@ -250,42 +345,16 @@ PyObject* inpsp_cf(
     PyObject* PyFloat_Ci,
     PyObject* PyFloat_Cf
     ) {
+	return inpsp_run(1, PyList_Xnew, PyList_X, PyList_Y, PyFloat_Ci, PyFloat_Cf, Py_None);
+}
 
-	/* Check list sizes */
-	int N = PyList_Size(PyList_X);
-
-	//
-	double Ci = PyFloat_AsDouble(PyFloat_Ci);
-	double Cf = PyFloat_AsDouble(PyFloat_Cf);
-
-
-	// Calculate from a fake Xnew (empty)
-	PyObject* PyList_fake_Xnew = PyList_New(0);
-	PyObject* PyTuple_in;
-	PyTuple_in = inpsp_cs(PyList_fake_Xnew, PyList_X, PyList_Y, PyFloat_FromDouble(0), PyFloat_FromDouble(0));
-
-	// Get momentums vector
-	PyObject* PyList_M;
-	PyList_M = PyTuple_GetItem(PyTuple_in, 2);
-	double M1 = PyFloat_AsDouble(PyList_GetItem(PyList_M, 1));
-	double X1 = PyFloat_AsDouble(PyList_GetItem(PyList_X, 1));
-	double X0 = PyFloat_AsDouble(PyList_GetItem(PyList_X, 0));
-	double Y1 = PyFloat_AsDouble(PyList_GetItem(PyList_Y, 1));
-	double Y0 = PyFloat_AsDouble(PyList_GetItem(PyList_Y, 0));
-	double Mi = M1 * (X1-X0)*(X1-X0) - 6 * (X1-X0) * Ci + 6 * (Y1-Y0) / (X1-X0)*(X1-X0) + 6 * X1 * X0 - 3 * (X0*X0 + X1*X1);
-	double MNm2 = PyFloat_AsDouble(PyList_GetItem(PyList_M, N-2));
-	double XNm1 = PyFloat_AsDouble(PyList_GetItem(PyList_X, N-1));
-	double XNm2 = PyFloat_AsDouble(PyList_GetItem(PyList_X, N-2));
-	double YNm1 = PyFloat_AsDouble(PyList_GetItem(PyList_Y, N-1));
-	double YNm2 = PyFloat_AsDouble(PyList_GetItem(PyList_Y, N-2));
-	double Mf = -MNm2 * (XNm1-XNm2) + 6 * (XNm1-XNm2) * Cf + 6 * (YNm1-YNm2) / ((XNm1-XNm2)*(XNm1-XNm2)) + 6 * XNm1 * XNm2 - 3 * (XNm1*XNm1 + XNm2*XNm2);
-
-	// Compute with the modified momentums
-	PyObject* PyTuple_out;
-	PyTuple_out = inpsp_cs(PyList_Xnew, PyList_X, PyList_Y, PyFloat_FromDouble(Mi), PyFloat_FromDouble(Mf));
-
-	// Return it
-	return PyTuple_out;
-
+// <function inpsp_cf_into>
+// 	@argument <PyObject* out> : writable buffer of doubles (length of
+//		PyList_Xnew) for Ynew, the rest of the arguments as inpsp_cf
+//
+//	@returns <PyObject* tuple{out,A,M}> : outputs of inpsp_cf with Ynew in out
+//
+PyObject* inpsp_cf_into(PyObject* PyList_Xnew, PyObject* PyList_X, PyObject* PyList_Y, PyObject* PyFloat_Ci, PyObject* PyFloat_Cf, PyObject* out) {
+	return inpsp_run(1, PyList_Xnew, PyList_X, PyList_Y, PyFloat_Ci, PyFloat_Cf, out);
 }
 /******************************************************************************/
@@ -28,3 +28,7 @@ PyObject* inpsp_cf(
     PyObject* PyFloat_Ci,
     PyObject* PyFloat_Cf
 	);
+
+/* Ynew written in the buffer out */
+PyObject* inpsp_cs_into(PyObject* PyList_Xnew, PyObject* PyList_X, PyObject* PyList_Y, PyObject* PyFloat_Mi, PyObject* PyFloat_Mf, PyObject* out);
+PyObject* inpsp_cf_into(PyObject* PyList_Xnew, PyObject* PyList_X, PyObject* PyList_Y, PyObject* PyFloat_Ci, PyObject* PyFloat_Cf, PyObject* out);
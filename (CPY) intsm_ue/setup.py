@@ -12,7 +12,10 @@ instant.build.build_module(modulename = "intsm_ue_c",
 	arrays = [['N','X'],['M','Y']],
 	include_dirs = [np.get_include()],
 	system_headers = ['numpy/arrayobject.h'],
-	init_code = 'import_array();'
+	init_code = 'import_array();',
+	# default arguments of instant plus -threads, the GIL is released while
+	# the C function runs (the arrays are converted before)
+	swigargs = ['-c++', '-fcompact', '-O', '-I.', '-small', '-threads']
 	)
 
 # Test it
@@ -3,13 +3,31 @@
 /* Python C API */
 #include <Python.h>
 
+/* Batched functions (buffers of doubles) */
+#include <float.h>
+#include <math.h>
+#include <stdlib.h>
+#include <string.h>
+
+/* Buffer protocol inputs and outputs (lists are the slow path) */
+#include "pybuffer.h"
+
+/* Header file */
+#include "mxinv_gj.h"
+
+/* Internal functions */
+static int gauss_jordan(double* A, double* X, int N, int R, double* scales);
+static void singular_scales(double* A, int N, double* scales);
+
 // <function mxinv_gj(PyObject* list)>
-// 	@argument <PyObject* list> : N x N matrix to do the inversion
+// 	@argument <PyObject* list> : N x N matrix to do the inversion (list of
+//		lists or 2D buffer of doubles, read without copies)
 //
-// 	@returns <PyObject* B> : N x N matrix inverse of <PyObject* list>
+// 	@returns <PyObject* B> : N x N matrix inverse of <PyObject* list> (a list
+//		of lists, or a new 2D buffer of doubles for buffer inputs)
 //
-// 	@description : invert the input matrix with Gauss-Jordan algorithm by full
-//		pivoting of a secondary matrix B
+// 	@description : invert the input matrix with Gauss-Jordan algorithm by
+//		partial pivoting, ValueError if the matrix is singular
 //
 //	@name : mxinv_gj
 //		    |     |
@@ -26,77 +44,336 @@
 // 		   2002, chapter 2, Gauss-Jordan Elimination, pages 36-43
 //
 PyObject* mxinv_gj(PyObject* list) {
+	return mxinv_gj_into(list, Py_None);
+}
+
+// <function mxinv_gj_into(PyObject* list, PyObject* out)>
+// 	@argument <PyObject* list> : N x N matrix to do the inversion
+// 	@argument <PyObject* out> : writable 2D buffer N x N of doubles for the
+//		inverse, or None for a new one (a list if the input is a list)
+//
+// 	@returns <PyObject* out> : the inverse
+//
+// 	@description : mxinv_gj writing the inverse in a buffer of the caller,
+//		only a work copy of the matrix is allocated (in the heap)
+//
+PyObject* mxinv_gj_into(PyObject* list, PyObject* out) {
 
-	/* Check list size */
-	int N = PyList_Size(list);
+	/* Input, without copies if it is a buffer */
+	doubles a;
+	if (doubles_get(list, 2, 0, &a) != 0) return NULL;
+	int N = (int) a.N;
+	if (a.M != N && N > 0) {
+		PyErr_SetString(PyExc_ValueError, "Matrix N x M is not invertable");
+		doubles_release(&a);
+		return NULL;
+	}
 
-	/* Declare array */
-	double A[N][N];
+	/* Output, new (list or buffer) or of the caller */
+	doubles b;
+	PyObject* result;
+	if (out == Py_None) {
+		result = doubles_new(a.list, 2, N, N, &b);
+	} else if (doubles_get(out, 2, 1, &b) == 0) {
+		result = out;
+		Py_INCREF(out);
+		if (b.N != N || (N > 0 && b.M != N)) {
+			PyErr_SetString(PyExc_ValueError, "Output of a wrong shape");
+			Py_CLEAR(result);
+		}
+	} else {
+		result = NULL;
+	}
 
-	/* Python list<float> to C double array */
-	for (int i = 0 ; i < N ; i++) {
-		for (int j = 0 ; j < N ; j++)
-			A[i][j] = PyFloat_AsDouble(PyList_GetItem(PyList_GetItem(list, i), j));
+	/* Work matrix and scales of its rows and columns */
+	double* W = malloc(sizeof(double)*(N*N+2*N > 0 ? N*N+2*N : 1));
+	if (result == NULL || W == NULL) {
+		if (result != NULL) PyErr_NoMemory();
+		Py_XDECREF(result);
+		doubles_release(&b);
+		doubles_release(&a);
+		free(W);
+		return NULL;
 	}
-	/* End of Python list fill */
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* Declare output array */
-	double B[N][N];
+	// The inverse is the solution of A X = I
+	double* B = b.data;
+	int singular;
+	Py_BEGIN_ALLOW_THREADS
+	memcpy(W, a.data, sizeof(double)*N*N);
+	for (int i = 0 ; i < N*N ; i++) B[i] = (i % (N+1) == 0) ? 1.0 : 0.0;
+	singular_scales(W, N, W+N*N);
+	singular = gauss_jordan(W, B, N, N, W+N*N);
+	Py_END_ALLOW_THREADS
 
-	// A is the input array
-	for (int i = 0 ; i < N ; i++) {
-		B[i][i] = 1;
+	////////////////////////////////////////////////////////////////////////////
+
+	free(W);
+	doubles_release(&a);
+	if (singular) {
+		PyErr_SetString(PyExc_ValueError, "Singular matrix");
+		Py_XDECREF(result);
+		doubles_release(&b);
+		return NULL;
 	}
+	if (out != Py_None) {
+		doubles_release(&b);
+		return result;
+	}
+	return doubles_result(result, &b);
+}
+
+// <function batch_buffer(PyObject* object, Py_buffer* view, int flags, int ndim)>
+// 	@returns <int> : 0 if object exports a C contiguous buffer of doubles
+//		with ndim dimensions (or 2 and 3 if ndim is 0) in view, -1 with the
+//		Python exception set if not
+//
+static int batch_buffer(PyObject* object, Py_buffer* view, int flags, int ndim) {
+	if (PyObject_GetBuffer(object, view, flags | PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) != 0)
+		return -1;
+	if (view->itemsize != sizeof(double) || !doubles_format(view->format)) {
+		PyErr_SetString(PyExc_ValueError, "Buffer of doubles (float64) required");
+		PyBuffer_Release(view);
+		return -1;
+	}
+	if ((ndim != 0 && view->ndim != ndim) || (ndim == 0 && view->ndim != 2 && view->ndim != 3)) {
+		PyErr_SetString(PyExc_ValueError, "Buffer with a wrong number of dimensions");
+		PyBuffer_Release(view);
+		return -1;
+	}
+	return 0;
+}
+
+// <function gauss_jordan(double* A, double* X, int N, int R, double* scales)>
+// 	@argument <double* A> : N x N matrix (row major), destroyed
+// 	@argument <double* X> : N x R right hand sides (row major), replaced by
+//		the solution of A X = B
+// 	@argument <double* scales> : the 2 N scales of singular_scales, the rows
+//		are swapped with the rows of A
+//
+// 	@returns <int> : 1 if a pivot is not finite or under the scales of both
+//		its original row and its column (singular), 0 if not
+//
+// 	@description : Gauss-Jordan elimination by partial pivoting, only the
+//		columns at the right of the pivot are eliminated (A becomes the
+//		identity without computing it)
+//
+static int gauss_jordan(double* A, double* X, int N, int R, double* scales) {
+
+	double* rows = scales;
+	double* columns = scales+N;
 
-	// Matrix inversion (Gauss-Jordan method)
 	for (int j = 0 ; j < N ; j++) {
 
-		for (int i = j ; i < N ; i++) {
-
-			if (A[i][j] != 0) {
-				// Swap rows i,j
-				for (int k = 0 ; k < N ; k++) {
-					double tempA = A[j][k];
-					A[j][k] = A[i][k];
-					A[i][k] = tempA;
-					double tempB = B[j][k];
-					B[j][k] = B[i][k];
-					B[i][k] = tempB;
-				}
+		// Partial pivoting, row with the largest |A[i][j]|
+		int p = j;
+		for (int i = j+1 ; i < N ; i++) {
+			if (fabs(A[i*N+j]) > fabs(A[p*N+j])) p = i;
+		}
+		double pivot = fabs(A[p*N+j]);
+		if (!(pivot > fmin(rows[p], columns[j]) && pivot <= DBL_MAX)) return 1;
+		if (p != j) {
+			double temp = rows[j];
+			rows[j] = rows[p];
+			rows[p] = temp;
+			for (int k = j ; k < N ; k++) {
+				double temp = A[j*N+k];
+				A[j*N+k] = A[p*N+k];
+				A[p*N+k] = temp;
 			}
-			double d = A[j][j];
-
-			for (int k = 0 ; k < N ; k++) {
-				A[j][k] /= d;
-				B[j][k] /= d;
+			for (int k = 0 ; k < R ; k++) {
+				double temp = X[j*R+k];
+				X[j*R+k] = X[p*R+k];
+				X[p*R+k] = temp;
 			}
+		}
 
-			for (int l = 0 ; l < N ; l++) {
-				if (l != j) {
-					d = -A[l][j];
-					for (int k = 0 ; k < N ; k++) {
-						A[l][k] += A[j][k] * d;
-						B[l][k] += B[j][k] * d;
-					}
-				}
+		// Normalize the pivot row
+		double d = 1.0/A[j*N+j];
+		for (int k = j+1 ; k < N ; k++) A[j*N+k] *= d;
+		for (int k = 0 ; k < R ; k++) X[j*R+k] *= d;
+
+		// Eliminate the column j of the other rows
+		for (int l = 0 ; l < N ; l++) {
+			if (l != j && A[l*N+j] != 0) {
+				d = A[l*N+j];
+				for (int k = j+1 ; k < N ; k++) A[l*N+k] -= d*A[j*N+k];
+				for (int k = 0 ; k < R ; k++) X[l*R+k] -= d*X[j*R+k];
 			}
 		}
 	}
+	return 0;
+}
+
+// <function singular_scales(double* A, int N, double* scales)>
+// 	@argument <double* scales> : 2 N doubles, it receives N eps max|A| of
+//		each row and then of each column of A
+//
+// 	@description : a pivot under the scales of both its original row and its
+//		column is singular, the criterion doesn't depend on the scale of the
+//		rows or of the columns (diag(1e20,1) isn't singular), the same of
+//		the pure Python mxinv_gj, solve, LU and batched functions
+//
+static void singular_scales(double* A, int N, double* scales) {
+	for (int i = 0 ; i < 2*N ; i++) scales[i] = 0;
+	for (int i = 0 ; i < N ; i++) {
+		for (int j = 0 ; j < N ; j++) {
+			double a = fabs(A[i*N+j]);
+			if (a > scales[i]) scales[i] = a;
+			if (a > scales[N+j]) scales[N+j] = a;
+		}
+	}
+	for (int i = 0 ; i < 2*N ; i++) scales[i] *= N*DBL_EPSILON;
+}
+
+// <function mxinv_gj_batch(PyObject* matrices, PyObject* inverses)>
+// 	@argument <PyObject* matrices> : buffer K x N x N of doubles (a C
+//		contiguous numpy array for example), stack of matrices
+// 	@argument <PyObject* inverses> : writable buffer K x N x N of doubles,
+//		it receives the inverses (NaN for the singular matrices), it can be
+//		the same buffer of matrices
+//
+// 	@returns <PyObject* mask> : bytes of length K, 1 for the singular matrices
+//
+// 	@description : invert the K matrices of the stack in a single call,
+//		without the conversion of each element to a Python object, a singular
+//		matrix doesn't stop the batch
+//
+// 	@author : Daniel Ríos Linares
+//
+PyObject* mxinv_gj_batch(PyObject* matrices, PyObject* inverses) {
+
+	/* Input and output buffers */
+	Py_buffer a, b;
+	if (batch_buffer(matrices, &a, PyBUF_SIMPLE, 3) != 0) return NULL;
+	if (batch_buffer(inverses, &b, PyBUF_WRITABLE, 3) != 0) {
+		PyBuffer_Release(&a);
+		return NULL;
+	}
+	int K = (int) a.shape[0], N = (int) a.shape[1];
+	if (a.shape[2] != N || b.shape[0] != K || b.shape[1] != N || b.shape[2] != N) {
+		PyErr_SetString(PyExc_ValueError, "Buffers of shape K x N x N required");
+		PyBuffer_Release(&a);
+		PyBuffer_Release(&b);
+		return NULL;
+	}
+
+	/* Work matrix (with the scales of its rows and columns) and singular mask */
+	PyObject* mask = PyBytes_FromStringAndSize(NULL, K);
+	double* W = malloc(sizeof(double)*(N*N+2*N > 0 ? N*N+2*N : 1));
+	if (mask == NULL || W == NULL) {
+		Py_XDECREF(mask);
+		free(W);
+		PyBuffer_Release(&a);
+		PyBuffer_Release(&b);
+		return PyErr_NoMemory();
+	}
+	char* singular = PyBytes_AS_STRING(mask);
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* C double array to Python list<float> */
-	PyObject* result = PyList_New(N);
+	// Each inverse is the solution of A X = I, without the GIL (the buffers
+	// and the mask are held by this call)
+	Py_BEGIN_ALLOW_THREADS
+	for (int k = 0 ; k < K ; k++) {
+		double* A = (double*) a.buf + (size_t) k*N*N;
+		double* X = (double*) b.buf + (size_t) k*N*N;
+		memcpy(W, A, sizeof(double)*N*N);
+		for (int i = 0 ; i < N*N ; i++) X[i] = (i % (N+1) == 0) ? 1.0 : 0.0;
+		singular_scales(W, N, W+N*N);
+		singular[k] = (char) gauss_jordan(W, X, N, N, W+N*N);
+		if (singular[k]) {
+			for (int i = 0 ; i < N*N ; i++) X[i] = NAN;
+		}
+	}
+	Py_END_ALLOW_THREADS
 
-	for (int i = 0 ; i < N ; i++) {
-		PyObject* result_i = PyList_New(N);
-		for (int j = 0 ; j < N ; j++)
-			PyList_SetItem(result_i, j, PyFloat_FromDouble(B[i][j]));
-		PyList_SetItem(result, i, result_i);
+	////////////////////////////////////////////////////////////////////////////
+
+	free(W);
+	PyBuffer_Release(&a);
+	PyBuffer_Release(&b);
+	return mask;
+}
+
+// <function mxinv_gj_solve_batch(PyObject* matrices, PyObject* rhs, PyObject* solutions)>
+// 	@argument <PyObject* matrices> : buffer K x N x N of doubles, stack of
+//		matrices
+// 	@argument <PyObject* rhs> : buffer K x N (vectors) or K x N x R (matrices)
+//		of doubles, right hand sides
+// 	@argument <PyObject* solutions> : writable buffer of doubles with the
+//		shape of rhs, it receives the solutions of A X = B (NaN for the
+//		singular matrices), it can be the same buffer of rhs
+//
+// 	@returns <PyObject* mask> : bytes of length K, 1 for the singular matrices
+//
+// 	@description : solve the K systems of the stack in a single call, with
+//		Gauss-Jordan elimination of the right hand sides (the inverses aren't
+//		formed), a singular matrix doesn't stop the batch
+//
+// 	@author : Daniel Ríos Linares
+//
+PyObject* mxinv_gj_solve_batch(PyObject* matrices, PyObject* rhs, PyObject* solutions) {
+
+	/* Input and output buffers */
+	Py_buffer a, b, x;
+	if (batch_buffer(matrices, &a, PyBUF_SIMPLE, 3) != 0) return NULL;
+	if (batch_buffer(rhs, &b, PyBUF_SIMPLE, 0) != 0) {
+		PyBuffer_Release(&a);
+		return NULL;
+	}
+	if (batch_buffer(solutions, &x, PyBUF_WRITABLE, b.ndim) != 0) {
+		PyBuffer_Release(&a);
+		PyBuffer_Release(&b);
+		return NULL;
+	}
+	int K = (int) a.shape[0], N = (int) a.shape[1];
+	int R = b.ndim == 3 ? (int) b.shape[2] : 1;
+	if (a.shape[2] != N || b.shape[0] != K || b.shape[1] != N || b.len != x.len) {
+		PyErr_SetString(PyExc_ValueError, "Buffers of shape K x N x N and K x N (x R) required");
+		PyBuffer_Release(&a);
+		PyBuffer_Release(&b);
+		PyBuffer_Release(&x);
+		return NULL;
 	}
-	/* End of Python list fill */
 
-    return result;
+	/* Work matrix (with the scales of its rows and columns) and singular mask */
+	PyObject* mask = PyBytes_FromStringAndSize(NULL, K);
+	double* W = malloc(sizeof(double)*(N*N+2*N > 0 ? N*N+2*N : 1));
+	if (mask == NULL || W == NULL) {
+		Py_XDECREF(mask);
+		free(W);
+		PyBuffer_Release(&a);
+		PyBuffer_Release(&b);
+		PyBuffer_Release(&x);
+		return PyErr_NoMemory();
+	}
+	char* singular = PyBytes_AS_STRING(mask);
+
+	////////////////////////////////////////////////////////////////////////////
+
+	Py_BEGIN_ALLOW_THREADS
+	for (int k = 0 ; k < K ; k++) {
+		double* A = (double*) a.buf + (size_t) k*N*N;
+		double* B = (double*) b.buf + (size_t) k*N*R;
+		double* X = (double*) x.buf + (size_t) k*N*R;
+		memcpy(W, A, sizeof(double)*N*N);
+		if (X != B) memcpy(X, B, sizeof(double)*N*R);
+		singular_scales(W, N, W+N*N);
+		singular[k] = (char) gauss_jordan(W, X, N, R, W+N*N);
+		if (singular[k]) {
+			for (int i = 0 ; i < N*R ; i++) X[i] = NAN;
+		}
+	}
+	Py_END_ALLOW_THREADS
+
+	////////////////////////////////////////////////////////////////////////////
+
+	free(W);
+	PyBuffer_Release(&a);
+	PyBuffer_Release(&b);
+	PyBuffer_Release(&x);
+	return mask;
 }
@@ -2,3 +2,6 @@
 
 /* mxinv_gj.c functions */
 PyObject* mxinv_gj(PyObject* list);
+PyObject* mxinv_gj_into(PyObject* list, PyObject* out);
+PyObject* mxinv_gj_batch(PyObject* matrices, PyObject* inverses);
+PyObject* mxinv_gj_solve_batch(PyObject* matrices, PyObject* rhs, PyObject* solutions);
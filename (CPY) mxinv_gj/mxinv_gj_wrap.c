@@ -3034,9 +3034,72 @@ fail:
 }
 
 
+SWIGINTERN PyObject *_wrapmxinv_gj_batch(PyObject *SWIGUNUSEDPARM(self), PyObject *args) {
+  PyObject *resultobj = 0;
+  PyObject *arg1 = (PyObject *) 0 ;
+  PyObject *arg2 = (PyObject *) 0 ;
+  PyObject * obj0 = 0 ;
+  PyObject * obj1 = 0 ;
+  PyObject *result = 0 ;
+  
+  if (!PyArg_ParseTuple(args,(char *)"OO:mxinv_gj_batch",&obj0,&obj1)) SWIG_fail;
+  arg1 = obj0;
+  arg2 = obj1;
+  result = (PyObject *)mxinv_gj_batch(arg1,arg2);
+  resultobj = result;
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrapmxinv_gj_solve_batch(PyObject *SWIGUNUSEDPARM(self), PyObject *args) {
+  PyObject *resultobj = 0;
+  PyObject *arg1 = (PyObject *) 0 ;
+  PyObject *arg2 = (PyObject *) 0 ;
+  PyObject *arg3 = (PyObject *) 0 ;
+  PyObject * obj0 = 0 ;
+  PyObject * obj1 = 0 ;
+  PyObject * obj2 = 0 ;
+  PyObject *result = 0 ;
+  
+  if (!PyArg_ParseTuple(args,(char *)"OOO:mxinv_gj_solve_batch",&obj0,&obj1,&obj2)) SWIG_fail;
+  arg1 = obj0;
+  arg2 = obj1;
+  arg3 = obj2;
+  result = (PyObject *)mxinv_gj_solve_batch(arg1,arg2,arg3);
+  resultobj = result;
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrapmxinv_gj_into(PyObject *SWIGUNUSEDPARM(self), PyObject *args) {
+  PyObject *resultobj = 0;
+  PyObject *arg1 = (PyObject *) 0 ;
+  PyObject *arg2 = (PyObject *) 0 ;
+  PyObject * obj0 = 0 ;
+  PyObject * obj1 = 0 ;
+  PyObject *result = 0 ;
+  
+  if (!PyArg_ParseTuple(args,(char *)"OO:mxinv_gj_into",&obj0,&obj1)) SWIG_fail;
+  arg1 = obj0;
+  arg2 = obj1;
+  result = (PyObject *)mxinv_gj_into(arg1,arg2);
+  resultobj = result;
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
 static PyMethodDef SwigMethods[] = {
 	 { (char *)"SWIG_PyInstanceMethod_New", (PyCFunction)SWIG_PyInstanceMethod_New, METH_O, NULL},
 	 { (char *)"mxinv_gj", _wrapmxinv_gj, METH_VARARGS, NULL},
+	 { (char *)"mxinv_gj_batch", _wrapmxinv_gj_batch, METH_VARARGS, NULL},
+	 { (char *)"mxinv_gj_solve_batch", _wrapmxinv_gj_solve_batch, METH_VARARGS, NULL},
+	 { (char *)"mxinv_gj_into", _wrapmxinv_gj_into, METH_VARARGS, NULL},
 	 { NULL, NULL, 0, NULL }
 };
 
@@ -6,15 +6,24 @@
 /* Python C API */
 #include <Python.h>
 
+/* Buffer protocol inputs and outputs (lists are the slow path) */
+#include "pybuffer.h"
+
+/* Header file */
+#include "slesv_tr.h"
+
 
 // <function slesv_tr(PyObject* list)>
 // 	@argument <PyObject* list1> : input Python list 1 (C API)
 // 	@argument <PyObject* list2> : input Python list 2 (C API)
 // 	@argument <PyObject* list2> : input Python list 3 (C API)
 //
-//	@returns <PyObject* list> : output Python list (C API)
+//	@returns <PyObject* list> : output Python list (C API), a new buffer of
+//		doubles if the inputs are buffers
 //
-// 	@description : Python list treatment of 1 input list with 1 new output list
+// 	@description : Python list treatment of 1 input list with 1 new output list,
+//		the inputs can also be buffers of doubles (numpy arrays, array.array,
+//		memoryview), they are read without copies
 //
 //	@name : input_3x_PyList1D__output_1x_PyList1D
 //		    |     |  |       |      |  |
@@ -30,65 +39,111 @@
 //	@version : 0.1.0 July 9, 2017
 //
 PyObject* slesv_tr(PyObject* list1, PyObject* list2, PyObject* list3, PyObject* list4) {
+	return slesv_tr_into(list1, list2, list3, list4, Py_None);
+}
 
-	/* Check list size */
-	int N = PyList_Size(list1);
-
-	/* Declare arrays */
-	double Aupp[N];
-	double Adia[N];
-	double Alow[N];
-	double B[N];
-
-	/* Python list<float> to C double array */
-	for (int i = 0 ; i < N ; i++)
-		Aupp[i] = PyFloat_AsDouble(PyList_GetItem(list1, (Py_ssize_t) i));
-	for (int i = 0 ; i < N ; i++)
-		Adia[i] = PyFloat_AsDouble(PyList_GetItem(list2, (Py_ssize_t) i));
-	for (int i = 0 ; i < N ; i++)
-		Alow[i] = PyFloat_AsDouble(PyList_GetItem(list3, (Py_ssize_t) i));
-	for (int i = 0 ; i < N ; i++)
-		B[i] = PyFloat_AsDouble(PyList_GetItem(list4, (Py_ssize_t) i));
-	/* End of Python list fill */
-
-	////////////////////////////////////////////////////////////////////////////
-
-	/* Declare output array */
-	double X[N];
+// <function slesv_tr_into(PyObject* list1, PyObject* list2, PyObject* list3,
+//		PyObject* list4, PyObject* out)>
+// 	@argument <PyObject* list1>, ..., <PyObject* list4> : Aupp, Adia, Alow and
+//		B (lists or buffers of doubles)
+// 	@argument <PyObject* out> : writable buffer of N doubles for the solution,
+//		or None for a new one (a list if the inputs are lists)
+//
+//	@returns <PyObject* out> : the solution X
+//
+// 	@description : slesv_tr writing the solution in a buffer of the caller,
+//		the inputs aren't modified (Alow[0] and Aupp[N-1] are taken as 0)
+//
+PyObject* slesv_tr_into(PyObject* list1, PyObject* list2, PyObject* list3, PyObject* list4, PyObject* out) {
+
+	/* Inputs, without copies if they are buffers */
+	PyObject* objects[4] = {list1, list2, list3, list4};
+	doubles in[4];
+	int n = 0;
+	for ( ; n < 4 ; n++) {
+		if (doubles_get(objects[n], 1, 0, &in[n]) != 0) break;
+		if (in[n].N != in[0].N) {
+			PyErr_SetString(PyExc_ValueError, "Aupp, Adia, Alow and B must have the same length");
+			n++;
+			break;
+		}
+	}
+	if (n < 4 || PyErr_Occurred()) {
+		for (int k = 0 ; k < n ; k++) doubles_release(&in[k]);
+		return NULL;
+	}
+	double* Aupp = in[0].data;
+	double* Adia = in[1].data;
+	double* Alow = in[2].data;
+	double* B = in[3].data;
+	int N = (int) in[0].N;
+
+	/* Output, new (list or buffer) or of the caller */
+	doubles x;
+	PyObject* result;
+	if (out == Py_None) {
+		result = doubles_new(in[0].list, 1, N, 1, &x);
+	} else if (doubles_get(out, 1, 1, &x) == 0) {
+		result = out;
+		Py_INCREF(out);
+		if (x.N != N) {
+			PyErr_SetString(PyExc_ValueError, "Output of a wrong length");
+			Py_CLEAR(result);
+		}
+	} else {
+		result = NULL;
+	}
 
 	/* Temporal arrays */
-	double P[N];
-	double Q[N];
-
-	// Alow[0] and Aupp[-1] are 0 (this must be met)
-	Alow[0] = 0;
-	Aupp[N-1] = 0;
-
-	// P[0] and Q[0] are known because Alow[0] = 0 always
-	P[0] = - Aupp[0] / Adia[0];
-	Q[0] = B[0] / Adia[0];
-
-	// Obtain temporal vectors of gaussian elimination
-	for (int i = 1 ; i < N ; i++) {
-		P[i] = - Aupp[i] / (Adia[i] + Alow[i] * P[i-1]);
-		Q[i] = (B[i] - Alow[i] * Q[i-1]) / (Adia[i] + Alow[i] * P[i-1]);
+	double* P = malloc(sizeof(double) * (N > 0 ? N : 1));
+	double* Q = malloc(sizeof(double) * (N > 0 ? N : 1));
+	if (result == NULL || P == NULL || Q == NULL) {
+		if (result != NULL) PyErr_NoMemory();
+		Py_XDECREF(result);
+		doubles_release(&x);
+		free(P);
+		free(Q);
+		for (int k = 0 ; k < 4 ; k++) doubles_release(&in[k]);
+		return NULL;
 	}
 
-	// X[-1] is known because Aupp[-1] = 0 -> P[-1] = 0
-	X[N-1] = Q[N-1];
+	////////////////////////////////////////////////////////////////////////////
 
-	// X[i] is obtainable from X[-1]
-	for (int i = N-2 ; i >= 0 ; i--)
-		X[i] = P[i] * X[i+1] + Q[i];
+	/* Declare output array */
+	double* X = x.data;
+
+	/* Numeric loops without the GIL (the buffers are held until the end) */
+	Py_BEGIN_ALLOW_THREADS
+	if (N > 0) {
+		// P[0] and Q[0] are known because Alow[0] = 0 always
+		P[0] = - (N > 1 ? Aupp[0] : 0) / Adia[0];
+		Q[0] = B[0] / Adia[0];
+
+		// Obtain temporal vectors of gaussian elimination (Aupp[N-1] = 0)
+		for (int i = 1 ; i < N ; i++) {
+			P[i] = - (i < N-1 ? Aupp[i] : 0) / (Adia[i] + Alow[i] * P[i-1]);
+			Q[i] = (B[i] - Alow[i] * Q[i-1]) / (Adia[i] + Alow[i] * P[i-1]);
+		}
+
+		// X[-1] is known because Aupp[-1] = 0 -> P[-1] = 0
+		X[N-1] = Q[N-1];
+
+		// X[i] is obtainable from X[-1]
+		for (int i = N-2 ; i >= 0 ; i--)
+			X[i] = P[i] * X[i+1] + Q[i];
+	}
+	Py_END_ALLOW_THREADS
 
 	////////////////////////////////////////////////////////////////////////////
 
-	/* C double array to Python list<float> */
-	PyObject* result = PyList_New(N);
+	free(P);
+	free(Q);
+	for (int k = 0 ; k < 4 ; k++) doubles_release(&in[k]);
 
-    for (int i = 0; i < N; i++)
-    	PyList_SetItem(result, i, PyFloat_FromDouble(X[i]));
-	/* End of Python list fill */
-
-    return result;
+	/* Solution, a Python list<float> for list inputs */
+	if (out != Py_None) {
+		doubles_release(&x);
+		return result;
+	}
+	return doubles_result(result, &x);
 }
@@ -2,3 +2,4 @@
 
 /* slesv_tr.c functions */
 extern PyObject* slesv_tr(PyObject* list1, PyObject* list2, PyObject* list3, PyObject* list4);
+extern PyObject* slesv_tr_into(PyObject* list1, PyObject* list2, PyObject* list3, PyObject* list4, PyObject* out);
@@ -31,6 +31,9 @@ subroutine inpsp_cs(new_X, X, Y, M_i, M_f, N, L, new_Y, A, M)
 
 	implicit none
 
+	! Without the GIL of Python (no callbacks), the calls can run in threads
+	!f2py threadsafe
+
 	! Input settings
 	integer								:: N,L ! Number of points to interpolate
 
@@ -231,6 +234,9 @@ subroutine inpsp_cf(new_X, X, Y, C_i, C_f, N, L, new_Y, A, M)
 
 	implicit none
 
+	! Without the GIL of Python (no callbacks), the calls can run in threads
+	!f2py threadsafe
+
 	! Input settings
 	integer								:: N,L ! Number of points to interpolate
 
@@ -301,6 +307,9 @@ subroutine slesv_tr(Aupp, Adia, Alow, B, N, X)
 
 	implicit none
 
+	! Without the GIL of Python (no callbacks), the calls can run in threads
+	!f2py threadsafe
+
 	! Input settings
 	integer								:: N ! Number of diagonal coefficients
 
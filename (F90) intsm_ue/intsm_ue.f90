@@ -7,6 +7,9 @@ subroutine intsm_ue(X, Y, N, inte)
 
 	implicit none
 
+	! Without the GIL of Python (no callbacks), the calls can run in threads
+	!f2py threadsafe
+
 	! Output variables
 	real, intent(out)					:: inte
 
@@ -4,6 +4,9 @@
 subroutine mxinv_gj(C,N,B)
 
 	implicit none
+
+	! Without the GIL of Python (no callbacks), the calls can run in threads
+	!f2py threadsafe
 	! i : row, j : column, k : column, l : row, N is size of the matrix
 	integer								:: i, j, k, l, N
 
@@ -51,6 +51,9 @@ subroutine slesv_pt(Aupp2, Aupp, Adia, Alow, Alow2, B, N, X)
 
 	implicit none
 
+	! Without the GIL of Python (no callbacks), the calls can run in threads
+	!f2py threadsafe
+
 	! Input settings
 	integer								:: N ! Number of diagonal coefficients
 
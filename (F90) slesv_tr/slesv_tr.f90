@@ -44,6 +44,9 @@ subroutine slesv_tr(Aupp, Adia, Alow, B, N, X)
 
 	implicit none
 
+	! Without the GIL of Python (no callbacks), the calls can run in threads
+	!f2py threadsafe
+
 	! Input settings
 	integer								:: N ! Number of diagonal coefficients
 
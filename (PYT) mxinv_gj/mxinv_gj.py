@@ -3,29 +3,50 @@
 """
 mxinv_gj
 	@version : 0.1.0
+
 	@author : Daniel Ríos Linares (c) 2017, hasbornasu@gmail.com
 	@description : A simple program to demonstrate Gauss-Jordan pivoting method
-		of square matrix inversion
+		of square matrix inversion, and of the solution of linear systems
+		without the inverse (solve), or with a reusable LU factorization (LU),
+		and of stacks of small matrices at once (mxinv_gj_batch, solve_batch)
+
 	@license : GPL-3.0
 		This program is free software: you can redistribute it and/or modify
 		it under the terms of the GNU General Public License as published by
 		the Free Software Foundation, either version 3 of the License, or
 		(at your option) any later version.
+
 		This program is distributed in the hope that it will be useful,
 		but WITHOUT ANY WARRANTY; without even the implied warranty of
 		MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 		GNU General Public License for more details.
+
 		You should have received a copy of the GNU General Public License
 		along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+# Compact storage of the LU factors
+from array import array
+from operator import mul
+import sys
+
+# Optional, only for the batched functions (stacks of matrices)
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
 # <function mxinv_gj>
 # 	@argument <list C> : N x N matrix to do the inversion
+# 	@argument *inplace : if True C (a list of lists) is overwritten with its
+#		inverse, without copies
 #
 # 	@returns <list A> : N x N matrix inverse of <list C>
 #
-# 	@description : invert the input matrix with Gauss-Jordan algorithm by full
-#		pivoting of a secondary matrix B
+# 	@description : invert the input matrix with Gauss-Jordan algorithm by
+#		partial pivoting (the largest pivot of each column), the inverse is
+#		built over the same matrix, the row swaps are undone at the end as
+#		column swaps, O(N^3) operations done row by row
 #
 # 	@author : Daniel Ríos Linares
 #
@@ -34,39 +55,396 @@ mxinv_gj
 #		    |     Gauss-Jordan algorithm (pivoting)
 #		    Matrix inversion
 #
-#	@version : 0.1.0 September 21, 2017
+#	@version : 0.2.0
 #
 # 	@references :
 # 		1) William H. Press, Saul A. TeuKolsky, W.T. Vetterling & B.P. Flannery
 #          Numerical recipes in C - The art of Scientific Computing 2nd Edition
 # 		   2002, chapter 2, Gauss-Jordan Elimination, pages 36-43
 #
-def mxinv_gj(C):
+def mxinv_gj(C, inplace=False):
 
 	N = len(C)
-	M = len(C[0])
+	M = len(C[0]) if N > 0 else 0
+	if N != M:
+		raise RivpyMatrixcalcError("Matrix N x M is not invertable, N = " + str(N) + ", M = " + str(M))
+
+	A = C if inplace else [[float(C[i][j]) for j in range(N)] for i in range(N)]
+	swaps = []
+	rows,columns = singular_scales(A)
+
+	for j in range(N):
+		# Partial pivoting, row with the largest |A[i][j]|
+		p = max(range(j,N), key=lambda i: abs(A[i][j]))
+		if singular_pivot(A[p][j], rows[p], columns[j]):
+			raise RivpyMatrixcalcError("Singular matrix")
+		if p != j:
+			A[j],A[p] = A[p],A[j]
+			rows[j],rows[p] = rows[p],rows[j]
+			swaps.append((j,p))
+
+		# Normalize the pivot row, the pivot is replaced by the column j of
+		# the inverse
+		Aj = A[j]
+		d = 1.0/Aj[j]
+		Aj[j] = 1.0
+		Aj[:] = [a*d for a in Aj]
+
+		# Eliminate the column j of the other rows
+		for l in range(N):
+			if l != j:
+				Al = A[l]
+				d = Al[j]
+				if d != 0:
+					Al[j] = 0.0
+					Al[:] = [a-d*b for a,b in zip(Al,Aj)]
+
+	# Undo the row swaps as column swaps (in reverse order)
+	for j,p in reversed(swaps):
+		for Al in A:
+			Al[j],Al[p] = Al[p],Al[j]
+	return A
+# End of <function mxinv_gj>
+
+# <function solve>
+# 	@argument <list A> : N x N matrix of coefficients
+# 	@argument <list B> : right hand side, vector N or matrix N x K (K systems)
+# 	@argument *inplace : if True A and B (lists) are overwritten, B with the
+#		solution
+#
+# 	@returns <list X> : solution of A X = B, same shape as B
+#
+# 	@description : Gauss-Jordan elimination with partial pivoting of A
+#		applied to B, the inverse of A is never formed (only the columns at
+#		the right of the pivot are eliminated), for K right hand sides it
+#		takes N^3/2 + N^2 K operations instead of the N^3 of the inverse
+#
+# 	@author : Daniel Ríos Linares
+def solve(A, B, inplace=False):
+
+	N = len(A)
+	M = len(A[0]) if N > 0 else 0
+	if N != M:
+		raise RivpyMatrixcalcError("Matrix N x M is not invertable, N = " + str(N) + ", M = " + str(M))
+	if len(B) != N:
+		raise RivpyMatrixcalcError("Right hand side with " + str(len(B)) + " rows, expected " + str(N))
+
+	# A vector B is solved as a N x 1 matrix
+	vector = N > 0 and not is_sequence(B[0])
+	if not inplace:
+		A = [[float(A[i][j]) for j in range(N)] for i in range(N)]
+		X = [[float(b)] for b in B] if vector else [[float(b) for b in Bi] for Bi in B]
+	else:
+		X = [[b] for b in B] if vector else B
+	rows,columns = singular_scales(A)
+
+	for j in range(N):
+		# Partial pivoting, row with the largest |A[i][j]|
+		p = max(range(j,N), key=lambda i: abs(A[i][j]))
+		if singular_pivot(A[p][j], rows[p], columns[j]):
+			raise RivpyMatrixcalcError("Singular matrix")
+		if p != j:
+			A[j],A[p] = A[p],A[j]
+			X[j],X[p] = X[p],X[j]
+			rows[j],rows[p] = rows[p],rows[j]
+
+		# Normalize the pivot row (the columns at the left are already 0)
+		Aj = A[j]
+		Xj = X[j]
+		d = 1.0/Aj[j]
+		Aj[j+1:] = [a*d for a in Aj[j+1:]]
+		Aj[j] = 1.0
+		Xj[:] = [x*d for x in Xj]
+
+		# Eliminate the column j of the other rows
+		Ar = Aj[j+1:]
+		for l in range(N):
+			if l != j:
+				Al = A[l]
+				d = Al[j]
+				if d != 0:
+					Al[j] = 0.0
+					Al[j+1:] = [a-d*b for a,b in zip(Al[j+1:],Ar)]
+					X[l][:] = [x-d*y for x,y in zip(X[l],Xj)]
+
+	if vector:
+		if not inplace: return [x[0] for x in X]
+		B[:] = [x[0] for x in X]
+		return B
+	return X
+# End of <function solve>
+
+# <class LU>
+# 	@variable <int self.N> : size of the matrix
+# 	@variable <array self.LU> : packed factors (row major, N*N doubles), L
+#		below the diagonal (its unit diagonal is not stored) and U on and
+#		above it
+# 	@variable <list self.pivots> : row of the original matrix in each row of
+#		the factors (P A = L U)
+# 	@variable <int self.sign> : sign of the permutation P (+1 or -1)
+#
+# 	@description : LU factorization by partial pivoting (Doolittle), built once
+#		with N^3/3 operations, then each right hand side is solved with N^2
+#		operations, the determinant is the product of the pivots and the
+#		inverse is computed on demand (and kept) from the same factors
+#
+# 	@author : Daniel Ríos Linares
+class LU:
+	''' [ Constructors ] '''
+	# <function LU>
+	# 	@argument <list C> : N x N matrix to factorize (it isn't modified)
+	def __init__(self, C):
+		N = len(C)
+		M = len(C[0]) if N > 0 else 0
+		if N != M:
+			raise RivpyMatrixcalcError("Matrix N x M is not invertable, N = " + str(N) + ", M = " + str(M))
+
+		self.N = N
+		self.LU = array('d', [C[i][j] for i in range(N) for j in range(N)])
+		self.pivots = list(range(N))
+		self.sign = 1
+		self.Ainv = None
+
+		LU = self.LU
+		rows,columns = singular_scales([LU[i*N:(i+1)*N] for i in range(N)])
+		for k in range(N):
+			# Partial pivoting, row with the largest |A[i][k]|
+			p = max(range(k,N), key=lambda i: abs(LU[i*N+k]))
+			if singular_pivot(LU[p*N+k], rows[p], columns[k]):
+				raise RivpyMatrixcalcError("Singular matrix")
+			if p != k:
+				LU[k*N:(k+1)*N],LU[p*N:(p+1)*N] = LU[p*N:(p+1)*N],LU[k*N:(k+1)*N]
+				rows[k],rows[p] = rows[p],rows[k]
+				self.pivots[k],self.pivots[p] = self.pivots[p],self.pivots[k]
+				self.sign = -self.sign
+
+			# Multipliers of the column k (L) and update of the remaining rows
+			d = 1.0/LU[k*N+k]
+			Uk = LU[k*N+k+1:(k+1)*N]
+			for i in range(k+1,N):
+				l = LU[i*N+k]*d
+				LU[i*N+k] = l
+				if l != 0:
+					LU[i*N+k+1:(i+1)*N] = array('d', [a-l*u for a,u in zip(LU[i*N+k+1:(i+1)*N],Uk)])
 
-	A = [[C[i][j] for j in range(N)] for i in range(N)]
-	B = [[0 if i != j else 1 for j in range(N)] for i in range(N)]
+	''' [ Solver ] '''
+	# <method solve>
+	# 	@argument <list B> : right hand side, vector N or matrix N x K
+	#
+	# 	@returns <list X> : solution of A X = B, same shape as B
+	def solve(self, B):
+		if len(B) != self.N:
+			raise RivpyMatrixcalcError("Right hand side with " + str(len(B)) + " rows, expected " + str(self.N))
+		if self.N == 0 or not is_sequence(B[0]):
+			return self.substitute(B)
+		columns = [self.substitute([Bi[k] for Bi in B]) for k in range(len(B[0]))]
+		return [list(Xi) for Xi in zip(*columns)]
+
+	# <method det>
+	# 	@returns <float> : determinant of the matrix
+	def det(self):
+		N = self.N
+		d = float(self.sign)
+		for k in range(N): d *= self.LU[k*N+k]
+		return d
+
+	# <method inverse>
+	# 	@returns <list> : N x N inverse of the matrix (a new list each call,
+	#		the solves are done only the first time)
+	def inverse(self):
+		if self.Ainv == None:
+			N = self.N
+			columns = [self.substitute([1.0 if i == k else 0.0 for i in range(N)]) for k in range(N)]
+			self.Ainv = [list(Xi) for Xi in zip(*columns)]
+		return [list(Xi) for Xi in self.Ainv]
+
+	''' [ Internal functions ] '''
+	# <method substitute>
+	# 	@argument <list b> : right hand side vector
+	#
+	# 	@returns <list x> : forward (L y = P b) and back (U x = y) substitution
+	def substitute(self, b):
+		N = self.N
+		LU = self.LU
+		y = [float(b[p]) for p in self.pivots]
+		for i in range(1,N):
+			y[i] -= sum(map(mul,LU[i*N:i*N+i],y[:i]))
+		for i in reversed(range(N)):
+			y[i] = (y[i]-sum(map(mul,LU[i*N+i+1:(i+1)*N],y[i+1:])))/LU[i*N+i]
+		return y
+# End of <class LU>
+
+# <function mxinv_gj_batch>
+# 	@argument <array C> : stack of K matrices N x N (array K x N x N)
+#
+# 	@returns <array A>, <array singular> : K x N x N inverses of the stack
+#		(NaN for the singular matrices) and the K booleans of the singular
+#		matrices
+#
+# 	@description : Gauss-Jordan algorithm by partial pivoting of the whole
+#		stack at once (each step is a numpy operation over the K matrices),
+#		for millions of small matrices (3 x 3 to 12 x 12) where the call and
+#		the conversion of each matrix cost more than its inversion, a
+#		singular matrix doesn't stop the batch (requires numpy)
+#
+# 	@author : Daniel Ríos Linares
+def mxinv_gj_batch(C):
+
+	A = batch_array(C)
+	K,N = A.shape[0],A.shape[1]
+	k = np.arange(K)
+	singular = np.zeros(K, dtype=bool)
+	rows,columns = singular_scales_batch(A)
+	swaps = np.zeros((K,N), dtype=np.intp)
 
 	for j in range(N):
-		for i in range(j,N):
-			if A[i][j] != 0:
-				A[j],A[i] = A[i],A[j]
-				B[j],B[i] = B[i],B[j]
-			d = A[j][j]
-			for k in range(N):
-				A[j][k] /= d
-				B[j][k] /= d
-			for l in range(N):
-				if l != j:
-					d = -A[l][j]
-					for k in range(N):
-						A[l][k] += A[j][k]*d
-						B[l][k] += B[j][k]*d
-	return B
+		# Partial pivoting of each matrix, the same singularity criterion as
+		# mxinv_gj (singular_pivot) for each matrix
+		p = j+np.argmax(np.abs(A[:,j:,j]), axis=1)
+		swaps[:,j] = p
+		Aj = A[k,p].copy()
+		A[k,p] = A[:,j]
+		A[:,j] = Aj
+		rows[k,p],rows[:,j] = rows[:,j],rows[k,p]
+		singular |= ~(np.abs(A[:,j,j]) > np.minimum(rows[:,j],columns[:,j])) | ~np.isfinite(A[:,j,j])
+
+		# Normalize the pivot rows, the pivot is replaced by the column j of
+		# the inverse
+		d = 1.0/np.where(singular,1.0,A[:,j,j])
+		A[:,j,j] = 1.0
+		A[:,j] *= d[:,None]
+
+		# Eliminate the column j of the other rows
+		f = A[:,:,j].copy()
+		f[:,j] = 0.0
+		A[:,:,j] -= f
+		A -= f[:,:,None]*A[:,None,j,:]
+
+	# Undo the row swaps as column swaps (in reverse order)
+	for j in reversed(range(N)):
+		p = swaps[:,j]
+		Aj = A[:,:,j].copy()
+		A[:,:,j] = A[k,:,p]
+		A[k,:,p] = Aj
+	A[singular] = np.nan
+	return A,singular
+# End of <function mxinv_gj_batch>
+
+# <function solve_batch>
+# 	@argument <array A> : stack of K matrices N x N (array K x N x N)
+# 	@argument <array B> : K right hand sides, vectors (K x N) or matrices
+#		(K x N x R)
+#
+# 	@returns <array X>, <array singular> : solutions of A X = B of the stack,
+#		same shape as B (NaN for the singular matrices), and the K booleans
+#		of the singular matrices
+#
+# 	@description : Gauss-Jordan elimination by partial pivoting of the whole
+#		stack at once applied to B, without the inverses (requires numpy)
+#
+# 	@author : Daniel Ríos Linares
+def solve_batch(A, B):
+
+	A = batch_array(A)
+	K,N = A.shape[0],A.shape[1]
+	X = np.array(B, dtype=np.float64)
+	vector = X.ndim == 2
+	if vector: X = X[:,:,None]
+	if X.ndim != 3 or X.shape[:2] != (K,N):
+		raise RivpyMatrixcalcError("Right hand sides of shape " + str(np.shape(B)) + ", expected (" + str(K) + ", " + str(N) + ") or (" + str(K) + ", " + str(N) + ", R)")
+	k = np.arange(K)
+	singular = np.zeros(K, dtype=bool)
+	rows,columns = singular_scales_batch(A)
+
+	for j in range(N):
+		# Partial pivoting of each matrix, the same singularity criterion as
+		# mxinv_gj (singular_pivot) for each matrix
+		p = j+np.argmax(np.abs(A[:,j:,j]), axis=1)
+		Aj = A[k,p].copy()
+		A[k,p] = A[:,j]
+		A[:,j] = Aj
+		Xj = X[k,p].copy()
+		X[k,p] = X[:,j]
+		X[:,j] = Xj
+		rows[k,p],rows[:,j] = rows[:,j],rows[k,p]
+		singular |= ~(np.abs(A[:,j,j]) > np.minimum(rows[:,j],columns[:,j])) | ~np.isfinite(A[:,j,j])
+
+		# Normalize the pivot rows and eliminate the column j of the others
+		d = 1.0/np.where(singular,1.0,A[:,j,j])
+		A[:,j] *= d[:,None]
+		X[:,j] *= d[:,None]
+		f = A[:,:,j].copy()
+		f[:,j] = 0.0
+		A -= f[:,:,None]*A[:,None,j,:]
+		X -= f[:,:,None]*X[:,None,j,:]
+
+	X[singular] = np.nan
+	return (X[:,:,0] if vector else X),singular
+# End of <function solve_batch>
+
+# <function singular_scales>
+# 	@argument <list A> : N x N matrix (rows)
+#
+# 	@returns <list rows>, <list columns> : N eps max|A| of each row and of
+#		each column of the matrix
+def singular_scales(A):
+	N = len(A)
+	rows = [N*sys.float_info.epsilon*max(map(abs,Ai), default=0.0) for Ai in A]
+	columns = [N*sys.float_info.epsilon*max(map(abs,Aj), default=0.0) for Aj in zip(*A)]
+	return rows,columns
+# End of <function singular_scales>
+
+# <function singular_pivot>
+# 	@returns <bool> : True if the pivot is not finite or under the rounding
+#		of both its original row and its column (N eps max|A|), the criterion
+#		doesn't depend on the scale of the rows or of the columns, so a badly
+#		scaled matrix such as diag(1e20,1) isn't singular, the same criterion
+#		in every function and backend
+def singular_pivot(pivot, row, column):
+	return not min(row,column) < abs(pivot) <= sys.float_info.max
+# End of <function singular_pivot>
+
+# <function is_sequence>
+# 	@returns <bool> : True if the row B[0] of a right hand side is a sequence
+#		(a list, a tuple or a numpy row), B is then a N x K matrix
+def is_sequence(Bi):
+	return hasattr(Bi, '__len__') and hasattr(Bi, '__getitem__')
+# End of <function is_sequence>
+
+# <function singular_scales_batch>
+# 	@argument <array A> : stack of K matrices N x N
+#
+# 	@returns <array rows>, <array columns> : K x N arrays of N eps max|A| of
+#		each row and of each column of the matrices (singular_scales)
+def singular_scales_batch(A):
+	N = A.shape[1]
+	scale = N*np.finfo(np.float64).eps
+	if N == 0: return np.zeros(A.shape[:2]),np.zeros(A.shape[:2])
+	return scale*np.abs(A).max(axis=2),scale*np.abs(A).max(axis=1)
+# End of <function singular_scales_batch>
+
+# <function batch_array>
+# 	@returns <array> : float64 copy of the stack of K matrices N x N C
+def batch_array(C):
+	if np == None:
+		raise RivpyMatrixcalcError("The batched functions require numpy")
+	A = np.array(C, dtype=np.float64)
+	if A.ndim != 3 or A.shape[1] != A.shape[2]:
+		raise RivpyMatrixcalcError("Stack of shape " + str(A.shape) + " is not K x N x N")
+	return A
+# End of <function batch_array>
+
+''' [ Exception treatment ] '''
+
+class RivpyMatrixcalcError(Exception):
 
+	def __init__(self, msg = None):
+		if msg == None: msg = "Unknown error encountered"
+		super(RivpyMatrixcalcError,self).__init__(msg)
 
 if __name__ == '__main__':
 	A = [[1,2,3],[4,7,-1],[12,-12,0]]
 	print(mxinv_gj(A))
+	print(solve(A,[1,2,3]))
+	F = LU(A)
+	print(F.solve([1,2,3]), F.det())
@@ -11,8 +11,8 @@ lstsq_lm
 		has been obtained from Numerical Recipes in C, and the source code from
 		its publications (sometimes translated directly from the source, but for
 		the most part has been interpretated by me and modified). This package
-		is the standalone version, you can sustitute the inv function (computes
-		the inverse of a matrix) with other different.
+		is the standalone version, the step of each iteration is solved with
+		the Cholesky or QR factorizations of numpy.linalg.
 
 	@name : lstsq_lm
 		    | |
@@ -35,17 +35,73 @@ lstsq_lm
 """
 
 # Required for the Levenberg-Marquardt algorithm
-from numpy.linalg import inv
+from numpy.linalg import cholesky, qr, solve, inv, LinAlgError
+
+# Required for the vectorized residuals and jacobian storage
+import numpy as np
+
+# Required for the parallel jacobian (optional executor)
+from concurrent.futures import ProcessPoolExecutor
+import warnings
+import pickle
+import os
+
+# Required for the memo cache of evaluations
+from collections import OrderedDict
+
+# Required for the timings of the iterations
+import time
+
+# Required for the expression models (parsing and differentiation)
+import ast
+import re
 
 # <class LeastSquares>
-# 	@variable self.X : independient data, can be list<list> or only list
-# 	@variable self.Y : dependient data, can be list<list> or only list
+# 	@variable self.X : independient data, can be list<list> or only list (or
+# 		a numpy memmap when a .npy path is given)
+# 	@variable self.Y : dependient data, can be list<list> or only list (or
+# 		a numpy memmap when a .npy path is given)
+# 	@variable self.X_path : path of the .npy file of X, None if not given
+# 	@variable self.Y_path : path of the .npy file of Y, None if not given
 # 	@variable self.f : list/float function(list/float x, list P) to fit
+# 	@variable self.model : Model of self.f, None if f is a plain function
 # 	@variable self.P : list of initial guess for the parameters
 # 	@variable self.w : float function(list/float x, list P) to weight the fit
 # 	@variable self.dP : default dimensional parameter variation, same lenght of P
 # 	@variable self.Plbl : labels of parameters, by default a,b,...,z,a1,b1,...
 # 	@variable self.pr : print selection (if True, terminal output will be displayed)
+# 	@variable self.vectorized : if True, self.f and self.w are called only once
+# 		with the whole self.X array instead of once per point
+# 	@variable self.jac : analytic jacobian function(list/float x, list P) of
+# 		self.f, if None the jacobian is computed numerically
+# 	@variable self.jac_mode : numerical jacobian scheme when self.jac is None,
+# 		'central', 'forward' or 'complex' (complex step)
+# 	@variable self.executor : concurrent.futures executor used to compute the
+# 		perturbed residuals of the numerical jacobian in parallel, None for
+# 		serial computation
+# 	@variable self.cache : memo cache (LRU) of the last evaluations, tuple(P)
+# 		as key and (residuals, chi squared) as value
+# 	@variable self.cache_size : maximum number of evaluations in self.cache
+# 	@variable self.cache_hits : number of evaluations found in self.cache
+# 	@variable self.nfev : number of true evaluations (sweeps of the whole data
+# 		set, jacobian perturbations included)
+# 	@variable self.njev : number of full jacobian computations
+# 	@variable self.result : FitResult of the last self.solve(), None before
+# 	@variable self.sparse : True when a sparsity pattern of the jacobian has
+# 		been defined, then self.J is None and the jacobian is stored by columns
+# 		in self.jac_rows (indexes of the nonzero rows) and self.jac_vals
+# 	@variable self.jac_groups : groups of columns perturbed together by the
+# 		numerical jacobian, columns without common rows share a group
+# 	@variable self.jac_pairs : pairs of columns with common rows (the nonzero
+# 		entries of J^T J) and the positions of those rows in each column
+# 	@variable self.chunk_size : number of points evaluated at once in the
+# 		out-of-core mode, None to evaluate the whole data set (default)
+# 	@variable self.jac_normal : J^T J and -J^T R accumulated chunk by chunk
+# 		in the out-of-core mode (self.R and self.J are None then)
+# 	@variable self.precision : 'double' (float64), 'mixed' (self.R and self.J
+# 		stored as float32, J^T J, J^T r and chi squared accumulated in
+# 		float64) or 'single' (float32 storage and products)
+# 	@variable self.dtype : numpy type of self.R and self.J
 # 	@variable self.dimX : dimension of X, if X is a list then will be 1, but if
 # 		is a multidimensional fit, will be the dimension of list<list>
 # 	@variable self.dimY : dimension of Y, if Y is a list then will be 1, but if
@@ -53,9 +109,10 @@ from numpy.linalg import inv
 # 	@variable self.N : number of output lines of data
 # 	@variable self.M : number of parameters to fit
 # 	@variable self.R : residuals of each data, its lenght is the product of
-# 		self.N and self.dimY because each Y column is considered a points
-# 	@variable self.J : jacobian of the data, you can override it by extending
-# 		the class if you need a improvement in speed
+# 		self.N and self.dimY because each Y column is considered a points,
+# 		stored as a numpy array (column c of Y is at [c*self.N,(c+1)*self.N))
+# 	@variable self.J : jacobian of the data (numpy array N*dimY x M), you can
+# 		override it by extending the class if you need a improvement in speed
 #
 # 	@description : a instantiation of this class will fit the data X,Y in the
 # 		function f compensating the weight of function w with the iteration of P
@@ -75,92 +132,251 @@ class LeastSquares:
 	''' [ Static variables ] '''
 	# Parameter label sequence
 	lbl = 'abcdefghijklmnopqrstuvwxyz'
+	# Numerical jacobian schemes
+	jac_modes = ('central','forward','complex')
+	# Complex step size (there is no substraction, so it can be tiny)
+	h_complex = 1e-20
+	# Storage precision of the residuals and the jacobian
+	precisions = ('double','mixed','single')
+	# Rows of the float64 blocks of the 'mixed' precision products
+	block_rows = 4096
 
 	''' [ Constructors ] '''
 	# <function LeastSquares>
-	# 	@argument X : independient data, can be list<list> or only list
-	# 	@argument Y : dependient data, can be list<list> or only list
+	# 	@argument X : independient data, can be list<list> or only list, or the
+	# 		path of a .npy file that is opened as a memmap
+	# 	@argument Y : dependient data, can be list<list> or only list, or the
+	# 		path of a .npy file that is opened as a memmap
 	# 	@argument *f : list/float function(list/float x, list P) to fit, if is
-	# 		not defined, self.f_default is setted
+	# 		not defined, self.f_default is setted, it can be a Model or an
+	# 		expression string (see Model), then the model is vectorized and its
+	# 		jacobian analytic
 	# 	@argument *P : list of initial guess for the parameters
 	# 	@argument *w : float function(list/float x, list P) to weight the fit,
 	# 		if isn't defined, self.w_default is setted (always return 1)
 	# 	@argument *dP : default dimensional parameter variation same lenght of P
 	# 	@argument *Plbl : labels of parameters, by default a,b,...,z,a1,b1,...
 	# 	@argument *pr : print selection (if True, terminal output displayed)
-	def __init__(self, X, Y, f=None, P=None, w=None, dP=None, Plbl=None, pr=False):
+	# 	@argument *vectorized : if True, f(X,P) and w(X,P) receive the whole X
+	# 		as a numpy array and must return all the N predictions (N x dimY
+	# 		when Y is multidimensional) and weights (N) at once
+	# 	@argument *jac : analytic jacobian function(list/float x, list P) that
+	# 		returns the M derivatives of f (dimY x M when Y is multidimensional,
+	# 		N x M or N x dimY x M with vectorized), the weight is taken as
+	# 		constant
+	# 	@argument *jac_mode : numerical jacobian scheme when jac isn't defined,
+	# 		'central' (2 sweeps per parameter), 'forward' (1 sweep per
+	# 		parameter reusing the current residuals) or 'complex' (1 complex
+	# 		sweep per parameter, exact to machine precision, f must accept
+	# 		complex parameters, e.g. cmath or numpy instead of math)
+	# 	@argument *executor : concurrent.futures ThreadPoolExecutor or
+	# 		ProcessPoolExecutor to compute the jacobian columns in parallel
+	# 		(worthy for expensive f), with a process pool f and w must be
+	# 		picklable (module level functions), if not it falls back to serial
+	# 	@argument *cache_size : number of evaluations (residuals and chi squared
+	# 		for a given P) remembered to avoid repeated sweeps, 0 disables it
+	# 	@argument *sparsity : pattern of the jacobian, boolean numpy array N x M
+	# 		(or N*dimY x M) with True where the point depends on the parameter,
+	# 		or a list with the dependent point indexes of each parameter
+	# 	@argument *chunk_size : out-of-core mode (requires vectorized), f and
+	# 		w receive blocks of chunk_size points and J^T J and J^T r are
+	# 		accumulated block by block, so the memory is set by chunk_size
+	# 		instead of N (the jacobian and the residuals are never stored)
+	# 	@argument *precision : 'double', 'mixed' or 'single', storage of the
+	# 		residuals and the jacobian in float32 for the reduced precisions
+	# 		(half the memory), the step is always solved in float64
+	def __init__(self, X, Y, f=None, P=None, w=None, dP=None, Plbl=None, pr=False, vectorized=False, jac=None, jac_mode='central', executor=None, cache_size=8, sparsity=None, chunk_size=None, precision='double'):
 
-		# Non-optional input arguments: X and Y data and function f
-		self.X = X
-		self.Y = Y
+		# Model description, the number of parameters, the labels and the
+		# analytic jacobian are taken from it
+		if isinstance(f,str): f = Model(f)
+		self.model = f if isinstance(f,Model) else None
+		if self.model != None:
+			if self.model.vectorized: vectorized = True
+			if jac == None: jac = self.model.jac
+			if Plbl == None and self.model.parameters != None: Plbl = self.model.parameters
+			if P is None: P = [1e-3 for p in range(self.model.M)]
+			f = self.model.f
+
+		# Vectorized mode (f and w are evaluated once for the whole X)
+		self.vectorized = True if vectorized == True else False
+
+		# Out-of-core mode (f and w are evaluated by blocks of points)
+		if chunk_size != None:
+			if not self.vectorized: raise ValueError("chunk_size requires vectorized=True")
+			if sparsity is not None: raise ValueError("chunk_size can't be used with a sparsity pattern")
+			chunk_size = max(1,int(chunk_size))
+		self.chunk_size = chunk_size
+
+		# Non-optional input arguments: X and Y data (or .npy paths) and
+		# function f, out-of-core data isn't converted (no copy is done)
+		self.X_path = X if isinstance(X,(str,os.PathLike)) else None
+		self.Y_path = Y if isinstance(Y,(str,os.PathLike)) else None
+		X = self.load_data(X)
+		Y = self.load_data(Y)
+		if self.chunk_size != None: self.X,self.Y = np.asarray(X),np.asarray(Y)
+		elif self.vectorized: self.X,self.Y = np.asarray(X, dtype=float),np.asarray(Y, dtype=float)
+		else: self.X,self.Y = X,Y
 
 		# Obtain the dimension of the X and Y data matrixes :
-		try: self.dimX = len(X[0])
-		except: self.dimX = 1
-		try: self.dimY = len(Y[0])
-		except: self.dimY = 1
+		if self.vectorized:
+			self.dimX = self.X.shape[1] if self.X.ndim > 1 else 1
+			self.dimY = self.Y.shape[1] if self.Y.ndim > 1 else 1
+		else:
+			try: self.dimX = len(X[0])
+			except: self.dimX = 1
+			try: self.dimY = len(Y[0])
+			except: self.dimY = 1
 
 		# Optional arguments : function to fit (f) and weight (w)
 		self.w = w if (w != None) else self.w_default
-		self.f = f if (f != None) else self.f_default
+		if f != None: self.f = f
+		else: self.f = self.f_default_vectorized if self.vectorized else self.f_default
+
+		# Optional arguments : analytic or numerical jacobian
+		if jac_mode not in self.jac_modes:
+			raise ValueError("Unknown jac_mode '" + str(jac_mode) + "', use one of " + str(self.jac_modes))
+		self.jac = jac
+		self.jac_mode = jac_mode
+
+		# Optional arguments : parallel jacobian
+		self.executor = executor
+		self.executor_checked = False
+
+		# Optional arguments : storage precision
+		if precision not in self.precisions:
+			raise ValueError("Unknown precision '" + str(precision) + "', use one of " + str(self.precisions))
+		self.precision = precision
+		self.dtype = np.float64 if precision == 'double' else np.float32
+
+		# Optional arguments : memo cache of evaluations and counters
+		self.cache = OrderedDict()
+		self.cache_size = cache_size
+		self.cache_hits = 0
+		self.nfev = 0
+		self.njev = 0
+		self.result = None
 
 		# Optional arguments : parameter, variation and labels
-		self.P = P if (P != None) else [1e-3 for p in range(self.detect_P())]
+		if P is None: P = [1e-3 for p in range(len(Plbl) if Plbl != None else self.detect_P())]
+		self.P = P
 		self.dP = dP if (dP != None) else [1e-6 for p in self.P]
 		self.Plbl = Plbl if (Plbl != None) else [self.detect_label(i) for i in range(len(self.P))]
 
 		# Number of points of the grid
-		self.N = len(X)
+		self.N = len(self.X)
 
 		# Number of parameters of the problem
 		self.M = len(self.P)
 
-		# Residuals vector
-		self.R = [0 for i in range(self.N*self.dimY)]
-
-		# Jacobian matrix
-		self.J = [[0 for j in range(self.M)] for i in range(self.N*self.dimY)]
+		# Residuals vector and jacobian matrix (dense or sparse by columns),
+		# only J^T J and J^T r are stored in the out-of-core mode
+		self.sparse = sparsity is not None
+		self.jac_normal = None
+		if self.chunk_size != None:
+			self.R = None
+			self.J = None
+			self.jac_groups = [[j] for j in range(self.M)]
+		elif self.sparse:
+			self.R = np.zeros(self.N*self.dimY, dtype=self.dtype)
+			self.J = None
+			self.detect_sparsity(sparsity)
+		else:
+			self.R = np.zeros(self.N*self.dimY, dtype=self.dtype)
+			self.J = np.zeros((self.N*self.dimY,self.M), dtype=self.dtype)
+			self.jac_groups = [[j] for j in range(self.M)]
 
 		# Print iterations?
 		self.pr = True if pr == True else False
 
 	''' [ Solve ] '''
 	# <method solve>
-	#	@returns <list P> : returns self.P after solution
+	#	@argument *method : linear solver of each step, 'cholesky' of the
+	#		normal equations or 'qr' of the augmented jacobian (slower but more
+	#		robust for ill-conditioned fits)
+	#	@argument *jac_update : 'full' recomputes the jacobian every iteration,
+	#		'broyden' updates it with a rank-one correction after each accepted
+	#		step and only recomputes it every jac_refresh iterations or when the
+	#		fit stalls
+	#	@argument *jac_refresh : iterations between full jacobians (broyden)
+	#	@argument *callback : function(IterationEvent event) called after each
+	#		iteration, if it returns True the fit stops
+	#	@argument *lamb : initial non-dimensional damping
+	#	@argument *keep_jacobian : keep a copy of the last jacobian in
+	#		self.result (J^T J is always kept for the uncertainties), None keeps
+	#		it unless the jacobian is sparse (the copy would be dense)
 	#
-	#	@description : operates the main loop of the solver (LevenbergMarquardt)
-	def solve(self):
+	#	@returns <list P> : returns self.P after solution, the totals of the fit
+	#		are stored in self.result (FitResult)
+	#
+	#	@description : operates the main loop of the solver (LevenbergMarquardt),
+	#		the out-of-core mode only has the normal equations, so it requires
+	#		the 'cholesky' method and 'full' jacobian updates
+	def solve(self, method='cholesky', jac_update='full', jac_refresh=10, callback=None, lamb=1e-3, keep_jacobian=None):
+		if self.chunk_size != None and (method != 'cholesky' or jac_update != 'full'):
+			raise ValueError("chunk_size requires method='cholesky' and jac_update='full'")
 		if self.pr:
 			print("Initial parameters")
 			for i in range(self.M): print(self.Plbl[i],'=',self.P[i])
 		if self.pr:
 			print("Processing...")
-		solver = LevenbergMarquardt(self,self.M,self.N*self.dimY,self.pr)
-		solver.solve()
+		solver = LevenbergMarquardt(self,self.M,self.N*self.dimY,self.pr,method,jac_update,jac_refresh,callback,lamb,keep_jacobian)
+		self.result = solver.solve()
+		if self.dtype != np.float64 and self.chunk_size == None: self.check_precision()
 		if self.pr:
-			print("Finished!")
+			print("Finished! (" + str(self.nfev) + " evaluations, " + str(self.njev) + " jacobians)")
 			print("Final parameters")
 			for i in range(self.M): print(self.Plbl[i],'=',self.P[i])
 		return self.P
 
+	# <method check_precision>
+	# 	@description : convergence diagnostic of the reduced precisions, the
+	# 		float64 residuals of the solution (one evaluation) give its exact
+	# 		chi squared (self.result.chiSquared_double) and the decrease of a
+	# 		Gauss-Newton step (self.result.predicted_decrease), if this
+	# 		decrease is over LevenbergMarquardt.lamb_tol the fit stopped by the
+	# 		rounding of the float32 residuals and self.result.precision_limited
+	# 		is True
+	def check_precision(self):
+		result = self.result
+		R = self.calc_residuals(self.P)
+		self.nfev += 1
+		result.chiSquared_double = float(np.dot(R,R))
+		result.predicted_decrease = 0.0
+		if result.JTJ is not None:
+			beta = -self.product(self.get_jacobian_matrix(),R)
+			try: result.predicted_decrease = float(np.dot(beta,solve(result.JTJ,beta)))
+			except LinAlgError: pass
+		result.precision_limited = result.predicted_decrease > LevenbergMarquardt.lamb_tol
+
 	''' [ Internal functions ] '''
+	# <method index>
+	# 	@argument <int i> : int index of the residual (up to self.N*self.dimY)
+	#
+	#	@returns <int i, int c> : index of the X,Y data and column of Y
+	#
+	# 	@description : maps the residual index to the data point and the column
+	# 		of Y, the residual of the column c of the point i is at c*self.N+i
+	def index(self,i):
+		c,i = divmod(i,self.N)
+		return i,c
+
 	# <method func>
 	# 	@argument <int i> : int that consider the current index of X,Y data
+	# 	@argument <list *P> : parameters to evaluate, self.P by default
 	#
 	#	@returns <list/float self.f.__call__> : reuturns the value of self.f
 	#
 	# 	@description : returns the value of the fit from the function self.f
-	def func(self,i):
+	def func(self,i,P=None):
+		if P is None: P = self.P
 		# When there is only 1D at the output return it as usual
-		if self.dimY == 1: return self.f(self.X[i],self.P)
+		if self.dimY == 1: return self.f(self.X[i],P)
 		# If not, the call is from the residual computation, so the number of
 		# points has been multiplied by self.dimY
 		else:
-			c = 0
-			while i >= self.N:
-				i -= self.N
-				c += 1
-			return self.f(self.X[i],self.P)[c]
+			i,c = self.index(i)
+			return self.f(self.X[i],P)[c]
 
 	# <method f_default>
 	# 	@argument <list/float x> : is the set of data from self.X[i]
@@ -195,22 +411,39 @@ class LeastSquares:
 				for j in range(self.dimY): y[j] = x*P[0+2*j]+P[1+2*j]
 		return y
 
+	# <method f_default_vectorized>
+	# 	@argument <array X> : the whole self.X numpy array
+	# 	@argument <list P> : is the list of parameters to compute
+	#
+	#	@returns <array Y> : N predictions (N x dimY if Y is multidimensional)
+	#
+	# 	@description : same linear regression of self.f_default but computing
+	# 		every point at once, selected when self.vectorized is True
+	def f_default_vectorized(self,X,P):
+		Y = np.zeros((len(X),self.dimY))
+		if self.dimX != 1:
+			for j in range(self.dimY):
+				for i in range(self.dimX): Y[:,j] += X[:,i]*P[i+self.dimX*j]
+				Y[:,j] += P[self.dimX+self.dimX*j]
+		else:
+			for j in range(self.dimY): Y[:,j] = X*P[0+2*j]+P[1+2*j]
+		return Y if self.dimY != 1 else Y[:,0]
+
 	# <method weight>
 	# 	@argument <int i> : int of the index for the X,Y set of data
+	# 	@argument <list *P> : parameters to evaluate, self.P by default
 	#
 	#	@returns <float self.w.__call__> : weight of the x,y set
 	#
 	# 	@description : used by the class in order to ponderate a situation of
 	# 		the problem to the requirements of the user
-	def weight(self,i):
+	def weight(self,i,P=None):
+		if P is None: P = self.P
 		if self.dimY == 1:
-			return self.w(self.X[i],self.P)
+			return self.w(self.X[i],P)
 		else:
-			c = 0
-			while i >= self.N:
-				i -= self.N
-				c += 1
-			return self.w(self.X[i],self.P)
+			i,_ = self.index(i)
+			return self.w(self.X[i],P)
 
 	# <method w_default>
 	# 	@argument <list/float x> : is the set of data from self.X[i]
@@ -234,22 +467,36 @@ class LeastSquares:
 		if self.dimY == 1:
 			return self.X[i],self.Y[i]
 		else:
-			c = 0
-			while i >= self.N:
-				i -= self.N
-				c += 1
+			i,c = self.index(i)
 			return self.X[i],self.Y[i][c]
 
+	# <method load_data>
+	# 	@argument X : data, or the path of a .npy file
+	#
+	#	@returns X : the same data, or the file opened as a read-only memmap
+	#
+	# 	@description : the .npy files aren't read, the operating system loads
+	# 		the pages of the blocks when they are used
+	def load_data(self,X):
+		if isinstance(X,(str,os.PathLike)): return np.load(X, mmap_mode='r')
+		return X
+
+	# <method chunks>
+	#	@returns <generator slice> : blocks of points of the data set
+	#
+	# 	@description : yields the slices of self.chunk_size points, or a slice
+	# 		with every point when the out-of-core mode isn't used
+	def chunks(self):
+		size = self.chunk_size if self.chunk_size != None else max(1,self.N)
+		for a in range(0,self.N,size): yield slice(a,min(a+size,self.N))
+
 	# <method merit>
 	#	@returns <float chi_squared> : returns the current chi_squared
 	#
 	# 	@description : returns the chi squared (sum of difference squares
 	# 		between the data and the fit) of the current state
 	def merit(self):
-		chi_squared = 0
-		self.recalc_residuals()
-		for r in self.R:
-			chi_squared += r**2
+		self.R,chi_squared = self.evaluate(self.P)
 		return chi_squared
 
 	''' [ Internal computation ] '''
@@ -263,53 +510,426 @@ class LeastSquares:
 			self.P[j] += dp[j]
 		self.recalc_residuals()
 
+	# <method evaluate>
+	# 	@argument <list P> : parameters to evaluate
+	#
+	#	@returns <array R, float chi_squared> : residuals and chi squared of P
+	#
+	# 	@description : memoized self.calc_residuals, the last self.cache_size
+	# 		evaluations are remembered (least recently used are discarded), the
+	# 		returned residuals are shared with the cache so they mustn't be
+	# 		modified in place, in the out-of-core mode the residuals are None
+	# 		and the chi squared is summed block by block, they are stored with
+	# 		the type self.dtype
+	def evaluate(self,P):
+		key = tuple(P)
+		if key in self.cache:
+			self.cache_hits += 1
+			self.cache.move_to_end(key)
+			return self.cache[key]
+		self.nfev += 1
+		if self.chunk_size != None:
+			chi_squared = 0.0
+			for s in self.chunks():
+				R = self.calc_residuals(P,s)
+				chi_squared += float(np.dot(R,R))
+			value = (None,chi_squared)
+		else:
+			R = self.calc_residuals(P).astype(self.dtype, copy=False)
+			value = (R,float(self.product(R,R)))
+		if self.cache_size > 0:
+			self.cache[key] = value
+			while len(self.cache) > self.cache_size: self.cache.popitem(last=False)
+		return value
+
+	# <method clear_cache>
+	# 	@description : forgets every evaluation, required if X, Y, f or w are
+	# 		modified after the construction
+	def clear_cache(self):
+		self.cache.clear()
+
+	# <method calc_residuals>
+	# 	@argument <list P> : parameters to evaluate
+	# 	@argument <slice *s> : block of points (vectorized only), all if None
+	#
+	#	@returns <array R> : residuals of every point for the parameters P
+	#
+	# 	@description : computes the weighted residuals without modifying the
+	# 		state of the class, with the same ordering of self.R (inside the
+	# 		block when s is given), f and w are called once per point even if
+	# 		Y is multidimensional
+	def calc_residuals(self,P,s=None):
+		if self.vectorized:
+			X = self.X if s == None else np.asarray(self.X[s], dtype=float)
+			Y = self.Y if s == None else np.asarray(self.Y[s], dtype=float)
+			F = np.asarray(self.f(X,P))
+			W = np.asarray(self.w(X,P))
+			if self.dimY != 1:
+				F = F.reshape(len(Y),self.dimY)
+				if W.ndim == 1: W = W[:,np.newaxis]
+			R = np.where(W != 0, (F-Y)*W, 0)
+			return R.T.ravel() if self.dimY != 1 else R.ravel()
+		# Each point is evaluated once, the columns of Y are taken from the
+		# same output of f
+		F = [self.f(self.X[i],P) for i in range(self.N)]
+		W = [self.w(self.X[i],P) for i in range(self.N)]
+		if self.dimY == 1:
+			R = [(F[i]-self.Y[i])*W[i] if W[i] != 0 else 0 for i in range(self.N)]
+		else:
+			R = [(F[i][c]-self.Y[i][c])*W[i] if W[i] != 0 else 0 for c in range(self.dimY) for i in range(self.N)]
+		return np.array(R)
+
 	# <method recalc_residuals>
 	# 	@description : recalculation of the residuals
 	def recalc_residuals(self):
-		for i in range(self.N*self.dimY):
-			_,y = self.data(i)
-			w = self.weight(i)
-			self.R[i] = (self.func(i)-y)*w if w != 0 else 0
+		self.R,_ = self.evaluate(self.P)
 
 	# <method recalc_jac>
-	# 	@description : recomputes all indexes of the jacobian
+	# 	@description : recomputes all indexes of the jacobian, analytically if
+	# 		self.jac is defined or numerically following self.jac_mode, the
+	# 		columns of a group of self.jac_groups are perturbed at once (a
+	# 		group per column if there is no sparsity pattern), in the
+	# 		out-of-core mode only J^T J and J^T r are accumulated
 	def recalc_jac(self):
-		for j in range(self.M):
-			# 1) Erase dp (reinitialization)
-			dp = [0 for k in range(self.M)]
+		self.njev += 1
+
+		# Out-of-core mode, the jacobian is never stored
+		if self.chunk_size != None:
+			self.accumulate_normal_equations()
+			return
+
+		# Analytic jacobian defined by the user
+		if self.jac != None:
+			J = self.calc_jac_analytic(self.P).astype(self.dtype, copy=False)
+			if self.sparse: self.jac_vals = [J[self.jac_rows[j],j] for j in range(self.M)]
+			else: self.J = J
+			return
+
+		# Numerical jacobian, each column of a group only takes its own rows,
+		# forward differences need the float64 residuals of P
+		self.nfev += self.jac_sweeps()
+		R = self.R
+		if self.jac_mode == 'forward' and self.dtype != np.float64:
+			R = self.calc_residuals(self.P)
+			self.nfev += 1
+		for group,D,h in self.calc_jac_groups(self.P,R):
+			for j,hj in zip(group,h):
+				if self.sparse: self.jac_vals[j] = D[self.jac_rows[j]]/hj
+				else: self.J[:,j] = D/hj
+
+	# <method calc_jac_groups>
+	# 	@argument <list P> : parameters where the jacobian is computed
+	# 	@argument <array R> : residuals of P (used by forward differences)
+	# 	@argument <slice *s> : block of points (vectorized only), all if None
+	#
+	#	@returns <list<tuple>> : (group, D, h) for each group of self.jac_groups,
+	# 		the column j of the group is D/h[j] (inside the rows of j)
+	#
+	# 	@description : numerical differences of the residuals following
+	# 		self.jac_mode, the evaluations aren't counted in self.nfev
+	def calc_jac_groups(self,P,R,s=None):
+		# 1) Perturbed parameters of every group, p+i*h for complex step,
+		#    p+dp for forward and p+dp, p-dp for central differences
+		perturbed = []
+		for group in self.jac_groups:
+			if self.jac_mode == 'complex':
+				p = [complex(Pj) for Pj in P]
+				for j in group: p[j] += 1j*self.h_complex
+				perturbed.append(p)
+			else:
+				p = list(P)
+				for j in group: p[j] = P[j]+self.dP[j]
+				perturbed.append(p)
+				if self.jac_mode == 'central':
+					p = list(P)
+					for j in group: p[j] = P[j]-self.dP[j]
+					perturbed.append(p)
+
+		# 2) Residuals of every perturbation (in parallel with an executor)
+		chi = self.map_residuals(perturbed,s)
+
+		columns = []
+		for g,group in enumerate(self.jac_groups):
+			# 3a) Complex step, J = Im(chi(p+i*h))/h
+			if self.jac_mode == 'complex':
+				D,h = np.imag(chi[g]),[self.h_complex for j in group]
+
+			# 3b) Forward PD indexes, J = (chi(p+dp)-chi(p))/h with R as chi(p)
+			elif self.jac_mode == 'forward':
+				D,h = chi[g]-R,[self.dP[j] for j in group]
+
+			# 3c) Central PD indexes, J = (chi(p+dp)-chi(p-dp))/2h
+			else:
+				D,h = chi[2*g]-chi[2*g+1],[2*self.dP[j] for j in group]
+			columns.append((group,D,h))
+		return columns
+
+	# <method jac_sweeps>
+	#	@returns <int> : evaluations of the whole data set of a numerical
+	# 		jacobian
+	def jac_sweeps(self):
+		return len(self.jac_groups)*(2 if self.jac_mode == 'central' else 1)
+
+	# <method accumulate_normal_equations>
+	# 	@description : out-of-core jacobian, the residuals and the jacobian of
+	# 		each block of self.chunk_size points are computed, added to J^T J
+	# 		and -J^T r (self.jac_normal) and discarded
+	def accumulate_normal_equations(self):
+		alph = np.zeros((self.M,self.M))
+		beta = np.zeros(self.M)
+		for s in self.chunks():
+			R = self.calc_residuals(self.P,s)
+			J = self.calc_jac_block(self.P,R,s)
+			alph += np.dot(J.T,J)
+			beta -= np.dot(J.T,R)
+		self.nfev += 1 + (self.jac_sweeps() if self.jac == None else 0)
+		self.jac_normal = (alph,beta)
+
+	# <method calc_jac_block>
+	# 	@argument <list P> : parameters where the jacobian is computed
+	# 	@argument <array R> : residuals of P in the block
+	# 	@argument <slice s> : block of points (vectorized only)
+	#
+	#	@returns <array J> : dense jacobian of the block (len(R) x M)
+	def calc_jac_block(self,P,R,s):
+		if self.jac != None: return self.calc_jac_analytic(P,s)
+		J = np.zeros((len(R),self.M))
+		for group,D,h in self.calc_jac_groups(P,R,s):
+			for j,hj in zip(group,h): J[:,j] = D/hj
+		return J
+
+	# <method broyden_update>
+	# 	@argument <array dp> : accepted increase of the parameters
+	# 	@argument <array dR> : change of the residuals produced by dp
+	#
+	# 	@description : rank-one (Broyden) correction of the jacobian without
+	# 		evaluations, J += (dR-J*dp)*dp^T/(dp^T*dp), a sparse jacobian is only
+	# 		corrected inside its pattern
+	def broyden_update(self,dp,dR):
+		dp = np.asarray(dp, dtype=float)
+		dd = np.dot(dp,dp)
+		if dd == 0: return
+		if not self.sparse:
+			u = dR-np.dot(self.J,dp)
+			self.J += np.outer(u,dp/dd)
+			return
+		u = np.array(dR, dtype=float)
+		for j in range(self.M): u[self.jac_rows[j]] -= self.jac_vals[j]*dp[j]
+		for j in range(self.M): self.jac_vals[j] += u[self.jac_rows[j]]*(dp[j]/dd)
+
+	# <method map_residuals>
+	# 	@argument <list<list> Ps> : list of parameter lists to evaluate
+	# 	@argument <slice *s> : block of points (vectorized only), all if None
+	#
+	#	@returns <list<array>> : residuals of every parameter list
+	#
+	# 	@description : evaluates self.calc_residuals for every P, serially or
+	# 		with self.executor, the processes receive a copy of the class
+	# 		without the residuals and the jacobian (see __getstate__) once per
+	# 		chunk of parameters, one chunk per worker
+	def map_residuals(self,Ps,s=None):
+		if self.executor == None or not self.check_executor():
+			return [self.calc_residuals(P,s) for P in Ps]
+		workers = getattr(self.executor,'_max_workers',None) or os.cpu_count() or 1
+		chunksize = max(1,-(-len(Ps)//workers))
+		return list(self.executor.map(self.calc_residuals,Ps,[s for P in Ps],chunksize=chunksize))
 
-			# 2) Calculate chi(p+dp)
-			dp[j] = self.dP[j]
-			self.increase_P(dp)
-			chi_p = [self.R[i] for i in range(len(self.R))]
+	# <method check_executor>
+	#	@returns <bool> : True if self.executor can be used
+	#
+	# 	@description : a process pool requires the class to be picklable (f and
+	# 		w defined at module level), if not a warning is raised and the
+	# 		executor is removed to compute the jacobian serially
+	def check_executor(self):
+		if isinstance(self.executor,ProcessPoolExecutor) and not self.executor_checked:
+			try: pickle.dumps(self)
+			except (pickle.PicklingError,AttributeError,TypeError) as e:
+				warnings.warn("LeastSquares isn't picklable (" + str(e) + "), the jacobian will be computed serially")
+				self.executor = None
+				return False
+			self.executor_checked = True
+		return True
+
+	# <method __getstate__>
+	#	@returns <dict state> : attributes sent to other processes
+	#
+	# 	@description : the executor, residuals, jacobian and cache aren't
+	# 		required to compute residuals in other processes, the data loaded
+	# 		from .npy files is opened again by the process (see __setstate__)
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state['executor'] = None
+		state['R'] = None
+		state['J'] = None
+		state['jac_vals'] = None
+		state['jac_normal'] = None
+		state['cache'] = OrderedDict()
+		if self.X_path != None: state['X'] = None
+		if self.Y_path != None: state['Y'] = None
+		return state
+
+	# <method __setstate__>
+	# 	@argument <dict state> : attributes received from other process
+	#
+	# 	@description : opens the memmaps of the .npy files again
+	def __setstate__(self,state):
+		self.__dict__.update(state)
+		if self.X_path != None: self.X = self.load_data(self.X_path)
+		if self.Y_path != None: self.Y = self.load_data(self.Y_path)
 
-			# 3) Calculate chi(p-dp) = chi(p+dp-2*dp)
-			dp[j] = -2*self.dP[j]
-			self.increase_P(dp)
-			chi_m = [self.R[i] for i in range(len(self.R))]
+	# <method calc_jac_analytic>
+	# 	@argument <list P> : parameters to evaluate
+	# 	@argument <slice *s> : block of points (vectorized only), all if None
+	#
+	#	@returns <array J> : jacobian of the residuals (N*dimY x M)
+	#
+	# 	@description : builds the jacobian from the user function self.jac
+	# 		multiplied by the weight, with the same row ordering of self.R
+	def calc_jac_analytic(self,P,s=None):
+		N,M,dimY = self.N,self.M,self.dimY
+		if self.vectorized:
+			X = self.X if s == None else np.asarray(self.X[s], dtype=float)
+			N = len(X)
+			D = np.asarray(self.jac(X,P), dtype=float).reshape(N,dimY,M)
+			W = np.broadcast_to(np.asarray(self.w(X,P), dtype=float), (N,))
+			D = D*W[:,np.newaxis,np.newaxis]
+			return D.transpose(1,0,2).reshape(N*dimY,M)
+		J = np.zeros((N*dimY,M))
+		for i in range(N):
+			d = np.asarray(self.jac(self.X[i],P), dtype=float).reshape(dimY,M)
+			w = self.w(self.X[i],P)
+			for c in range(dimY): J[c*N+i,:] = d[c]*w
+		return J
 
-			# 4) Central PD indexes on J will be (chi(p+dp)-chi(p-dp))/2h
-			for i in range(self.N*self.dimY):
-				self.J[i][j] = (chi_p[i]-chi_m[i])/(2*self.dP[j])
+	# <method normal_equations>
+	#	@returns <array alph, array beta> : J^T J (M x M) and -J^T R (M)
+	#
+	# 	@description : builds the normal equations of the current jacobian and
+	# 		residuals with matrix products, with a sparse jacobian only the
+	# 		pairs of columns with common rows are multiplied, in the out-of-core
+	# 		mode they are already accumulated by self.recalc_jac
+	def normal_equations(self):
+		if self.chunk_size != None:
+			return self.jac_normal
+		if not self.sparse:
+			return self.product(self.J,self.J), -self.product(self.J,self.R)
+		alph = np.zeros((self.M,self.M))
+		beta = np.zeros(self.M)
+		for j in range(self.M):
+			beta[j] = -self.product(self.jac_vals[j],self.R[self.jac_rows[j]])
+		for j,k,ij,ik in self.jac_pairs:
+			alph[j,k] = alph[k,j] = self.product(self.jac_vals[j][ij],self.jac_vals[k][ik])
+		return alph,beta
 
-			# 5) With J calculated, return to the original p
-			dp[j] = self.dP[j]
-			self.increase_P(dp)
+	# <method product>
+	# 	@argument <array A> : matrix (rows x m) or vector (rows)
+	# 	@argument <array B> : matrix (rows x n) or vector (rows)
+	#
+	#	@returns <array> : A^T B in float64
+	#
+	# 	@description : with 'mixed' precision the float32 rows are converted
+	# 		and accumulated in float64 by blocks of self.block_rows (without a
+	# 		float64 copy of the whole array), with 'single' the product is done
+	# 		in float32 and only the result is converted
+	def product(self,A,B):
+		if self.precision != 'mixed': return np.asarray(np.dot(A.T,B), dtype=np.float64)
+		C = 0.0
+		for a in range(0,len(A),self.block_rows):
+			b = a+self.block_rows
+			C = C+np.dot(A[a:b].T.astype(np.float64),B[a:b].astype(np.float64))
+		return np.asarray(C, dtype=np.float64)
 
 	''' [ Detection ] '''
+	# <method detect_sparsity>
+	# 	@argument sparsity : boolean numpy array N x M (or N*dimY x M), or a
+	# 		list of M lists with the point indexes that depend on each parameter
+	#
+	# 	@description : stores the rows of each column (self.jac_rows), groups
+	# 		the columns without common rows (greedy Curtis-Powell-Reid coloring,
+	# 		the columns with more rows first) in self.jac_groups so each group
+	# 		costs one evaluation, and finds the pairs of columns with common
+	# 		rows (self.jac_pairs), the only nonzero entries of J^T J
+	def detect_sparsity(self,sparsity):
+		N,M,dimY = self.N,self.M,self.dimY
+
+		# 1) Rows of each column, the points are repeated for each column of Y
+		#    unless the pattern is already given per residual (N*dimY x M)
+		if isinstance(sparsity,np.ndarray):
+			S = np.asarray(sparsity, dtype=bool)
+			rows = [np.flatnonzero(S[:,j]) for j in range(M)]
+			per_point = S.shape[0] == N
+		else:
+			rows = [np.unique(np.asarray(r, dtype=int)) for r in sparsity]
+			per_point = True
+		if dimY != 1 and per_point:
+			rows = [np.concatenate([r+c*N for c in range(dimY)]) for r in rows]
+		self.jac_rows = rows
+		self.jac_vals = [np.zeros(len(r), dtype=self.dtype) for r in rows]
+
+		# 2) Greedy coloring, a column joins the first group without its rows
+		self.jac_groups = []
+		used = []
+		for j in sorted(range(M), key=lambda j: -len(rows[j])):
+			for group,mask in zip(self.jac_groups,used):
+				if not np.any(mask[rows[j]]):
+					group.append(j)
+					mask[rows[j]] = True
+					break
+			else:
+				mask = np.zeros(N*dimY, dtype=bool)
+				mask[rows[j]] = True
+				self.jac_groups.append([j])
+				used.append(mask)
+
+		# 3) Pairs of columns with common rows
+		self.jac_pairs = []
+		for j in range(M):
+			for k in range(j,M):
+				if len(rows[j]) == 0 or len(rows[k]) == 0: continue
+				if rows[j][-1] < rows[k][0] or rows[k][-1] < rows[j][0]: continue
+				_,ij,ik = np.intersect1d(rows[j],rows[k],assume_unique=True,return_indices=True)
+				if len(ij) > 0: self.jac_pairs.append((j,k,ij,ik))
+
 	# <method detect_P>
 	#	@returns <int p> : number of parameters auto-detected
 	#
-	# 	@description : with X and f defined is able to know the P lenght by
-	# 		trying the function self.f until there is no error, as a crazy limit
-	# 		it has a 100000 parameters as a bad self.f definition
+	# 	@description : with X and f defined is able to know the P lenght, first
+	# 		with a single call of self.f with a ParameterProbe (the indexes read
+	# 		or the count of an unpacking error), if it can't be verified by
+	# 		trying the function self.f with 1, 2, 3... parameters until there is
+	# 		no error. Only the errors of a wrong number of parameters
+	# 		(ParameterProbe.arity_error) are catched, any other error of f is
+	# 		raised, and the trials stop at ParameterProbe.limit parameters
 	def detect_P(self):
-		p = 1
-		while p < 100000:
-			try: self.f( self.X[0] , [0 for i in range(p)] ); break
-			except: pass
-			p += 1
-		return int(p)
+		x = self.X[:1] if self.vectorized else self.X[0]
+
+		# 1) Probe, f reads P[i] or unpacks "a,b,c = P" (the TypeErrors and
+		# ValueErrors can be operations the probe doesn't support, such as
+		# len(P), they are left to the trials, any other error is of f)
+		probe = ParameterProbe()
+		p = None
+		try:
+			self.f(x,probe)
+			if probe.iterated == 0 and probe.size > 0: p = probe.size
+		except ValueError as e:
+			expected = re.search(r'expected (\d+)',str(e))
+			if expected != None: p = int(expected.group(1))
+		except TypeError: pass
+		if p != None:
+			try:
+				self.f(x,[1.0 for i in range(p)])
+				return p
+			except Exception as e:
+				if not ParameterProbe.arity_error(e): raise
+
+		# 2) Trial and error
+		for p in range(1,ParameterProbe.limit+1):
+			try:
+				self.f(x,[1.0 for i in range(p)])
+				return p
+			except Exception as e:
+				if not ParameterProbe.arity_error(e): raise
+		raise ValueError("The number of parameters of f can't be detected, use P, Plbl or a Model")
 
 	# <method detect_label>
 	#	@returns <str lbl> : label auto-generated
@@ -340,7 +960,29 @@ class LeastSquares:
 	#	@returns <float self.J.item> : item of the current jacobian self.J list
 	#
 	# 	@description : returns the value of the jacobian in i,j
-	def get_jacobian(self,i,j): return self.J[i][j]
+	def get_jacobian(self,i,j):
+		if not self.sparse: return self.J[i][j]
+		k = np.searchsorted(self.jac_rows[j],i)
+		if k < len(self.jac_rows[j]) and self.jac_rows[j][k] == i: return self.jac_vals[j][k]
+		return 0
+
+	# <method get_residuals>
+	#	@return <array self.R> : current residuals self.R
+	#
+	# 	@description : returns the whole vector of residuals (None in the
+	# 		out-of-core mode)
+	def get_residuals(self): return self.R
+
+	# <method get_jacobian_matrix>
+	#	@return <array self.J> : current jacobian self.J
+	#
+	# 	@description : returns the whole jacobian matrix (N*dimY x M), a sparse
+	# 		jacobian is expanded to a new dense matrix
+	def get_jacobian_matrix(self):
+		if not self.sparse: return self.J
+		J = np.zeros((self.N*self.dimY,self.M))
+		for j in range(self.M): J[self.jac_rows[j],j] = self.jac_vals[j]
+		return J
 
 	# <method get_P>
 	#	@return <list self.P> : current parameters self.P
@@ -349,20 +991,497 @@ class LeastSquares:
 	# 		self.solve() in order to get the fitting)
 	def get_P(self): return self.P
 
+	# <method set_P>
+	# 	@argument <list P> : parameters to copy into self.P
+	#
+	# 	@description : restores a previous set of parameters exactly (instead
+	# 		of substracting an increase), so its evaluation is found in the cache
+	def set_P(self,P):
+		for j in range(self.M):
+			self.P[j] = P[j]
+		self.recalc_residuals()
+
 	# <method merit>
 	#	@returns <float chi_squared> : value of chi_squared
 	#
 	# 	@description : returns the chi squared (sum of difference squares
 	# 		between the data and the fit) of the current state
 	def get_chiSquared(self):
+		# Without weight it is the same chi squared of the merit figure
+		if self.w == self.w_default: return self.merit()
+		self.nfev += 1
+		if self.vectorized:
+			chi_squared = 0.0
+			for s in self.chunks():
+				Y = np.asarray(self.Y[s], dtype=float)
+				F = np.asarray(self.f(np.asarray(self.X[s], dtype=float),self.P)).reshape(Y.shape)
+				chi_squared += float(np.sum((F-Y)**2))
+			return chi_squared
 		chi_squared = 0
-		for i in range(self.N*self.dimY):
-			_,y = self.data(i)
-			chi_squared += (self.func(i)-y)**2
+		for i in range(self.N):
+			y = self.f(self.X[i],self.P)
+			if self.dimY == 1: chi_squared += (y-self.Y[i])**2
+			else: chi_squared += sum((y[c]-self.Y[i][c])**2 for c in range(self.dimY))
 		return chi_squared
 
 # End of <class LeastSquares>
 
+# <class Model>
+# 	@variable self.expressions : expressions of the model (one per column of
+# 		Y), None for a model given as a function
+# 	@variable self.parameters : names of the parameters, None if only the
+# 		number of parameters has been declared
+# 	@variable self.M : number of parameters
+# 	@variable self.f : function(X, P) of the model, vectorized for expressions
+# 	@variable self.jac : analytic jacobian function(X, P) (N x M, or N x dimY
+# 		x M), derived from the expressions or given by the user (None if not)
+# 	@variable self.vectorized : True if self.f and self.jac are vectorized
+#
+# 	@description : description of a model for LeastSquares, the number of
+# 		parameters is declared (count or names) or it is read from a simple
+# 		expression of numpy functions such as 'a*exp(-x/b)+c'. The expressions
+# 		are compiled once (and shared by every Model with the same expressions)
+# 		into a vectorized function and its analytic jacobian, obtained by
+# 		symbolic differentiation of the syntax tree. The independient
+# 		variable is x (the whole X) and x0, x1... (columns of X), any other
+# 		name not in self.functions or self.constants is a parameter, in order
+# 		of appearance.
+#
+# 	@author : Daniel Ríos Linares
+class Model:
+	''' [ Static variables ] '''
+	# Functions of the expressions
+	functions = {'exp':np.exp, 'log':np.log, 'sqrt':np.sqrt, 'sin':np.sin, 'cos':np.cos,
+		'tan':np.tan, 'sinh':np.sinh, 'cosh':np.cosh, 'tanh':np.tanh, 'arctan':np.arctan,
+		'abs':np.abs, 'sign':np.sign}
+	# Constants of the expressions
+	constants = {'pi':np.pi, 'e':np.e}
+	# Compiled expressions, (expressions, parameters) as key
+	compiled = {}
+
+	''' [ Constructors ] '''
+	# <function Model>
+	# 	@argument f : expression string (or list of expressions, one per
+	# 		column of Y) or function(x, P) of the model
+	# 	@argument *parameters : number or list of names of the parameters,
+	# 		required for a function, optional for expressions (order of the
+	# 		parameters)
+	# 	@argument *jac : analytic jacobian of a function model
+	# 	@argument *vectorized : True if the function model is vectorized
+	def __init__(self, f, parameters=None, jac=None, vectorized=False):
+		self.expressions = None
+		if isinstance(f,str): self.expressions = (f,)
+		elif isinstance(f,(list,tuple)) and all(isinstance(e,str) for e in f): self.expressions = tuple(f)
+
+		# Function model, the parameters must be declared
+		if self.expressions == None:
+			if parameters == None:
+				raise ValueError("A function model requires the number or the names of its parameters")
+			self.parameters = None if isinstance(parameters,int) else list(parameters)
+			self.M = parameters if isinstance(parameters,int) else len(self.parameters)
+			self.f = f
+			self.jac = jac
+			self.vectorized = True if vectorized == True else False
+			return
+
+		# Expression model, compiled once for every Model of the expressions
+		key = (self.expressions,None if parameters == None else tuple(parameters))
+		if key not in self.compiled: self.compiled[key] = self.compile(parameters)
+		self.parameters,self.code_f,self.code_jac = self.compiled[key]
+		self.M = len(self.parameters)
+		self.vectorized = True
+
+	''' [ Model functions ] '''
+	# <method f>
+	# 	@argument <array X> : independient data (N or N x dimX)
+	# 	@argument <list P> : parameters
+	#
+	#	@returns <array> : N predictions (N x dimY for several expressions)
+	def f(self,X,P):
+		scope = self.scope(X,P)
+		F = [np.broadcast_to(eval(code,scope),(len(X),)) for code in self.code_f]
+		return F[0] if len(F) == 1 else np.stack(F,axis=1)
+
+	# <method jac>
+	# 	@argument <array X> : independient data (N or N x dimX)
+	# 	@argument <list P> : parameters
+	#
+	#	@returns <array> : N x M derivatives (N x dimY x M for several
+	# 		expressions)
+	def jac(self,X,P):
+		scope = self.scope(X,P)
+		J = [np.stack([np.broadcast_to(eval(code,scope),(len(X),)) for code in codes],axis=-1) for codes in self.code_jac]
+		return J[0] if len(J) == 1 else np.stack(J,axis=1)
+
+	''' [ Internal functions ] '''
+	# <method scope>
+	#	@returns <dict> : names of the expressions (functions, constants,
+	# 		variables and parameters) for eval
+	def scope(self,X,P):
+		scope = dict(self.functions)
+		scope.update(self.constants)
+		scope['x'] = X
+		if np.ndim(X) > 1:
+			for k in range(np.shape(X)[1]): scope['x'+str(k)] = X[:,k]
+		else: scope['x0'] = X
+		scope.update(zip(self.parameters,P))
+		return scope
+
+	# <method is_variable>
+	#	@returns <bool> : True if the name is x, x0, x1...
+	def is_variable(self,name):
+		return name == 'x' or (name[0] == 'x' and name[1:].isdigit())
+
+	# <method compile>
+	# 	@argument <list parameters> : names of the parameters (None to read
+	# 		them from the expressions)
+	#
+	#	@returns <list parameters, list code_f, list<list> code_jac> : names of
+	# 		the parameters, compiled expressions and compiled derivatives
+	def compile(self,parameters):
+		trees = [ast.parse(e.strip(), mode='eval').body for e in self.expressions]
+
+		# 1) Free names in order of appearance are the parameters
+		names = []
+		for tree in trees:
+			nodes = sorted([n for n in ast.walk(tree) if isinstance(n,ast.Name)], key=lambda n: (n.lineno,n.col_offset))
+			for n in nodes:
+				if n.id in self.functions or n.id in self.constants or self.is_variable(n.id): continue
+				if n.id not in names: names.append(n.id)
+		if parameters != None:
+			unknown = [n for n in names if n not in parameters]
+			if len(unknown) > 0: raise ValueError("Unknown names in the model: " + str(unknown))
+			names = list(parameters)
+
+		# 2) Compiled expressions and derivatives of each parameter
+		code_f = [self.code(tree) for tree in trees]
+		code_jac = [[self.code(self.derivative(tree,p)) for p in names] for tree in trees]
+		return names,code_f,code_jac
+
+	# <method code>
+	#	@returns <code> : compiled expression of the syntax tree
+	def code(self,node):
+		return compile(ast.fix_missing_locations(ast.Expression(body=node)),'<model>','eval')
+
+	''' [ Symbolic differentiation ] '''
+	# <method derivative>
+	# 	@argument <ast node> : syntax tree of the expression
+	# 	@argument <str p> : name of the parameter
+	#
+	#	@returns <ast node> : syntax tree of the derivative of node by p
+	def derivative(self,node,p):
+		d = lambda n: self.derivative(n,p)
+		if isinstance(node,ast.Constant): return self.number(0)
+		if isinstance(node,ast.Name): return self.number(1 if node.id == p else 0)
+		if isinstance(node,ast.UnaryOp) and isinstance(node.op,ast.USub): return self.neg(d(node.operand))
+		if isinstance(node,ast.UnaryOp) and isinstance(node.op,ast.UAdd): return d(node.operand)
+		if isinstance(node,ast.BinOp):
+			a,b = node.left,node.right
+			if isinstance(node.op,ast.Add): return self.add(d(a),d(b))
+			if isinstance(node.op,ast.Sub): return self.add(d(a),self.neg(d(b)))
+			if isinstance(node.op,ast.Mult): return self.add(self.mul(d(a),b),self.mul(a,d(b)))
+			if isinstance(node.op,ast.Div):
+				# (a/b)' = a'/b - a*b'/b^2
+				return self.add(self.div(d(a),b),self.neg(self.div(self.mul(a,d(b)),self.pow(b,self.number(2)))))
+			if isinstance(node.op,ast.Pow):
+				# (a^n)' = n*a^(n-1)*a' and (a^b)' = a^b*(b'*log(a)+b*a'/a)
+				if self.is_zero(d(b)):
+					return self.mul(self.mul(b,self.pow(a,self.add(b,self.number(-1)))),d(a))
+				return self.mul(node,self.add(self.mul(d(b),self.call('log',a)),self.div(self.mul(b,d(a)),a)))
+		if isinstance(node,ast.Call) and isinstance(node.func,ast.Name) and len(node.args) == 1:
+			u = node.args[0]
+			du = d(u)
+			if self.is_zero(du): return self.number(0)
+			name = node.func.id
+			if name == 'exp': return self.mul(node,du)
+			if name == 'log': return self.div(du,u)
+			if name == 'sqrt': return self.div(du,self.mul(self.number(2),node))
+			if name == 'sin': return self.mul(self.call('cos',u),du)
+			if name == 'cos': return self.neg(self.mul(self.call('sin',u),du))
+			if name == 'tan': return self.div(du,self.pow(self.call('cos',u),self.number(2)))
+			if name == 'sinh': return self.mul(self.call('cosh',u),du)
+			if name == 'cosh': return self.mul(self.call('sinh',u),du)
+			if name == 'tanh': return self.mul(self.add(self.number(1),self.neg(self.pow(node,self.number(2)))),du)
+			if name == 'arctan': return self.div(du,self.add(self.number(1),self.pow(u,self.number(2))))
+			if name == 'abs': return self.mul(self.call('sign',u),du)
+			if name == 'sign': return self.number(0)
+		raise ValueError("Unsupported expression in the model: " + ast.dump(node))
+
+	# Constructors of the syntax tree, the terms with 0 and 1 are simplified
+	def number(self,value): return ast.Constant(value=value)
+	def is_zero(self,node): return isinstance(node,ast.Constant) and node.value == 0
+	def is_one(self,node): return isinstance(node,ast.Constant) and node.value == 1
+	def call(self,name,node): return ast.Call(func=ast.Name(id=name,ctx=ast.Load()),args=[node],keywords=[])
+	def neg(self,a):
+		if isinstance(a,ast.Constant): return self.number(-a.value)
+		return ast.UnaryOp(op=ast.USub(),operand=a)
+	def add(self,a,b):
+		if self.is_zero(a): return b
+		if self.is_zero(b): return a
+		return ast.BinOp(left=a,op=ast.Add(),right=b)
+	def mul(self,a,b):
+		if self.is_zero(a) or self.is_zero(b): return self.number(0)
+		if self.is_one(a): return b
+		if self.is_one(b): return a
+		return ast.BinOp(left=a,op=ast.Mult(),right=b)
+	def div(self,a,b):
+		if self.is_zero(a): return self.number(0)
+		if self.is_one(b): return a
+		return ast.BinOp(left=a,op=ast.Div(),right=b)
+	def pow(self,a,b):
+		if self.is_one(b): return a
+		return ast.BinOp(left=a,op=ast.Pow(),right=b)
+
+	''' [ Serialization ] '''
+	# <method __getstate__>
+	#	@returns <dict state> : the compiled code can't be pickled, it is
+	# 		compiled again by the other process (see __setstate__)
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state.pop('code_f',None)
+		state.pop('code_jac',None)
+		return state
+
+	# <method __setstate__>
+	# 	@argument <dict state> : attributes received from other process
+	def __setstate__(self,state):
+		self.__dict__.update(state)
+		if self.expressions != None:
+			key = (self.expressions,tuple(self.parameters))
+			if key not in self.compiled: self.compiled[key] = self.compile(self.parameters)
+			_,self.code_f,self.code_jac = self.compiled[key]
+# End of <class Model>
+
+
+# <class ParameterProbe>
+# 	@variable <int self.size> : number of parameters read by f (index + 1)
+# 	@variable <int self.iterated> : parameters taken by iteration
+#
+# 	@description : fake list of parameters (all 1.0) used by
+# 		LeastSquares.detect_P to find the number of parameters with a single
+# 		call of f, it records the indexes read and the iterated items
+class ParameterProbe:
+	''' [ Static variables ] '''
+	limit = 1000 # maximum items given by iteration
+
+	''' [ Constructors ] '''
+	def __init__(self):
+		self.size = 0
+		self.iterated = 0
+
+	def __getitem__(self,i):
+		if isinstance(i,slice):
+			if i.stop == None or i.stop < 0: raise TypeError("Open slices can't be probed")
+			self.size = max(self.size,i.stop)
+			return [1.0 for j in range(*i.indices(i.stop))]
+		if i < 0: raise TypeError("Negative indexes can't be probed")
+		self.size = max(self.size,i+1)
+		return 1.0
+
+	def __iter__(self):
+		while self.iterated < self.limit:
+			self.iterated += 1
+			yield 1.0
+
+	def __len__(self):
+		raise TypeError("The length of the parameters can't be probed")
+
+	''' [ Static methods ] '''
+	# <method arity_error>
+	# 	@returns <bool> : True if the error e of f is caused by a wrong number
+	# 		of parameters (an index out of range, an unpacking error or a call
+	# 		g(*P) with a wrong number of arguments)
+	@staticmethod
+	def arity_error(e):
+		if isinstance(e,IndexError): return True
+		if isinstance(e,ValueError): return 'values to unpack' in str(e)
+		return isinstance(e,TypeError) and 'positional argument' in str(e)
+# End of <class ParameterProbe>
+
+
+# <class LeastSquaresOnline>
+# 	@variable self.window : maximum number of points kept, the oldest points
+# 		are expired when new points are appended, None for no limit
+# 	@variable self.lamb : non-dimensional damping of the last accepted step,
+# 		used to warm start the next fit (None before the first fit)
+# 	@variable self.P_jac : parameters of the current jacobian, the jacobian
+# 		and J^T J are only reused when they are the current parameters
+# 	@variable self.normal : J^T J and -J^T R of the current jacobian and data
+#
+# 	@description : LeastSquares (vectorized and dense) for streams of data,
+# 		points are appended and expired and the model is refitted starting
+# 		from the previous P and lambda. After a converged fit the jacobian is
+# 		kept as the jacobian of the final P, so on append only the new rows are
+# 		evaluated (their residuals, jacobian rows and J^T J contributions) and
+# 		on expire the contributions of the old rows are substracted, the first
+# 		iteration of the refit costs the new rows instead of the whole window
+#
+# 	@author : Daniel Ríos Linares
+class LeastSquaresOnline(LeastSquares):
+	''' [ Constructors ] '''
+	# <function LeastSquaresOnline>
+	# 	@argument X,Y,f,P,w,dP,Plbl,pr,jac,jac_mode,executor,cache_size : same
+	# 		arguments of LeastSquares (always vectorized), X and Y are the
+	# 		initial points
+	# 	@argument *window : maximum number of points, None for no limit
+	def __init__(self, X, Y, f=None, P=None, w=None, dP=None, Plbl=None, pr=False, jac=None, jac_mode='central', executor=None, cache_size=8, window=None):
+		LeastSquares.__init__(self,X,Y,f,P,w,dP,Plbl,pr,True,jac,jac_mode,executor,cache_size)
+		self.window = window
+		self.lamb = None
+		self.P_jac = None
+		self.normal = None
+		if self.window != None and self.N > self.window: self.expire(self.N-self.window)
+
+	''' [ Online data ] '''
+	# <method append>
+	# 	@argument X : new independient data (n or n x dimX)
+	# 	@argument Y : new dependient data (n or n x dimY)
+	#
+	# 	@description : appends the points at the end of the window (expiring
+	# 		the oldest points if the window is full), if the jacobian is at the
+	# 		current P only the new rows are evaluated
+	def append(self,X,Y):
+		X = np.asarray(X, dtype=float).reshape((-1,)+self.X.shape[1:])
+		Y = np.asarray(Y, dtype=float).reshape((-1,)+self.Y.shape[1:])
+		N,n = self.N,len(X)
+		self.X = np.concatenate((self.X,X))
+		self.Y = np.concatenate((self.Y,Y))
+		self.N = N+n
+		if self.warm():
+			s = slice(N,N+n)
+			R = self.calc_residuals(self.P,s)
+			J = self.calc_jac_block(self.P,R,s)
+			alph,beta = self.normal
+			self.normal = (alph+np.dot(J.T,J),beta-np.dot(J.T,R))
+			self.R = self.concat_rows(self.R,R.astype(self.dtype),N,n)
+			self.J = self.concat_rows(self.J,J.astype(self.dtype),N,n)
+			self.reset_cache()
+		else:
+			self.invalidate()
+		if self.window != None and self.N > self.window: self.expire(self.N-self.window)
+
+	# <method expire>
+	# 	@argument <int n> : number of points to remove
+	#
+	# 	@description : removes the n oldest points, substracting their
+	# 		contributions of J^T J and J^T R if the jacobian is at the current P
+	def expire(self,n):
+		n = min(max(0,int(n)),self.N)
+		if n == 0: return
+		N = self.N
+		self.X = self.X[n:]
+		self.Y = self.Y[n:]
+		self.N = N-n
+		if self.warm():
+			R = self.take_rows(self.R,N,0,n)
+			J = self.take_rows(self.J,N,0,n)
+			alph,beta = self.normal
+			self.normal = (alph-self.product(J,J),beta+self.product(J,R))
+			self.R = self.take_rows(self.R,N,n,N)
+			self.J = self.take_rows(self.J,N,n,N)
+			self.reset_cache()
+		else:
+			self.invalidate()
+
+	# <method refit>
+	#	@argument *method,jac_update,jac_refresh,callback : same arguments of
+	#		LeastSquares.solve
+	#
+	#	@returns <list P> : returns self.P after solution
+	#
+	#	@description : fits the current window starting from the previous P
+	#		and lambda (the damping of the last accepted step, not below
+	#		LevenbergMarquardt.lamb_tol)
+	def refit(self, method='cholesky', jac_update='full', jac_refresh=10, callback=None):
+		self.solve(method,jac_update,jac_refresh,callback,self.lamb if self.lamb != None else 1e-3)
+		accepted = [event.lamb for event in self.result.events if event.accepted]
+		if len(accepted) > 0: self.lamb = max(accepted[-1],LevenbergMarquardt.lamb_tol)
+
+		# The jacobian of the last iteration is at the previous iterate, it is
+		# recomputed at the final P of a converged fit (the next warm refit and
+		# the covariance of the result use it as the jacobian of P)
+		if self.result.stop == 'tolerance' and self.P_jac != None and self.P_jac != tuple(self.P):
+			nfev,njev = self.nfev,self.njev
+			self.invalidate()
+			self.recalc_jac()
+			alph,beta = self.normal_equations()
+			self.result.JTJ = np.array(alph)
+			if self.result.J is not None: self.result.J = np.array(self.get_jacobian_matrix())
+			self.result.nfev += self.nfev-nfev
+			self.result.njev += self.njev-njev
+		return self.P
+
+	''' [ Internal computation ] '''
+	# <method recalc_jac>
+	# 	@description : the jacobian is only recomputed if it isn't at the
+	# 		current parameters
+	def recalc_jac(self):
+		if self.warm(): return
+		LeastSquares.recalc_jac(self)
+		self.P_jac = tuple(self.P)
+		self.normal = None
+
+	# <method normal_equations>
+	#	@returns <array alph, array beta> : J^T J (M x M) and -J^T R (M)
+	#
+	# 	@description : the normal equations are kept (and updated on append
+	# 		and expire) while the jacobian doesn't change
+	def normal_equations(self):
+		if self.normal == None: self.normal = LeastSquares.normal_equations(self)
+		return self.normal
+
+	# <method broyden_update>
+	# 	@description : LeastSquares.broyden_update, the jacobian is no longer
+	# 		the exact jacobian of any P
+	def broyden_update(self,dp,dR):
+		LeastSquares.broyden_update(self,dp,dR)
+		self.P_jac = None
+		self.normal = None
+
+	# <method warm>
+	#	@returns <bool> : True if the residuals, the jacobian and J^T J are
+	# 		those of the current parameters and data
+	def warm(self):
+		return self.P_jac != None and self.P_jac == tuple(self.P) and self.normal != None
+
+	# <method invalidate>
+	# 	@description : forgets the jacobian and J^T J, the next fit starts with
+	# 		a full jacobian
+	def invalidate(self):
+		self.P_jac = None
+		self.normal = None
+		self.clear_cache()
+		if self.J.shape[0] != self.N*self.dimY:
+			self.R = np.zeros(self.N*self.dimY, dtype=self.dtype)
+			self.J = np.zeros((self.N*self.dimY,self.M), dtype=self.dtype)
+
+	# <method reset_cache>
+	# 	@description : the evaluations of the previous data are forgotten and
+	# 		the updated residuals are stored as the evaluation of the current P
+	def reset_cache(self):
+		self.clear_cache()
+		if self.cache_size > 0: self.cache[tuple(self.P)] = (self.R,float(self.product(self.R,self.R)))
+
+	# <method concat_rows>
+	# 	@argument <array A> : residuals or jacobian of N points
+	# 	@argument <array B> : residuals or jacobian of n points
+	#
+	#	@returns <array> : rows of A followed by rows of B for each column of Y
+	def concat_rows(self,A,B,N,n):
+		dimY = self.dimY
+		C = np.concatenate((A.reshape((dimY,N)+A.shape[1:]),B.reshape((dimY,n)+B.shape[1:])),axis=1)
+		return C.reshape((dimY*(N+n),)+A.shape[1:])
+
+	# <method take_rows>
+	# 	@argument <array A> : residuals or jacobian of N points
+	#
+	#	@returns <array> : rows of the points a to b of each column of Y
+	def take_rows(self,A,N,a,b):
+		dimY = self.dimY
+		return A.reshape((dimY,N)+A.shape[1:])[:,a:b].reshape((dimY*(b-a),)+A.shape[1:])
+# End of <class LeastSquaresOnline>
+
+
 
 # <class LevenbergMarquardt>
 # 	@variable <LeastSquares.object self.host> : is the host of the parameters
@@ -371,6 +1490,17 @@ class LeastSquares:
 #		host)
 # 	@variable <int self.M> : number of parameters to fit
 # 	@variable <bool *self.pr> : print selectable
+# 	@variable <str *self.method> : step solver, 'cholesky' or 'qr'
+# 	@variable <str *self.jac_update> : 'full' or 'broyden' jacobian updates
+# 	@variable <int *self.jac_refresh> : iterations between full jacobians when
+#		self.jac_update is 'broyden'
+# 	@variable <function *self.callback> : function(IterationEvent event) called
+#		after each iteration, the fit stops if it returns True
+# 	@variable <FitResult self.result> : totals of the last fit
+# 	@variable <float *self.lamb> : initial non-dimensional damping
+# 	@variable <bool *self.keep_jacobian> : if True a copy of the last jacobian
+#		is kept in the result (J^T J is always kept), None keeps it unless the
+#		host has a sparse jacobian (its copy would be a dense N x M matrix)
 # 	@variable <static int self.max_iterations> : maximum number of iterations
 #		that the algorithm can execute
 # 	@variable <static float lamb_dmp> : damping multiplier/divider of the
@@ -381,9 +1511,14 @@ class LeastSquares:
 #		improves in this magnitude, the loop stops.
 #
 # 	@description : computes the Levenberg-Marquardt algorithm with self.host as
-# 		a object with the methods get_jacobian, recalc_jac, get_residual,
-# 		recalc_residuals, merit, increase_P. Each 10 iterations, the first one
-# 		and the last one are printed in the console to display the process.
+# 		a object with the methods recalc_jac, normal_equations, get_residuals,
+# 		get_jacobian_matrix, recalc_residuals, merit, increase_P, get_P and
+# 		set_P (and broyden_update). Each 10 iterations, the first one and the
+# 		last one are printed in the console to display the process (the merit
+# 		already computed, without extra evaluations). The normal equations (or
+# 		the QR of J) are built once per iteration and reused by every damping
+# 		trial. Each iteration is reported to the callback as an IterationEvent
+# 		and the totals are returned as a FitResult.
 #
 # 	@author : Daniel Ríos Linares
 #
@@ -399,6 +1534,8 @@ class LevenbergMarquardt:
 	lamb_dmp = 10 # damping recommended in Numerical Recipes in C
 	lamb_max = 1.000e+010 # maximum non-dimensional lambda
 	lamb_tol = 1.000e-010 # maximum non-dimensional lambda
+	methods = ('cholesky','qr') # linear solvers of the step
+	jac_updates = ('full','broyden') # jacobian update between iterations
 
 	''' [ Constructors ] '''
 	# <method LevenbergMarquardt>
@@ -408,81 +1545,843 @@ class LevenbergMarquardt:
 	#		as the host)
 	# 	@argument <int self.M> : number of parameters to fit
 	# 	@argument <boolean *self.pr> : print selectable
-	def __init__(self,host,M,N, pr = True):
+	# 	@argument <str *self.method> : step solver, 'cholesky' or 'qr'
+	# 	@argument <str *self.jac_update> : 'full' or 'broyden'
+	# 	@argument <int *self.jac_refresh> : iterations between full jacobians
+	# 	@argument <function *self.callback> : called with each IterationEvent
+	# 	@argument <float *self.lamb> : initial non-dimensional damping
+	# 	@argument <bool *self.keep_jacobian> : keep a copy of the last jacobian
+	def __init__(self,host,M,N, pr = True, method = 'cholesky', jac_update = 'full', jac_refresh = 10, callback = None, lamb = 1e-3, keep_jacobian = None):
 		# Host and number of parameters/points
 		self.host = host
 		self.M = M
 		self.N = N
 		self.pr = pr
 
+		# Linear solver of the step
+		if method not in self.methods:
+			raise ValueError("Unknown method '" + str(method) + "', use one of " + str(self.methods))
+		self.method = method
+
+		# Jacobian update between iterations
+		if jac_update not in self.jac_updates:
+			raise ValueError("Unknown jac_update '" + str(jac_update) + "', use one of " + str(self.jac_updates))
+		self.jac_update = jac_update
+		self.jac_refresh = max(1,int(jac_refresh))
+
+		# Instrumentation of the iterations
+		self.callback = callback
+		self.result = None
+
+		# Initial damping (warm start of a previous fit)
+		self.lamb = lamb
+
+		# Jacobian of the solution for the uncertainties
+		if keep_jacobian is None: keep_jacobian = not getattr(host,'sparse',False)
+		self.keep_jacobian = True if keep_jacobian == True else False
+
 	''' [ Solve ] '''
-	# solve() : void function(void)
-	#	@description : executes the solver
+	# solve() : FitResult function(void)
+	#	@returns <FitResult self.result> : totals of the fit
+	#
+	#	@description : executes the solver, an IterationEvent is sent to
+	#		self.callback at the end of each iteration
 	def solve(self):
 		# Class variables shortcut
-		M = self.M
-		N = self.N
 		host = self.host
+		clock = time.perf_counter
+		result = FitResult()
+		t_start = clock()
+		nfev_start = getattr(host,'nfev',0)
+		njev_start = getattr(host,'njev',0)
 
-		# 1) Gradient definitions
-		alph = [[0 for j in range(M)] for j in range(M)]
-		inv_alph = [[0 for j in range(M)] for j in range(M)]
-		beta = [0 for j in range(M)]
-		delt = [0 for j in range(M)]
-
-		# 2) Initialization
-		lamb = 1e-3
+		# 1) Initialization, since_jac counts the iterations since the last
+		#    full jacobian (None forces a new one)
+		lamb = self.lamb
 		count = 0
+		since_jac = None
+		result.stop = 'max_iterations'
 
-		# 3) Levenberg-Marquardt loop initialization
+		# 2) Levenberg-Marquardt loop initialization
 		while count < self.max_iterations:
+			event = IterationEvent(count)
+			t_iteration = clock()
 			host.recalc_residuals()
 			chiSquared = host.merit()
+			if not np.isfinite(chiSquared):
+				result.stop = 'nonfinite'
+				break
 			chiSquared_last = chiSquared
-			host.recalc_jac()
+			R_last = host.get_residuals()
+			lamb_last = lamb
+			t = clock()
+			if self.jac_update == 'full' or since_jac == None or since_jac >= self.jac_refresh:
+				host.recalc_jac()
+				since_jac = 0
+			event.t_jac = clock()-t
 
 			if count % 10 == 0 and self.pr:
-				print("  iteration " + str(count) + ", sum of squares = " + str(host.get_chiSquared()))
-
-			for j in range(M):
-				beta[j] = -sum([host.get_residual(i)*host.get_jacobian(i,j) for i in range(N)])
+				print("  iteration " + str(count) + ", sum of squares = " + str(chiSquared))
 
-			for j2 in range(M):
-				for j in range(M):
-					alph[j][j2] = sum([host.get_jacobian(i,j)*host.get_jacobian(i,j2) for i in range(N)])
+			# 3) Factorizations shared by every lambda trial of this iteration,
+			#    J = Q*Rq for 'qr' or alph = J^T J and beta = -J^T r for
+			#    'cholesky', scale is the diagonal of J^T J (Marquardt scaling)
+			t = clock()
+			if self.method == 'qr':
+				Q,Rq = qr(np.asarray(host.get_jacobian_matrix(), dtype=np.float64))
+				q = -np.dot(Q.T,host.get_residuals())
+				scale = np.sum(Rq**2,axis=0)
+				alph = None
+			else:
+				alph,beta = host.normal_equations()
+				scale = np.diag(alph).copy()
+			scale[scale <= 0] = 1
+			event.t_assembly = clock()-t
 
 			merit_rel = float('inf')
+			P_last = list(host.get_P())
 
-			# 4) Levenberg-Marquardt loop
-			while lamb < self.lamb_max and merit_rel > self.lamb_tol:
-				# 4a) Solve the linear system alph*delt = beta inverting alph
-				for j in range(M): alph[j][j] *= (1+lamb)
-
-				inv_alph = inv(alph)
-
-				for j in range(M): delt[j] = sum([inv_alph[j2][j]*beta[j2] for j2 in range(M)])
+			# 4) Levenberg-Marquardt loop (a non finite trial merit is rejected
+			#    and the damping increased)
+			while lamb < self.lamb_max and not merit_rel <= self.lamb_tol:
+				# 4a) Solve the linear system (alph+lamb*diag(alph))*delt = beta
+				t = clock()
+				try:
+					if self.method == 'qr': delt = self.step_qr(Rq,q,scale,lamb)
+					else: delt = self.step_cholesky(alph,beta,scale,lamb)
+				except LinAlgError:
+					event.t_solve += clock()-t
+					event.rejected += 1
+					lamb *= self.lamb_dmp
+					continue
+				event.t_solve += clock()-t
 
+				t = clock()
 				host.increase_P(delt)
 				chiSquared = host.merit()
+				event.t_eval += clock()-t
 
 				merit_rel = (chiSquared-chiSquared_last)
 
 				# 4b) If merit_rel increases we are not doing well
 				if merit_rel <= 0:
+					event.step_norm = float(np.linalg.norm(delt))
 					lamb /= self.lamb_dmp
 					break
 				# 4c) Then the iteration is doing well
 				else:
+					event.rejected += 1
 					lamb *= self.lamb_dmp
 
-				host.increase_P([-d for d in delt])
-				chiSquared = host.merit()
+				t = clock()
+				host.set_P(P_last)
+				event.t_eval += clock()-t
+
+			# 5) Report of the iteration, the fit stops if the callback
+			#    returns True
+			event.accepted = merit_rel <= 0
+			event.chiSquared = chiSquared if event.accepted else chiSquared_last
+			event.lamb = lamb
+			event.nfev = getattr(host,'nfev',0)-nfev_start
+			event.njev = getattr(host,'njev',0)-njev_start
+			event.t = clock()-t_iteration
+			result.add(event)
+			if self.callback != None and self.callback(event) == True:
+				if event.accepted: count += 1
+				result.stop = 'callback'
+				break
+
+			# 6) When the merit can't reduce more break the loop! Unless the
+			#    jacobian comes from Broyden updates, then it is recomputed and
+			#    the iteration is repeated with the same lambda. Without an
+			#    accepted trial up to lamb_max the fit is stuck, not converged
+			if not merit_rel <= -self.lamb_tol:
+				if since_jac == 0:
+					result.stop = 'lamb_max' if not event.accepted and lamb >= self.lamb_max else 'tolerance'
+					break
+				since_jac = None
+				lamb = lamb_last
+				continue
 
-			# 5) When the merit can't reduce more break the loop!
-			if merit_rel > -self.lamb_tol: break
+			# 7) Broyden rank-one update for the next iteration
+			if self.jac_update == 'broyden':
+				host.broyden_update(np.asarray(host.get_P())-P_last,host.get_residuals()-R_last)
+				since_jac += 1
 
 			count += 1
-		if self.pr: print("  iteration " + str(count) + ", sum of squares = " + str(host.get_chiSquared()))
+
+		# 8) Totals of the fit
+		result.P = list(host.get_P())
+		result.chiSquared = host.merit()
+		result.lamb = lamb
+		result.iterations = count
+		result.converged = result.stop == 'tolerance' and bool(np.isfinite(result.chiSquared))
+		result.nfev = getattr(host,'nfev',0)-nfev_start
+		result.njev = getattr(host,'njev',0)-njev_start
+		result.dof = self.N-self.M
+		if len(result.events) > 0:
+			result.JTJ = np.array(alph if alph is not None else np.dot(Rq.T,Rq))
+			J = host.get_jacobian_matrix() if self.keep_jacobian else None
+			if J is not None: result.J = np.array(J)
+		result.t = clock()-t_start
+		self.result = result
+		if self.pr: print("  iteration " + str(count) + ", sum of squares = " + str(result.chiSquared))
+		return result
+
+	''' [ Step solvers ] '''
+	# <method step_cholesky>
+	# 	@argument <array alph> : J^T J matrix (M x M)
+	# 	@argument <array beta> : -J^T r vector (M)
+	# 	@argument <array scale> : diagonal of the damping (M)
+	# 	@argument <float lamb> : non-dimensional damping
+	#
+	#	@returns <array delt> : step of the parameters
+	#
+	# 	@description : solves (alph+lamb*diag(scale))*delt = beta with the
+	# 		Cholesky factorization L*L^T and two triangular systems, raises
+	# 		LinAlgError if the damped matrix isn't positive definite
+	def step_cholesky(self,alph,beta,scale,lamb):
+		L = cholesky(alph+np.diag(lamb*scale))
+		return solve(L.T,solve(L,beta))
+
+	# <method step_qr>
+	# 	@argument <array Rq> : triangular factor of the QR of J (M x M)
+	# 	@argument <array q> : -Q^T r vector (M)
+	# 	@argument <array scale> : diagonal of the damping (M)
+	# 	@argument <float lamb> : non-dimensional damping
+	#
+	#	@returns <array delt> : step of the parameters
+	#
+	# 	@description : solves the augmented least squares problem
+	# 		[J ; sqrt(lamb*scale)]*delt = [-r ; 0], as the big QR of J is done
+	# 		only once per iteration only the small 2M x M system is factorized
+	# 		here
+	def step_qr(self,Rq,q,scale,lamb):
+		Qa,Ra = qr(np.vstack((Rq,np.diag(np.sqrt(lamb*scale)))))
+		return solve(Ra,np.dot(Qa.T,np.concatenate((q,np.zeros(len(q))))))
 # End of <class LevenbergMarquardt>
 
+
+# <class IterationEvent>
+# 	@variable <int self.iteration> : index of the iteration
+# 	@variable <float self.chiSquared> : merit (weighted chi squared) at the end
+# 		of the iteration
+# 	@variable <float self.lamb> : non-dimensional damping for the next
+# 		iteration
+# 	@variable <float self.step_norm> : norm of the accepted step, 0 if none
+# 	@variable <bool self.accepted> : True if a step reduced the merit
+# 	@variable <int self.rejected> : lambda trials rejected in this iteration
+# 	@variable <int self.nfev> : evaluations of the fit until this iteration
+# 	@variable <int self.njev> : full jacobians of the fit until this iteration
+# 	@variable <float self.t_jac> : seconds computing the jacobian
+# 	@variable <float self.t_assembly> : seconds building J^T J (or the QR)
+# 	@variable <float self.t_solve> : seconds solving the damped systems
+# 	@variable <float self.t_eval> : seconds evaluating the trial steps
+# 	@variable <float self.t> : seconds of the whole iteration
+#
+# 	@description : report of an iteration of LevenbergMarquardt, sent to the
+# 		callback of the solver
+class IterationEvent:
+	''' [ Constructors ] '''
+	# <method IterationEvent>
+	# 	@argument <int iteration> : index of the iteration
+	def __init__(self,iteration):
+		self.iteration = iteration
+		self.chiSquared = None
+		self.lamb = None
+		self.step_norm = 0.0
+		self.accepted = False
+		self.rejected = 0
+		self.nfev = 0
+		self.njev = 0
+		self.t_jac = 0.0
+		self.t_assembly = 0.0
+		self.t_solve = 0.0
+		self.t_eval = 0.0
+		self.t = 0.0
+
+	def __repr__(self):
+		return ("IterationEvent(iteration=" + str(self.iteration) + ", chiSquared=" + str(self.chiSquared)
+			+ ", lamb=" + str(self.lamb) + ", step_norm=" + str(self.step_norm)
+			+ ", rejected=" + str(self.rejected) + ", nfev=" + str(self.nfev) + ")")
+# End of <class IterationEvent>
+
+
+# <class FitResult>
+# 	@variable <list self.P> : final parameters
+# 	@variable <float self.chiSquared> : final merit (weighted chi squared)
+# 	@variable <float self.lamb> : final non-dimensional damping
+# 	@variable <int self.iterations> : iterations done
+# 	@variable <bool self.converged> : True if the merit stopped improving
+# 		(lamb_tol) with a finite chi squared, False if max_iterations was
+# 		reached, the callback stopped the fit, no lambda up to lamb_max
+# 		reduced the merit or the merit isn't finite
+# 	@variable <str self.stop> : 'tolerance', 'max_iterations', 'callback',
+# 		'lamb_max' (no lambda trial accepted up to lamb_max) or 'nonfinite'
+# 		(the chi squared of the current parameters is NaN or infinite)
+# 	@variable <int self.rejected> : total rejected lambda trials
+# 	@variable <int self.nfev> : total evaluations
+# 	@variable <int self.njev> : total full jacobians
+# 	@variable <float self.t_jac> : total seconds computing the jacobian
+# 	@variable <float self.t_assembly> : total seconds building J^T J (or QR)
+# 	@variable <float self.t_solve> : total seconds solving the damped systems
+# 	@variable <float self.t_eval> : total seconds evaluating the trial steps
+# 	@variable <float self.t> : seconds of the whole fit
+# 	@variable <list<IterationEvent> self.events> : report of every iteration
+# 	@variable <array self.JTJ> : J^T J of the last iteration (M x M)
+# 	@variable <array self.J> : jacobian of the last iteration, None if it
+# 		wasn't kept (keep_jacobian, not kept by default for sparse jacobians)
+# 		or isn't stored (out-of-core mode)
+# 	@variable <int self.dof> : degrees of freedom, residuals minus parameters
+# 	@variable <bool self.precision_limited> : True if the float32 residuals
+# 		stopped the fit before the float64 convergence (reduced precisions)
+# 	@variable <float self.chiSquared_double> : chi squared of the float64
+# 		residuals of the solution (None with double precision)
+# 	@variable <float self.predicted_decrease> : decrease of the chi squared of
+# 		a float64 Gauss-Newton step from the solution (None with double
+# 		precision)
+#
+# 	@description : totals of a fit of LevenbergMarquardt, the uncertainties
+# 		of the parameters are obtained from the J^T J of the last iteration
+# 		(the jacobian at the solution) without more evaluations
+class FitResult:
+	''' [ Constructors ] '''
+	# <method FitResult>
+	def __init__(self):
+		self.P = None
+		self.chiSquared = None
+		self.lamb = None
+		self.iterations = 0
+		self.converged = False
+		self.stop = None
+		self.rejected = 0
+		self.nfev = 0
+		self.njev = 0
+		self.t_jac = 0.0
+		self.t_assembly = 0.0
+		self.t_solve = 0.0
+		self.t_eval = 0.0
+		self.t = 0.0
+		self.events = []
+		self.JTJ = None
+		self.J = None
+		self.dof = 0
+		self.precision_limited = False
+		self.chiSquared_double = None
+		self.predicted_decrease = None
+
+	# <method add>
+	# 	@argument <IterationEvent event> : report of an iteration
+	#
+	# 	@description : stores the event and adds its trials and times
+	def add(self,event):
+		self.events.append(event)
+		self.rejected += event.rejected
+		self.t_jac += event.t_jac
+		self.t_assembly += event.t_assembly
+		self.t_solve += event.t_solve
+		self.t_eval += event.t_eval
+
+	''' [ Uncertainties ] '''
+	# <method covariance>
+	# 	@argument *absolute : if True the weights are taken as 1/sigma of each
+	# 		point, if False (default) the covariance is scaled by the reduced
+	# 		chi squared (chiSquared/dof)
+	#
+	#	@returns <array C> : covariance of the parameters (M x M)
+	def covariance(self,absolute=False):
+		if self.JTJ is None: raise ValueError("The fit has no J^T J, solve it first")
+		C = inv(self.JTJ)
+		if not absolute: C = C*(self.chiSquared/self.dof if self.dof > 0 else float('nan'))
+		return C
+
+	# <method standard_errors>
+	#	@returns <array> : standard errors of the parameters (M)
+	def standard_errors(self,absolute=False):
+		return np.sqrt(np.diag(self.covariance(absolute)))
+
+	# <method correlation>
+	#	@returns <array> : correlation matrix of the parameters (M x M)
+	def correlation(self):
+		C = self.covariance(True)
+		d = np.sqrt(np.diag(C))
+		return C/np.outer(d,d)
+
+	# <method confidence_intervals>
+	# 	@argument *z : standard errors of the half-width, 1.96 for the 95%
+	# 		of a normal distribution
+	#
+	#	@returns <array low, array high> : limits of each parameter
+	def confidence_intervals(self,z=1.96,absolute=False):
+		e = z*self.standard_errors(absolute)
+		P = np.asarray(self.P, dtype=float)
+		return P-e,P+e
+
+	def __repr__(self):
+		return ("FitResult(chiSquared=" + str(self.chiSquared) + ", iterations=" + str(self.iterations)
+			+ ", stop='" + str(self.stop) + "', nfev=" + str(self.nfev) + ", njev=" + str(self.njev)
+			+ ", t=" + str(self.t) + ")")
+# End of <class FitResult>
+
+
+# <class MultiStart>
+# 	@variable self.X, self.Y, self.f : data and function of LeastSquares
+# 	@variable self.options : other arguments of every LeastSquares (w, dP, jac,
+# 		vectorized...), they must be picklable with a process pool
+# 	@variable self.starts : initial parameters of every start
+# 	@variable self.executor : concurrent.futures executor that runs the fits of
+# 		each round in parallel, None for serial fits
+# 	@variable self.iterations : iterations of each start per round
+# 	@variable self.keep : fraction of the candidates kept after each round
+# 	@variable self.top : number of candidates refined to convergence
+# 	@variable self.pr : print selection
+# 	@variable self.candidates : FitResult of every surviving start, sorted by
+# 		chi squared after the solution (events of all the rounds included)
+# 	@variable self.P : best parameters found (None before the solution)
+# 	@variable self.chiSquared : chi squared of self.P
+# 	@variable self.nfev : evaluations of every fit
+#
+# 	@description : global fit for models with local minima (multi-exponential,
+# 		multi-peak...), a set of starts (Latin hypercube inside the bounds or
+# 		given by the user) is fitted by rounds of a few iterations, after each
+# 		round only the best fraction (by chi squared) survives and when only
+# 		self.top candidates remain they are fitted to convergence
+#
+# 	@author : Daniel Ríos Linares
+class MultiStart:
+	''' [ Constructors ] '''
+	# <function MultiStart>
+	# 	@argument X, Y, f : data and function to fit (see LeastSquares)
+	# 	@argument *bounds : list of (low, high) of each parameter, the starts are
+	# 		a Latin hypercube sampling of the box
+	# 	@argument *starts : list of initial parameters, instead of (or added to)
+	# 		the sampled ones
+	# 	@argument *n_starts : number of sampled starts (with bounds)
+	# 	@argument *executor : concurrent.futures executor for the fits, with a
+	# 		ProcessPoolExecutor f (and the options) must be picklable
+	# 	@argument *iterations : iterations of each start per round
+	# 	@argument *keep : fraction of the candidates kept after each round
+	# 	@argument *top : number of candidates refined to convergence
+	# 	@argument *seed : seed of the Latin hypercube sampling
+	# 	@argument *pr : print selection
+	# 	@argument **options : other arguments of LeastSquares
+	def __init__(self, X, Y, f, bounds=None, starts=None, n_starts=16, executor=None, iterations=5, keep=0.5, top=2, seed=None, pr=False, **options):
+		if bounds == None and starts == None:
+			raise ValueError("MultiStart requires bounds or starts")
+		if not 0 < keep < 1:
+			raise ValueError("keep must be between 0 and 1")
+		self.X = X
+		self.Y = Y
+		self.f = f
+		self.options = options
+		self.executor = executor
+		self.iterations = max(1,int(iterations))
+		self.keep = keep
+		self.top = max(1,int(top))
+		self.pr = True if pr == True else False
+
+		# Starts given by the user and sampled in the bounds
+		self.starts = [list(P) for P in starts] if starts != None else []
+		if bounds != None: self.starts += self.latin_hypercube(bounds,n_starts,seed)
+
+		self.candidates = []
+		self.P = None
+		self.chiSquared = None
+		self.nfev = 0
+
+	''' [ Solve ] '''
+	# <method solve>
+	#	@returns <list P> : best parameters found
+	#
+	#	@description : rounds of self.iterations iterations and pruning until
+	#		self.top candidates remain, then they are fitted to convergence
+	def solve(self):
+		# 1) Every start is a candidate without iterations
+		candidates = []
+		for P in self.starts:
+			candidate = FitResult()
+			candidate.P = P
+			candidate.lamb = 1e-3
+			candidates.append(candidate)
+
+		# 2) Short rounds, the converged candidates aren't fitted again
+		rounds = 0
+		while len(candidates) > self.top:
+			self.run([c for c in candidates if not c.converged],self.iterations)
+			candidates.sort(key=self.rank)
+			n = max(self.top,min(len(candidates)-1,int(np.ceil(self.keep*len(candidates)))))
+			candidates = candidates[:n]
+			rounds += 1
+			if self.pr:
+				print("  round " + str(rounds) + ", candidates = " + str(len(candidates)) + ", best sum of squares = " + str(candidates[0].chiSquared))
+
+		# 3) Refinement of the best candidates
+		self.run([c for c in candidates if not c.converged],None)
+		candidates.sort(key=self.rank)
+		self.candidates = candidates
+		self.P = list(candidates[0].P)
+		self.chiSquared = candidates[0].chiSquared
+		if self.pr:
+			print("Finished! (" + str(len(self.starts)) + " starts, " + str(self.nfev) + " evaluations)")
+			print("  best sum of squares = " + str(self.chiSquared))
+		return self.P
+
+	''' [ Internal computation ] '''
+	# <method run>
+	# 	@argument <list<FitResult> candidates> : candidates to fit, they are
+	# 		updated with the new results
+	# 	@argument <int iterations> : maximum iterations, None to convergence
+	#
+	# 	@description : fits the candidates serially or with self.executor
+	def run(self,candidates,iterations):
+		if len(candidates) == 0: return
+		tasks = [(self.X,self.Y,self.f,c.P,c.lamb,iterations,self.options) for c in candidates]
+		if self.executor == None:
+			results = [MultiStart.fit(task) for task in tasks]
+		else:
+			workers = getattr(self.executor,'_max_workers',None) or os.cpu_count() or 1
+			results = list(self.executor.map(MultiStart.fit,tasks,chunksize=max(1,-(-len(tasks)//workers))))
+		for candidate,result in zip(candidates,results):
+			events = candidate.events+result.events
+			iterations = candidate.iterations+result.iterations
+			candidate.__dict__.update(result.__dict__)
+			candidate.events = events
+			candidate.iterations = iterations
+			self.nfev += result.nfev
+
+	# <method fit>
+	# 	@argument <tuple task> : X, Y, f, P, lamb, iterations and options
+	#
+	#	@returns <FitResult> : result of the fit, with the damping of the last
+	# 		accepted step as lamb (to continue the fit in the next round)
+	#
+	# 	@description : fit of a candidate, it is executed by the workers of the
+	# 		executor so it must be a function of the module (not a method)
+	@staticmethod
+	def fit(task):
+		X,Y,f,P,lamb,iterations,options = task
+		fitter = LeastSquares(X,Y,f,list(P),**options)
+		callback = (lambda event: event.iteration >= iterations-1) if iterations != None else None
+		fitter.solve(callback=callback,lamb=lamb)
+		result = fitter.result
+		accepted = [event.lamb for event in result.events if event.accepted]
+		if len(accepted) > 0: result.lamb = max(accepted[-1],LevenbergMarquardt.lamb_tol)
+		else: result.lamb = lamb
+		result.nfev = fitter.nfev
+		return result
+
+	# <method rank>
+	# 	@argument <FitResult candidate> : candidate
+	#
+	#	@returns <float> : chi squared of the candidate (infinite if it isn't
+	# 		a number) used to sort the candidates
+	def rank(self,candidate):
+		chi_squared = candidate.chiSquared
+		return chi_squared if chi_squared != None and np.isfinite(chi_squared) else float('inf')
+
+	# <method latin_hypercube>
+	# 	@argument <list bounds> : (low, high) of each parameter
+	# 	@argument <int n> : number of starts
+	# 	@argument <int seed> : seed of the random generator
+	#
+	#	@returns <list<list>> : n parameter lists, the range of each parameter
+	# 		is split in n strata and each stratum is used by only one start
+	def latin_hypercube(self,bounds,n,seed):
+		rng = np.random.default_rng(seed)
+		n = max(1,int(n))
+		samples = np.empty((n,len(bounds)))
+		for j,(low,high) in enumerate(bounds):
+			u = (rng.permutation(n)+rng.random(n))/n
+			samples[:,j] = low+u*(high-low)
+		return [list(map(float,P)) for P in samples]
+# End of <class MultiStart>
+
+
+# <class LeastSquaresBatch>
+# 	@variable self.X : independient data, K x N (K x N x dimX) for one data set
+# 		per fit, or N (N x dimX) shared by all the fits
+# 	@variable self.Y : dependient data, K x N, one row per fit
+# 	@variable self.f : vectorized function(array X, array P) to fit, X is a
+# 		k x N (k x N x dimX) block and P a M x k x 1 array, so the usual
+# 		unpacking "a,b = P" gives columns that broadcast with X, must return
+# 		the k x N predictions
+# 	@variable self.P : K x M array of parameters, one row per fit
+# 	@variable self.w : vectorized weight function(array X, array P), same
+# 		arguments of self.f and returns k x N weights (or a scalar)
+# 	@variable self.dP : dimensional parameter variation, lenght M
+# 	@variable self.jac : analytic jacobian function(array X, array P) of
+# 		self.f returning k x N x M, if None it is computed numerically
+# 	@variable self.jac_mode : numerical jacobian scheme, 'central' or 'forward'
+# 	@variable self.pr : print selection
+# 	@variable self.K : number of independent fits
+# 	@variable self.N : number of points of every fit
+# 	@variable self.M : number of parameters of every fit
+# 	@variable self.lamb : K non-dimensional dampings, one per fit
+# 	@variable self.converged : K booleans, True when the fit has converged
+# 	@variable self.stop : K reasons of the end of each fit, 'tolerance',
+# 		'max_iterations', 'lamb_max' or 'nonfinite' (as FitResult.stop)
+# 	@variable self.iterations : K iterations done by each fit
+# 	@variable self.chiSquared : K final chi squared (weighted)
+#
+# 	@description : fits the same model to K independent data sets with the
+# 		Levenberg-Marquardt algorithm (class LevenbergMarquardtBatch in this
+# 		same file), every iteration is done for all the fits at once with
+# 		numpy operations instead of K LeastSquares objects.
+#
+# 	@author : Daniel Ríos Linares
+#
+#	@version : 0.1.0
+class LeastSquaresBatch:
+	''' [ Static variables ] '''
+	# Numerical jacobian schemes
+	jac_modes = ('central','forward')
+
+	''' [ Constructors ] '''
+	# <function LeastSquaresBatch>
+	# 	@argument X : independient data, K x N (x dimX) or shared N (x dimX)
+	# 	@argument Y : dependient data, K x N
+	# 	@argument f : vectorized function(array X, array P) to fit
+	# 	@argument P : initial guess, M (same for every fit) or K x M
+	# 	@argument *w : vectorized weight function(array X, array P)
+	# 	@argument *dP : dimensional parameter variation, lenght M
+	# 	@argument *jac : analytic jacobian function(array X, array P)
+	# 	@argument *jac_mode : numerical jacobian, 'central' or 'forward'
+	# 	@argument *pr : print selection (if True, terminal output displayed)
+	def __init__(self, X, Y, f, P, w=None, dP=None, jac=None, jac_mode='central', pr=False):
+
+		# Data, one row of Y per fit
+		self.Y = np.asarray(Y, dtype=float)
+		self.K,self.N = self.Y.shape
+		self.X = np.asarray(X, dtype=float)
+		self.shared_X = self.X.ndim == 1 or self.X.shape[:2] != (self.K,self.N)
+		if self.shared_X: self.X = self.X[np.newaxis]
+
+		# Functions to fit and weight
+		self.f = f
+		self.w = w if (w != None) else self.w_default
+
+		# Parameters, one row per fit
+		P = np.asarray(P, dtype=float)
+		self.P = np.array(np.broadcast_to(P, (self.K,P.shape[-1])))
+		self.M = self.P.shape[1]
+		self.dP = np.asarray(dP, dtype=float) if (dP is not None) else np.full(self.M,1e-6)
+
+		# Jacobian
+		if jac_mode not in self.jac_modes:
+			raise ValueError("Unknown jac_mode '" + str(jac_mode) + "', use one of " + str(self.jac_modes))
+		self.jac = jac
+		self.jac_mode = jac_mode
+
+		# State of every fit
+		self.lamb = np.full(self.K,1e-3)
+		self.converged = np.zeros(self.K, dtype=bool)
+		self.stop = np.full(self.K, None, dtype=object)
+		self.iterations = np.zeros(self.K, dtype=int)
+		self.chiSquared = np.zeros(self.K)
+
+		# Print iterations?
+		self.pr = True if pr == True else False
+
+	''' [ Solve ] '''
+	# <method solve>
+	#	@returns <array P> : returns self.P (K x M) after solution
+	#
+	#	@description : operates the main loop of the batch solver
+	def solve(self):
+		solver = LevenbergMarquardtBatch(self,self.pr)
+		solver.solve()
+		if self.pr:
+			print("Finished! " + str(int(np.sum(self.converged))) + " of " + str(self.K) + " fits converged")
+		return self.P
+
+	''' [ Internal functions ] '''
+	# <method w_default>
+	# 	@description : default weighting 1 for every point
+	def w_default(self,X,P): return 1.0
+
+	# <method data>
+	# 	@argument <array k> : indexes of the fits
+	#
+	#	@returns <array X> : independient data of the fits k
+	def data(self,k):
+		return self.X if self.shared_X else self.X[k]
+
+	# <method calc_residuals>
+	# 	@argument <array P> : k x M parameters
+	# 	@argument <array k> : indexes of the fits
+	#
+	#	@returns <array R> : k x N weighted residuals
+	def calc_residuals(self,P,k):
+		X = self.data(k)
+		Pc = P.T[:,:,np.newaxis]
+		F = np.asarray(self.f(X,Pc))
+		W = np.asarray(self.w(X,Pc))
+		return np.where(W != 0, (F-self.Y[k])*W, 0)
+
+	# <method calc_jac>
+	# 	@argument <array P> : k x M parameters
+	# 	@argument <array k> : indexes of the fits
+	# 	@argument <array R> : k x N residuals at P (reused by 'forward')
+	#
+	#	@returns <array J> : k x N x M jacobian of the residuals
+	def calc_jac(self,P,k,R):
+		# Analytic jacobian defined by the user
+		if self.jac != None:
+			X = self.data(k)
+			Pc = P.T[:,:,np.newaxis]
+			D = np.asarray(self.jac(X,Pc), dtype=float)
+			W = np.asarray(self.w(X,Pc), dtype=float)
+			return D*np.broadcast_to(W, R.shape)[:,:,np.newaxis]
+
+		J = np.zeros(R.shape+(self.M,))
+		for j in range(self.M):
+			p = P.copy()
+			p[:,j] += self.dP[j]
+			chi_p = self.calc_residuals(p,k)
+			if self.jac_mode == 'forward':
+				J[:,:,j] = (chi_p-R)/self.dP[j]
+			else:
+				p[:,j] -= 2*self.dP[j]
+				J[:,:,j] = (chi_p-self.calc_residuals(p,k))/(2*self.dP[j])
+		return J
+
+# End of <class LeastSquaresBatch>
+
+
+# <class LevenbergMarquardtBatch>
+# 	@variable <LeastSquaresBatch.object self.host> : host of the parameters
+# 	@variable <bool *self.pr> : print selectable
+#
+# 	@description : same algorithm of LevenbergMarquardt (and its static
+# 		settings) for all the fits of a LeastSquaresBatch at once, each fit
+# 		has its own lambda, convergence flag and stop reason, and the
+# 		converged (or stuck) fits are removed from the active set so they
+# 		aren't computed anymore. The
+# 		damped systems of the active fits are solved together with a stacked
+# 		Cholesky factorization.
+#
+# 	@author : Daniel Ríos Linares
+#
+#	@version : 0.1.0
+class LevenbergMarquardtBatch:
+
+	''' [ Constructors ] '''
+	# <method LevenbergMarquardtBatch>
+	# 	@argument <LeastSquaresBatch self.host> : host of the parameters
+	# 	@argument <boolean *self.pr> : print selectable
+	def __init__(self,host,pr = True):
+		self.host = host
+		self.pr = pr
+
+	''' [ Solve ] '''
+	# solve() : void function(void)
+	#	@description : executes the solver
+	def solve(self):
+		# Class variables shortcut
+		host = self.host
+		lm = LevenbergMarquardt
+
+		# 1) Active set, every fit not converged yet
+		active = np.flatnonzero(~host.converged)
+		host.stop[active] = 'max_iterations'
+		count = 0
+
+		# 2) Levenberg-Marquardt loop initialization, the fits with a non
+		#    finite chi squared leave the active set
+		while count < lm.max_iterations and len(active) > 0:
+			P = host.P[active]
+			R = host.calc_residuals(P,active)
+			chiSquared_last = np.sum(R**2,axis=1)
+			finite = np.isfinite(chiSquared_last)
+			if not np.all(finite):
+				host.chiSquared[active[~finite]] = chiSquared_last[~finite]
+				host.stop[active[~finite]] = 'nonfinite'
+				active,P,R,chiSquared_last = active[finite],P[finite],R[finite],chiSquared_last[finite]
+				if len(active) == 0: break
+			J = host.calc_jac(P,active,R)
+
+			if count % 10 == 0 and self.pr:
+				print("  iteration " + str(count) + ", active fits = " + str(len(active)) + ", sum of squares = " + str(np.sum(chiSquared_last)))
+
+			# 3) Normal equations of every active fit
+			alph = np.einsum('kij,kil->kjl',J,J)
+			beta = -np.einsum('kij,ki->kj',J,R)
+			scale = np.diagonal(alph,axis1=1,axis2=2).copy()
+			scale[scale <= 0] = 1
+
+			# 4) Levenberg-Marquardt loop, pending are the fits still trying
+			#    a lambda and merit_rel their last change of chi squared
+			lamb = host.lamb[active]
+			merit_rel = np.full(len(active),float('inf'))
+			pending = np.ones(len(active), dtype=bool)
+			while np.any(pending):
+				t = np.flatnonzero(pending)
+
+				# 4a) Solve (alph+lamb*diag(alph))*delt = beta of pending fits
+				delt,ok = self.step_cholesky(alph[t],beta[t],scale[t],lamb[t])
+				lamb[t[~ok]] *= lm.lamb_dmp
+				t,delt = t[ok],delt[ok]
+
+				R_new = host.calc_residuals(P[t]+delt,active[t])
+				chiSquared = np.sum(R_new**2,axis=1)
+				merit_rel[t] = chiSquared-chiSquared_last[t]
+				merit_rel[t[~np.isfinite(merit_rel[t])]] = np.inf # worse
+
+				# 4b) Accepted steps move the parameters of their fit
+				accepted = merit_rel[t] <= 0
+				P[t[accepted]] += delt[accepted]
+				chiSquared_last[t[accepted]] = chiSquared[accepted]
+				lamb[t[accepted]] /= lm.lamb_dmp
+				lamb[t[~accepted]] *= lm.lamb_dmp
+				pending[t[accepted]] = False
+
+				# 4c) Fits without possible improvement stop trying
+				pending &= (lamb < lm.lamb_max) & (merit_rel > lm.lamb_tol)
+
+			# 5) Store the state and drop the fits that can't reduce more their
+			#    merit, converged unless no lambda up to lamb_max was accepted
+			host.P[active] = P
+			host.lamb[active] = lamb
+			host.chiSquared[active] = chiSquared_last
+			host.iterations[active] += 1
+			done = ~(merit_rel <= -lm.lamb_tol)
+			stuck = done & (merit_rel > 0) & (lamb >= lm.lamb_max)
+			host.stop[active[stuck]] = 'lamb_max'
+			host.stop[active[done & ~stuck]] = 'tolerance'
+			host.converged[active[done & ~stuck]] = True
+			active = active[~done]
+
+			count += 1
+		if self.pr: print("  iteration " + str(count) + ", active fits = " + str(len(active)))
+
+	''' [ Step solvers ] '''
+	# <method step_cholesky>
+	# 	@argument <array alph> : k x M x M matrices J^T J
+	# 	@argument <array beta> : k x M vectors -J^T r
+	# 	@argument <array scale> : k x M diagonals of the damping
+	# 	@argument <array lamb> : k non-dimensional dampings
+	#
+	#	@returns <array delt, array ok> : k x M steps and k booleans, False when
+	# 		the damped matrix of the fit isn't positive definite
+	#
+	# 	@description : solves the stacked damped systems at once, if one of
+	# 		them fails they are factorized one by one to find the wrong ones
+	def step_cholesky(self,alph,beta,scale,lamb):
+		A = alph.copy()
+		d = np.arange(A.shape[1])
+		A[:,d,d] += lamb[:,np.newaxis]*scale
+		ok = np.ones(len(A), dtype=bool)
+		try:
+			L = cholesky(A)
+		except LinAlgError:
+			L = np.zeros(A.shape)
+			for k in range(len(A)):
+				try: L[k] = cholesky(A[k])
+				except LinAlgError: ok[k] = False
+			L[~ok] = np.eye(A.shape[1])
+		y = solve(L,beta[:,:,np.newaxis])
+		return solve(L.transpose(0,2,1),y)[:,:,0],ok
+
+# End of <class LevenbergMarquardtBatch>
+
 # End of file : fitting.py
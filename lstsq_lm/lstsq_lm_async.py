@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+
+"""
+lstsq_lm_async
+	@version : 0.1.0
+
+	@author : Daniel Ríos Linares (c) 2017, hasbornasu@gmail.com
+
+	@description : asyncio front end of lstsq_lm for services, the fits are
+		solved in worker threads so the event loop isn't blocked, with a
+		limit of concurrent fits, a limit of pending fits (backpressure),
+		timeouts and cancellation between the iterations of the
+		Levenberg-Marquardt algorithm. The fits are split in two lanes with
+		their own workers, so the long fits can't starve the short ones.
+
+	@name : lstsq_lm_async
+		    |        |
+		    |        asyncio
+		    Least squares Levenberg-Marquardt
+
+	@license : GPL-3.0
+		This program is free software: you can redistribute it and/or modify
+		it under the terms of the GNU General Public License as published by
+		the Free Software Foundation, either version 3 of the License, or
+		(at your option) any later version.
+
+		This program is distributed in the hope that it will be useful,
+		but WITHOUT ANY WARRANTY; without even the implied warranty of
+		MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+		GNU General Public License for more details.
+
+		You should have received a copy of the GNU General Public License
+		along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# You need to have the lstsq_lm.py file in the same folder, if not change it!
+from lstsq_lm import LeastSquares
+
+# Required for the workers and the cancellation of the fits
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import asyncio
+import time
+
+# <class FitServiceBusy>
+# 	@description : raised by FitService.fit when there are already
+# 		FitService.max_pending fits waiting or running
+class FitServiceBusy(RuntimeError):
+	pass
+# End of <class FitServiceBusy>
+
+
+# <class FitService>
+# 	@variable <dict self.workers> : number of worker threads of each lane
+# 	@variable <int self.long_size> : size (points x parameters) from which a
+# 		fit goes to the 'long' lane
+# 	@variable <int self.max_pending> : maximum number of fits waiting or
+# 		running, the next ones raise FitServiceBusy
+# 	@variable <int self.pending> : fits waiting or running
+# 	@variable <dict self.executors> : ThreadPoolExecutor of each lane
+# 	@variable <dict self.semaphores> : asyncio.Semaphore of each lane of each
+# 		event loop (a semaphore is bound to the loop where it is used, the
+# 		service can be shared by several asyncio.run), a fit only
+# 		reaches its executor when there is a free worker, so a waiting fit can
+# 		be cancelled or time out without using a worker
+#
+# 	@description : asyncio service of LeastSquares fits, await self.fit(...)
+# 		returns the FitResult of the fit (with the final P). The fits are
+# 		stopped between iterations when the awaiting task is cancelled or the
+# 		timeout expires, the worker is released at the next iteration.
+#
+# 	@author : Daniel Ríos Linares
+class FitService:
+	''' [ Static variables ] '''
+	lanes = ('short','long') # lanes of fits with their own workers
+
+	''' [ Constructors ] '''
+	# <function FitService>
+	# 	@argument *workers : worker threads of the 'short' lane
+	# 	@argument *long_workers : worker threads of the 'long' lane
+	# 	@argument *long_size : size (points x parameters) from which a fit goes
+	# 		to the 'long' lane
+	# 	@argument *max_pending : maximum number of fits waiting or running
+	def __init__(self, workers=4, long_workers=1, long_size=100000, max_pending=64):
+		self.workers = {'short':max(1,int(workers)), 'long':max(1,int(long_workers))}
+		self.long_size = long_size
+		self.max_pending = max_pending
+		self.pending = 0
+		self.executors = {lane:ThreadPoolExecutor(self.workers[lane]) for lane in self.lanes}
+		self.semaphores = {}
+
+	''' [ Fit ] '''
+	# <method fit>
+	# 	@argument X, Y, *f, *P : data, function and initial parameters of
+	# 		LeastSquares
+	# 	@argument *timeout : seconds for the fit (waiting included), None for
+	# 		no limit, asyncio.TimeoutError is raised when it expires
+	# 	@argument *lane : 'short' or 'long', by default it is chosen by the
+	# 		size of the fit
+	# 	@argument *method, *jac_update, *jac_refresh : LeastSquares.solve
+	# 	@argument **options : other arguments of LeastSquares
+	#
+	#	@returns <FitResult> : result of the fit (see lstsq_lm.FitResult)
+	#
+	# 	@description : waits a free worker of the lane and solves the fit in
+	# 		it without blocking the event loop
+	async def fit(self, X, Y, f=None, P=None, timeout=None, lane=None, method='cholesky', jac_update='full', jac_refresh=10, **options):
+		lane = lane if lane != None else self.classify(X,P)
+		if lane not in self.lanes:
+			raise ValueError("Unknown lane '" + str(lane) + "', use one of " + str(self.lanes))
+
+		# 1) Backpressure, the request is rejected instead of queued
+		if self.pending >= self.max_pending:
+			raise FitServiceBusy("There are already " + str(self.pending) + " fits pending")
+		self.pending += 1
+
+		stop = threading.Event()
+		deadline = time.monotonic()+timeout if timeout != None else None
+		semaphore = self.semaphore(lane)
+		future = None
+		acquired = False
+		try:
+			# 2) Free worker of the lane (the wait counts for the timeout)
+			await asyncio.wait_for(semaphore.acquire(), self.remaining(deadline))
+			acquired = True
+
+			# 3) Fit in the worker, cancelled or expired fits are stopped at
+			#    the next iteration
+			loop = asyncio.get_running_loop()
+			future = loop.run_in_executor(self.executors[lane], self.run, X, Y, f, P, options, method, jac_update, jac_refresh, stop, deadline)
+			return await asyncio.wait_for(asyncio.shield(future), self.remaining(deadline))
+		finally:
+			stop.set()
+			if future != None and not future.done():
+				# The worker (and its place in the lane) is released when the
+				# fit stops, without keeping the caller waiting
+				future.add_done_callback(lambda future: self.release(semaphore,future))
+			else:
+				if acquired: semaphore.release()
+				self.pending -= 1
+
+	# <method run>
+	#	@returns <FitResult> : result of the fit
+	#
+	# 	@description : executed by the worker thread, the fit is stopped by
+	# 		the callback of the iterations when stop is set or the deadline
+	# 		has passed
+	def run(self, X, Y, f, P, options, method, jac_update, jac_refresh, stop, deadline):
+		if stop.is_set(): return None
+		fitter = LeastSquares(X, Y, f, P, **options)
+		def callback(event):
+			return stop.is_set() or (deadline != None and time.monotonic() > deadline)
+		fitter.solve(method, jac_update, jac_refresh, callback)
+		return fitter.result
+
+	''' [ Internal functions ] '''
+	# <method classify>
+	#	@returns <str lane> : 'long' if the points times the parameters reach
+	# 		self.long_size, 'short' if not
+	def classify(self,X,P):
+		M = len(P) if P is not None else 1
+		return 'long' if len(X)*M >= self.long_size else 'short'
+
+	# <method semaphore>
+	#	@returns <asyncio.Semaphore> : semaphore of the lane in the running
+	# 		event loop, created the first time (the semaphores of the closed
+	# 		loops are dropped)
+	def semaphore(self,lane):
+		loop = asyncio.get_running_loop()
+		if loop not in self.semaphores:
+			for closed in [l for l in self.semaphores if l.is_closed()]: del self.semaphores[closed]
+		semaphores = self.semaphores.setdefault(loop, {})
+		if lane not in semaphores: semaphores[lane] = asyncio.Semaphore(self.workers[lane])
+		return semaphores[lane]
+
+	# <method remaining>
+	#	@returns <float> : seconds until the deadline (None without deadline)
+	def remaining(self,deadline):
+		return None if deadline == None else max(0.0,deadline-time.monotonic())
+
+	# <method release>
+	# 	@description : releases the worker of a stopped fit
+	def release(self,semaphore,future):
+		if not future.cancelled(): future.exception()
+		semaphore.release()
+		self.pending -= 1
+
+	''' [ Shutdown ] '''
+	# <method close>
+	# 	@description : waits the running fits and stops the workers
+	def close(self):
+		for executor in self.executors.values(): executor.shutdown(wait=True)
+
+	async def __aenter__(self): return self
+
+	async def __aexit__(self, *exc):
+		await asyncio.get_running_loop().run_in_executor(None, self.close)
+# End of <class FitService>
+
+
+# Service of the module function fit, created with the first fit
+default_service = None
+
+# <function fit>
+# 	@argument X, Y, *f, *P, **options : arguments of FitService.fit
+#
+#	@returns <FitResult> : result of the fit
+#
+# 	@description : await fit(X, Y, f, P) with a FitService shared by the module
+async def fit(X, Y, f=None, P=None, **options):
+	global default_service
+	if default_service == None: default_service = FitService()
+	return await default_service.fit(X, Y, f, P, **options)
+
+# End of file : lstsq_lm_async.py
@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+
+"""
+lstsq_lm_benchmark
+	@version : 0.1.0
+
+	@author : Daniel Ríos Linares (c) 2017, hasbornasu@gmail.com
+
+	@description : reproducible benchmark of lstsq_lm, the cases of
+		lstsq_lm_examples.py (linear regression, RC discharge, planar fit of a
+		2D set of points, FET family of curves with a weight function) and
+		synthetic scaling cases (sweeps of the number of
+		points N, of parameters M and of columns of Y dimY, with list and
+		vectorized models). For each case it records the wall time, the
+		evaluations, jacobians and iterations of the fit and the peak memory,
+		and writes them as JSON to compare runs (--compare old.json reports
+		the cases slower, with more evaluations, not converged anymore or
+		with a larger chi squared than the old run, the median times are
+		compared and the slowdowns under --floor seconds are ignored as
+		timer noise).
+
+		python lstsq_lm_benchmark.py --output new.json --compare old.json
+
+	@name : lstsq_lm_benchmark
+
+	@license : GPL-3.0
+		This program is free software: you can redistribute it and/or modify
+		it under the terms of the GNU General Public License as published by
+		the Free Software Foundation, either version 3 of the License, or
+		(at your option) any later version.
+
+		This program is distributed in the hope that it will be useful,
+		but WITHOUT ANY WARRANTY; without even the implied warranty of
+		MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+		GNU General Public License for more details.
+
+		You should have received a copy of the GNU General Public License
+		along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# You need to have the lstsq_lm.py file in the same folder, if not change it!
+from lstsq_lm import LeastSquares
+
+# Other stuff
+import numpy as np
+import tracemalloc
+import platform
+import argparse
+import statistics
+import json
+import math
+import time
+import sys
+
+################################################################################
+# MODELS : module functions, so they can be used with process pools
+################################################################################
+# RC discharge of lstsq_lm_examples.py (example 002)
+def rc(t,P):
+	V0,RC = P
+	return V0*math.exp(-t/RC)
+
+# RC discharge (vectorized model, every point)
+def rc_vectorized(T,P):
+	V0,RC = P
+	return V0*np.exp(-T/RC)
+
+# FET transistor of lstsq_lm_examples.py (example 004), x = (VGS,VDS)
+def fet(x,P):
+	VGS,VDS = x
+	kn,Vth,lambd = P
+	if VGS < Vth: return 0 # cutoff
+	if VGS-Vth <= VDS: return 0.5*kn*(VGS-Vth)**2*(1+lambd*VDS) # saturation
+	return kn*(VGS-Vth-0.5*VDS)*VDS*(1+lambd*VDS) # triode
+
+# FET transistor (vectorized model, every point)
+def fet_vectorized(X,P):
+	VGS,VDS = X[:,0],X[:,1]
+	kn,Vth,lambd = P
+	V = np.maximum(VGS-Vth,0)
+	return np.where(V <= VDS, 0.5*kn*V**2, kn*(V-0.5*VDS)*VDS)*(1+lambd*VDS)
+
+# Weight of example 004, only the points with VDS > 10 are fitted
+def fet_weight(x,P):
+	return 1 if x[1] > 10 else 0
+
+# Weight of example 004 (vectorized)
+def fet_weight_vectorized(X,P):
+	return (X[:,1] > 10).astype(float)
+
+# Sum of exponentials, M = 2*terms (list model, one point)
+def exponentials(x,P):
+	y = 0
+	for k in range(0,len(P),2): y += P[k]*math.exp(-x/P[k+1])
+	return y
+
+# Sum of exponentials, M = 2*terms (vectorized model, every point)
+def exponentials_vectorized(X,P):
+	y = np.zeros(len(X))
+	for k in range(0,len(P),2): y += P[k]*np.exp(-X/P[k+1])
+	return y
+
+# Outputs a*exp(-x/b)+c of each column k (list model), M = 3*dimY
+def outputs(x,P):
+	y = [P[3*k]*math.exp(-x/P[3*k+1])+P[3*k+2] for k in range(len(P)//3)]
+	return y if len(y) > 1 else y[0]
+
+# Outputs a*exp(-x/b)+c of each column k (vectorized model)
+def outputs_vectorized(X,P):
+	Y = np.stack([P[3*k]*np.exp(-X/P[3*k+1])+P[3*k+2] for k in range(len(P)//3)],axis=1)
+	return Y if Y.shape[1] > 1 else Y[:,0]
+
+################################################################################
+# CASES : each case returns the arguments of LeastSquares
+################################################################################
+# <function case_linear>
+#	@returns <dict> : linear regression with noise (example 001)
+def case_linear(N,vectorized,rng):
+	X = np.linspace(0,4,N)
+	Y = 2*X+3+rng.uniform(-0.5,0.5,N)
+	return dict(X=X if vectorized else list(X), Y=Y if vectorized else list(Y), P=[1,1], vectorized=vectorized)
+
+# <function case_rc>
+#	@returns <dict> : RC discharge (example 002) of N points
+def case_rc(N,vectorized,rng):
+	T = np.linspace(0,700,N)
+	V = rc_vectorized(T,[2.0,200.0])*(1+0.01*rng.standard_normal(N))
+	if vectorized: return dict(X=T, Y=V, f=rc_vectorized, P=[2,280], vectorized=True)
+	return dict(X=list(T), Y=list(V), f=rc, P=[2,280])
+
+# <function case_planar>
+#	@returns <dict> : planar regression of a 2D set of points (example 003)
+def case_planar(N,vectorized,rng):
+	n = max(2,int(math.sqrt(N)))
+	X = np.array([[i,j] for i in np.linspace(0,2,n) for j in np.linspace(0,2,n)])
+	Z = X[:,0]+2*X[:,1]+3+rng.uniform(-0.5,0.5,len(X))
+	return dict(X=X if vectorized else X.tolist(), Y=Z if vectorized else list(Z), P=[0.5,0.5,0.5], vectorized=vectorized)
+
+# <function case_fet>
+#	@returns <dict> : FET family of curves (VGS = 6, 8, 10 V) of N points with
+# 		the weight function w (example 004), from its initial parameters
+def case_fet(N,vectorized,rng):
+	n = max(2,N//3)
+	X = np.array([[VGS,VDS] for VGS in (6.0,8.0,10.0) for VDS in np.linspace(0,20,n)])
+	Y = fet_vectorized(X,[0.97,3.6,0.015])*(1+0.01*rng.standard_normal(len(X)))
+	if vectorized: return dict(X=X, Y=Y, f=fet_vectorized, P=[33e-6,2.0,0.1], w=fet_weight_vectorized, vectorized=True)
+	return dict(X=X.tolist(), Y=list(Y), f=fet, P=[33e-6,2.0,0.1], w=fet_weight)
+
+# <function case_exponentials>
+#	@returns <dict> : sum of M/2 exponentials (sweep of M)
+def case_exponentials(N,M,vectorized,rng):
+	X = np.linspace(0.01,10,N)
+	P = [v for k in range(M//2) for v in (1.0+k,0.3*3**k)]
+	Y = exponentials_vectorized(X,P)*(1+0.001*rng.standard_normal(N))
+	P0 = [v*1.1 for v in P]
+	if vectorized: return dict(X=X, Y=Y, f=exponentials_vectorized, P=P0, vectorized=True)
+	return dict(X=list(X), Y=list(Y), f=exponentials, P=P0)
+
+# <function case_outputs>
+#	@returns <dict> : dimY outputs of 3 parameters each (sweep of dimY)
+def case_outputs(N,dimY,vectorized,rng):
+	X = np.linspace(0,5,N)
+	P = [v for k in range(dimY) for v in (1.0+k,1.0+0.5*k,float(k))]
+	Y = outputs_vectorized(X,P)+0.001*rng.standard_normal((N,dimY) if dimY > 1 else N)
+	P0 = [v*1.1+0.01 for v in P]
+	if vectorized: return dict(X=X, Y=Y, f=outputs_vectorized, P=P0, vectorized=True)
+	return dict(X=list(X), Y=Y.tolist(), f=outputs, P=P0)
+
+# <function cases>
+# 	@argument <bool quick> : small sweep
+#
+#	@returns <list<tuple>> : (name, parameters, builder) of every case
+def cases(quick):
+	Ns = [100,1000] if quick else [100,1000,10000]
+	Ms = [2,4] if quick else [2,4,8]
+	dimYs = [1,2] if quick else [1,2,4,6]
+	list_limit = 1000 # the list models are slow, larger N only vectorized
+	result = []
+	for N in Ns:
+		for vectorized in (False,True):
+			if not vectorized and N > list_limit: continue
+			mode = 'vectorized' if vectorized else 'list'
+			result.append(('linear',dict(N=N,M=2,dimY=1,mode=mode),lambda rng,N=N,v=vectorized: case_linear(N,v,rng)))
+			result.append(('planar',dict(N=N,M=3,dimY=1,mode=mode),lambda rng,N=N,v=vectorized: case_planar(N,v,rng)))
+			result.append(('rc',dict(N=N,M=2,dimY=1,mode=mode),lambda rng,N=N,v=vectorized: case_rc(N,v,rng)))
+			result.append(('fet',dict(N=N,M=3,dimY=1,mode=mode),lambda rng,N=N,v=vectorized: case_fet(N,v,rng)))
+	for N in Ns:
+		for M in Ms:
+			for vectorized in (False,True):
+				if not vectorized and N > list_limit: continue
+				mode = 'vectorized' if vectorized else 'list'
+				result.append(('exponentials',dict(N=N,M=M,dimY=1,mode=mode),lambda rng,N=N,M=M,v=vectorized: case_exponentials(N,M,v,rng)))
+	for N in Ns:
+		for dimY in dimYs:
+			for vectorized in (False,True):
+				if not vectorized and N > list_limit: continue
+				mode = 'vectorized' if vectorized else 'list'
+				result.append(('outputs',dict(N=N,M=3*dimY,dimY=dimY,mode=mode),lambda rng,N=N,d=dimY,v=vectorized: case_outputs(N,d,v,rng)))
+	return result
+
+################################################################################
+# BENCHMARK
+################################################################################
+# <function run_case>
+# 	@argument <function builder> : case builder
+# 	@argument <int repeat> : number of timed fits (the best, mean and median
+# 		times are kept)
+# 	@argument <int seed> : seed of the noise of the data
+#
+#	@returns <dict> : measures of the case
+def run_case(builder,repeat,seed):
+	times = []
+	for r in range(repeat):
+		args = builder(np.random.default_rng(seed))
+		t = time.perf_counter()
+		fitter = LeastSquares(**args)
+		fitter.solve()
+		times.append(time.perf_counter()-t)
+	result = fitter.result
+
+	# Peak memory in a separate fit (tracemalloc slows down the fit)
+	args = builder(np.random.default_rng(seed))
+	tracemalloc.start()
+	LeastSquares(**args).solve()
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+
+	return dict(time=min(times), time_mean=sum(times)/len(times), time_median=statistics.median(times), nfev=result.nfev, njev=result.njev,
+		iterations=result.iterations, converged=result.converged, chiSquared=result.chiSquared,
+		peak_memory=peak)
+
+# <function compare>
+# 	@argument <list results> : results of this run
+# 	@argument <dict old> : JSON of the old run
+# 	@argument <float threshold> : time ratio considered a regression
+# 	@argument <float floor> : slowdowns under floor seconds are timer noise,
+# 		not regressions (the ratios of the fastest cases are random)
+# 	@argument <float tolerance> : relative increase of the chi squared
+# 		considered a regression (a worse minimum)
+#
+#	@returns <list> : descriptions of the regressions, the median times are
+# 		compared (the best time of the runs without it)
+def compare(results,old,threshold,floor,tolerance):
+	key = lambda r: (r['case'],r['N'],r['M'],r['dimY'],r['mode'])
+	previous = {key(r):r for r in old['results']}
+	regressions = []
+	for r in results:
+		p = previous.get(key(r))
+		if p == None: continue
+		t, t0 = r.get('time_median',r['time']), p.get('time_median',p['time'])
+		if t - t0 > floor and t > threshold*t0:
+			regressions.append(str(key(r)) + " time x" + (format(t/t0,'.2f') if t0 > 0 else "inf"))
+		if r['nfev'] > p['nfev']:
+			regressions.append(str(key(r)) + " evaluations " + str(p['nfev']) + " -> " + str(r['nfev']))
+		if p['converged'] and not r['converged']:
+			regressions.append(str(key(r)) + " not converged anymore")
+		if not r['chiSquared'] <= p['chiSquared']*(1+tolerance) and not p['chiSquared'] != p['chiSquared']:
+			regressions.append(str(key(r)) + " chi squared " + format(p['chiSquared'],'.6g') + " -> " + format(r['chiSquared'],'.6g'))
+	return regressions
+
+# <function mismatches>
+# 	@argument <dict meta>, <dict old> : meta of this run and of the old one
+#
+#	@returns <list<str>> : differences of the conditions of the runs that make
+# 		their times not comparable
+def mismatches(meta,old):
+	return [name + " " + str(old.get(name)) + " -> " + str(meta[name]) for name in ('python','numpy','machine','quick') if old.get(name) != meta[name]]
+
+# <function main>
+# 	@description : runs the benchmark from the command line
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Benchmark of lstsq_lm')
+	parser.add_argument('--quick', action='store_true', help='small sweep')
+	parser.add_argument('--repeat', type=int, default=3, help='timed fits of each case')
+	parser.add_argument('--seed', type=int, default=0, help='seed of the noise of the data')
+	parser.add_argument('--case', action='append', help='only these cases (linear, rc, planar, fet, exponentials, outputs)')
+	parser.add_argument('--output', help='JSON file of the results')
+	parser.add_argument('--compare', help='JSON file of an old run')
+	parser.add_argument('--threshold', type=float, default=1.25, help='time ratio considered a regression')
+	parser.add_argument('--floor', type=float, default=1e-3, help='slowdowns under these seconds are ignored')
+	parser.add_argument('--tolerance', type=float, default=1e-6, help='relative increase of the chi squared considered a regression')
+	args = parser.parse_args(argv)
+
+	results = []
+	for name,parameters,builder in cases(args.quick):
+		if args.case and name not in args.case: continue
+		measures = run_case(builder,max(1,args.repeat),args.seed)
+		results.append(dict(case=name,**parameters,**measures))
+		print(format(name,'14s') + " N=" + format(parameters['N'],'<6d') + " M=" + format(parameters['M'],'<3d')
+			+ " dimY=" + format(parameters['dimY'],'<2d') + " " + format(parameters['mode'],'11s')
+			+ " time=" + format(measures['time'],'.4f') + " s nfev=" + format(measures['nfev'],'<5d')
+			+ " iterations=" + format(measures['iterations'],'<4d') + " peak=" + format(measures['peak_memory']/1e6,'.2f') + " MB")
+
+	report = dict(meta=dict(python=platform.python_version(), numpy=np.__version__, machine=platform.machine(),
+		platform=platform.platform(), date=time.strftime('%Y-%m-%dT%H:%M:%S'), repeat=args.repeat, seed=args.seed,
+		quick=args.quick), results=results)
+	if args.output:
+		with open(args.output,'w') as file: json.dump(report,file,indent=1)
+
+	if args.compare:
+		with open(args.compare) as file: old = json.load(file)
+		for m in mismatches(report['meta'],old.get('meta',{})): print("WARNING baseline of other conditions, " + m)
+		regressions = compare(results,old,args.threshold,args.floor,args.tolerance)
+		for r in regressions: print("REGRESSION " + r)
+		if len(regressions) > 0: return 1
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
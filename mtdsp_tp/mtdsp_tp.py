@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+"""
+mtdsp_tp
+	@version : 0.1.0
+
+	@author : Daniel Ríos Linares (c) 2017, hasbornasu@gmail.com
+
+	@description : dispatcher of independent jobs (a list of small systems,
+		splines, integrations...) to a pool of threads, the results are
+		returned in the order of the jobs. It is useful with the compiled
+		kernels of the library (CPY and F90 modules), they release the GIL
+		around their numeric loops so the threads run in parallel on the
+		cores. The pure Python functions don't run in parallel (the GIL is
+		held by the interpreter), for them use a process pool.
+
+		from mtdsp_tp import mtdsp_tp
+		X = mtdsp_tp(slesv_tr, [(Aupp,Adia,Alow,B) for B in Bs], star=True)
+
+	@name : mtdsp_tp
+		    |    |
+		    |    thread pool
+		    Multi-thread dispatcher
+
+	@license : GPL-3.0
+		This program is free software: you can redistribute it and/or modify
+		it under the terms of the GNU General Public License as published by
+		the Free Software Foundation, either version 3 of the License, or
+		(at your option) any later version.
+
+		This program is distributed in the hope that it will be useful,
+		but WITHOUT ANY WARRANTY; without even the implied warranty of
+		MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+		GNU General Public License for more details.
+
+		You should have received a copy of the GNU General Public License
+		along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Required for the workers
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+# <class Dispatcher>
+# 	@variable <int self.workers> : number of worker threads
+# 	@variable <int self.chunk> : jobs of each task of the pool, None to split
+# 		the jobs in 4 tasks per worker
+# 	@variable <ThreadPoolExecutor self.executor> : pool of threads, created
+# 		with the first map (None before)
+#
+# 	@description : pool of threads reused by the calls of self.map, the jobs
+# 		are grouped in chunks so the cost of the pool (a future per task) is
+# 		paid once per chunk and not once per job
+#
+# 	@author : Daniel Ríos Linares
+class Dispatcher:
+	''' [ Static variables ] '''
+	tasks_per_worker = 4 # tasks of each worker when self.chunk is None
+
+	''' [ Constructors ] '''
+	# <function Dispatcher>
+	# 	@argument *workers : worker threads, None for the number of cores
+	# 	@argument *chunk : jobs of each task, None to choose it from the number
+	# 		of jobs
+	def __init__(self, workers=None, chunk=None):
+		self.workers = max(1,int(workers)) if workers != None else (os.cpu_count() or 1)
+		self.chunk = chunk
+		self.executor = None
+		self.split(0, chunk) # checks the chunk
+
+	''' [ Dispatch ] '''
+	# <method map>
+	# 	@argument <function function> : function of every job
+	# 	@argument <list jobs> : iterable of jobs, the arguments of the function
+	# 	@argument *star : True if every job is a tuple of arguments,
+	# 		function(*job), False if it is the argument, function(job)
+	# 	@argument *chunk : jobs of each task of this call, None for self.chunk
+	#
+	#	@returns <list> : results of the jobs, in the order of jobs
+	#
+	# 	@description : runs the jobs in the pool, the first exception (in the
+	# 		order of the jobs) is raised and the tasks not started are cancelled
+	def map(self, function, jobs, star=False, chunk=None):
+		jobs = list(jobs)
+		chunks = self.split(len(jobs), chunk if chunk != None else self.chunk)
+
+		# Nothing to share, in the calling thread (without the cost of the pool)
+		if self.workers == 1 or len(chunks) <= 1:
+			return self.run(function, jobs, star)
+
+		if self.executor == None: self.executor = ThreadPoolExecutor(self.workers)
+		futures = [self.executor.submit(self.run, function, jobs[a:b], star) for a,b in chunks]
+		results = []
+		try:
+			for future in futures: results.extend(future.result())
+		except BaseException:
+			for future in futures: future.cancel()
+			raise
+		return results
+
+	''' [ Internal functions ] '''
+	# <method split>
+	#	@returns <list<tuple>> : (first, last+1) jobs of every task
+	def split(self, N, chunk):
+		if chunk != None and int(chunk) < 1:
+			raise ValueError("chunk must be a positive integer, not " + str(chunk))
+		chunk = int(chunk) if chunk != None else max(1,-(-N//(self.tasks_per_worker*self.workers)))
+		return [(a,min(a+chunk,N)) for a in range(0,N,chunk)]
+
+	# <method run>
+	#	@returns <list> : results of the jobs of a task
+	def run(self, function, jobs, star):
+		if star: return [function(*job) for job in jobs]
+		return [function(job) for job in jobs]
+
+	''' [ Shutdown ] '''
+	# <method close>
+	# 	@description : waits the running tasks and stops the workers
+	def close(self):
+		if self.executor != None: self.executor.shutdown(wait=True)
+		self.executor = None
+
+	def __enter__(self): return self
+
+	def __exit__(self, *exc): self.close()
+# End of <class Dispatcher>
+
+
+# Dispatchers of the module function mtdsp_tp, one per number of workers
+dispatchers = {}
+
+# <function mtdsp_tp>
+# 	@argument <function function> : function of every job
+# 	@argument <list jobs> : iterable of jobs
+# 	@argument *workers : worker threads, None for the number of cores
+# 	@argument *chunk, *star : see Dispatcher
+#
+#	@returns <list> : results of the jobs, in the order of jobs
+#
+# 	@description : Dispatcher.map with a pool shared by the module
+def mtdsp_tp(function, jobs, workers=None, chunk=None, star=False):
+	workers = max(1,int(workers)) if workers != None else (os.cpu_count() or 1)
+	if workers not in dispatchers: dispatchers[workers] = Dispatcher(workers)
+	return dispatchers[workers].map(function, jobs, star, chunk)
+
+# End of file : mtdsp_tp.py
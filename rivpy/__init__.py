@@ -0,0 +1,51 @@
+"""
+rivpy
+	@version : 0.1.0
+
+	@author : Daniel Ríos Linares (c) 2017, hasbornasu@gmail.com
+
+	@description : the routines of the library in a single package, each
+		routine runs the fastest double precision backend available for the
+		type and the size of its inputs (CPY, or PYT for small lists that
+		CPY would convert, the single precision F90 subroutines only without
+		them). Nothing is loaded on import, the modules of a backend are
+		loaded the first time it is chosen.
+
+		import rivpy
+		X = rivpy.slesv_tr(Aupp, Adia, Alow, B)
+		X = rivpy.slesv_tr(Aupp, Adia, Alow, B, backend='PYT')
+		with rivpy.using('F90'): X = rivpy.slesv_tr(Aupp, Adia, Alow, B)
+		rivpy.available() # {'slesv_tr': ['CPY', 'PYT'], ...}
+
+	@license : GPL-3.0
+		This program is free software: you can redistribute it and/or modify
+		it under the terms of the GNU General Public License as published by
+		the Free Software Foundation, either version 3 of the License, or
+		(at your option) any later version.
+
+		This program is distributed in the hope that it will be useful,
+		but WITHOUT ANY WARRANTY; without even the implied warranty of
+		MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+		GNU General Public License for more details.
+
+		You should have received a copy of the GNU General Public License
+		along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from rivpy.registry import Backend, Routine, RivpyBackendError, force, using
+from rivpy.routines import (routines, RivpyMatrixcalcError, mxinv_gj, solve, mxinv_gj_batch, solve_batch,
+	slesv_tr, slesv_pt, inpsp_cs, inpsp_cf, intsm_ue, inttp_ue, bvp2o1d1euei_fd1, bvp2o1d1euec_diffusion, rtf1d_mu)
+
+# <function available>
+#	@returns <dict> : kinds of the backends that can be loaded of each routine
+# 		(it loads them)
+def available():
+	return {name:routine.available() for name,routine in routines.items()}
+
+# <function select>
+# 	@argument <str name> : name of the routine
+# 	@argument *args : arguments of the call
+#
+#	@returns <str> : kind of the backend that runs the call
+def select(name, *args):
+	return routines[name].select(*args)
@@ -0,0 +1,455 @@
+#!/usr/bin/env python
+
+"""
+rivpy.benchmark
+	@version : 0.1.0
+
+	@author : Daniel Ríos Linares (c) 2017, hasbornasu@gmail.com
+
+	@description : reproducible benchmark of the routines of rivpy on every
+		backend (CPY, F90, PYT) available, over a sweep of sizes N and with
+		lists and numpy arrays as inputs (the cost of the conversions). For
+		each case it records the wall time and the peak memory of the Python
+		objects (tracemalloc, the memory of the C and Fortran arrays isn't
+		traced) and checks every backend against a reference of the case
+		independent of the library (numpy, a dense or banded solve, the exact
+		or the analytic result, the F90 single precision subroutines with a
+		larger tolerance), a case with a single backend available is checked
+		too. The results are written as JSON
+		to compare runs (--compare old.json reports the cases slower, failing
+		or disagreeing with the old run, the median times are compared and
+		the slowdowns under --floor seconds are ignored as timer noise, a
+		baseline of other Python, machine or sweep is warned) and the fastest
+		backend of each case is printed.
+
+		python -m rivpy.benchmark --output new.json --compare old.json
+
+	@name : benchmark
+
+	@license : GPL-3.0
+		This program is free software: you can redistribute it and/or modify
+		it under the terms of the GNU General Public License as published by
+		the Free Software Foundation, either version 3 of the License, or
+		(at your option) any later version.
+
+		This program is distributed in the hope that it will be useful,
+		but WITHOUT ANY WARRANTY; without even the implied warranty of
+		MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+		GNU General Public License for more details.
+
+		You should have received a copy of the GNU General Public License
+		along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from rivpy.routines import routines, rtf1d_mu_methods
+from rivpy.registry import kinds, RivpyBackendError
+
+# Other stuff
+import numpy as np
+import tracemalloc
+import platform
+import argparse
+import statistics
+import json
+import math
+import time
+import sys
+
+# Relative tolerance of the agreement of the backends (F90 is single precision
+# in some subroutines)
+tolerances = {'CPY':1e-8, 'F90':1e-4, 'PYT':1e-8}
+
+# Errors of the formulas of the library accepted over the tolerances, the
+# discretization of a case compared with its analytic solution (centered
+# differences, h^2 max|y''''| / 12 with h = 1/(N-1) and |y''''| <= 1) and the
+# rounding of the end moments of inpsp_cf (they grow with 1/h, the cubics are
+# evaluated in the power basis)
+allowances = {'bvp2o1d1euec_diffusion': lambda N: 1.0/(12*(N-1)**2), 'inpsp_cf': lambda N: 1e-13*N**2}
+
+# np.trapz is np.trapezoid since numpy 2.0
+trapezoid_numpy = np.trapezoid if hasattr(np,'trapezoid') else np.trapz
+
+################################################################################
+# MODELS : functions of the BVP and root finding cases
+################################################################################
+# y'' = y - x, y(0) = 0, y(1) = 1
+def bvp_f(y,x): return y - x
+
+# y'' = y - x with these bounds has the solution y = x (exact in the mesh)
+def bvp_exact(args): return np.asarray(args[1], dtype=float)
+
+# - y'' + y = 1 (D = 1, K = 1, q = 1)
+def diffusion_D(x): return 1.0
+def diffusion_dDdx(x): return 0.0
+def diffusion_K(x): return 1.0
+def diffusion_q(x): return 1.0
+
+# Analytic solution y = 1 + A e^x + B e^-x with y(0) = 0, y(1) = 1
+def diffusion_exact(args):
+	X = np.asarray(args[4], dtype=float)
+	A, B = 1.0/(math.e**2-1), -math.e**2/(math.e**2-1)
+	return 1.0 + A*np.exp(X) + B*np.exp(-X)
+
+# cos(x) = x, root 0.7390851332151607
+def root_f(x): return math.cos(x) - x
+def root_dfdx(x): return - math.sin(x) - 1
+
+################################################################################
+# CASES : each case returns the arguments of the routine
+################################################################################
+# <function convert>
+# 	@argument <str mode> : 'list' or 'array'
+#
+#	@returns : the arrays of args as lists or numpy arrays
+def convert(mode, *args):
+	return tuple(x.tolist() if mode == 'list' and isinstance(x, np.ndarray) else x for x in args)
+
+# <function case_matrix>
+#	@returns <tuple> : well conditioned N x N matrix
+def case_matrix(N, mode, rng):
+	return convert(mode, rng.uniform(-1,1,(N,N)) + N*np.eye(N))
+
+# <function case_solve>
+#	@returns <tuple> : matrix N x N and right hand side
+def case_solve(N, mode, rng):
+	return convert(mode, rng.uniform(-1,1,(N,N)) + N*np.eye(N), rng.uniform(-1,1,N))
+
+# <function case_batch>
+#	@returns <tuple> : stack of K = N matrices 3 x 3 (and right hand sides)
+def case_batch(N, mode, rng, rhs=False):
+	A = rng.uniform(-1,1,(N,3,3)) + 3*np.eye(3)
+	return (A, rng.uniform(-1,1,(N,3))) if rhs else (A,)
+
+# <function case_tridiagonal>
+#	@returns <tuple> : diagonally dominant tridiagonal system Aupp, Adia, Alow, B
+def case_tridiagonal(N, mode, rng):
+	Aupp, Alow = rng.uniform(-1,1,N), rng.uniform(-1,1,N)
+	Aupp[-1], Alow[0] = 0, 0
+	return convert(mode, Aupp, 4+rng.uniform(0,1,N), Alow, rng.uniform(-1,1,N))
+
+# <function case_pentadiagonal>
+#	@returns <tuple> : diagonally dominant pentadiagonal system
+def case_pentadiagonal(N, mode, rng):
+	Aupp2, Aupp, Alow, Alow2 = (rng.uniform(-1,1,N) for i in range(4))
+	Aupp2[-2:], Aupp[-1], Alow[0], Alow2[:2] = 0, 0, 0, 0
+	return convert(mode, Aupp2, Aupp, 6+rng.uniform(0,1,N), Alow, Alow2, rng.uniform(-1,1,N))
+
+# <function mesh>
+#	@returns <array> : non-uniform mesh of N points in [a,b], the interior
+# 		points of the uniform one moved up to h/4 (the intervals are between
+# 		h/2 and 3h/2, random points would give intervals of 1e-11 for large N
+# 		and measure the rounding of the formulas instead of the backends)
+def mesh(a, b, N, rng):
+	X = np.linspace(a,b,N)
+	X[1:-1] += rng.uniform(-0.25,0.25,N-2)*(b-a)/(N-1)
+	return X
+
+# <function case_spline>
+#	@returns <tuple> : new mesh of 4N points, non-uniform X, Y = sin(X) and the
+# 		bounds (second or first derivatives)
+def case_spline(N, mode, rng, first=False):
+	X = mesh(0.0,3.0,N,rng)
+	new_X = np.linspace(0,3,4*N)
+	bounds = (1.0, math.cos(3.0)) if first else (0.0, -math.sin(3.0))
+	return convert(mode, new_X, X, np.sin(X)) + bounds
+
+# <function case_integration>
+#	@returns <tuple> : non-uniform X of N points in [0,pi] and Y = sin(X)
+def case_integration(N, mode, rng):
+	X = mesh(0.0,math.pi,N,rng)
+	return convert(mode, X, np.sin(X))
+
+# <function case_bvp>
+#	@returns <tuple> : y'' = y - x in a uniform mesh of N points (200 iterations)
+def case_bvp(N, mode, rng):
+	return convert(mode, np.linspace(0,1,N)) + (0.0, 1.0)
+
+# <function banded>
+# 	@argument <tuple args> : diagonals (from the upper to the lower one) and B
+# 		of a tridiagonal or pentadiagonal system
+#
+#	@returns <array> : solution of numpy with the dense matrix (N <= 1000), or
+# 		of a band elimination without pivoting (the systems of the cases are
+# 		diagonally dominant)
+def banded(args):
+	*diagonals, B = [np.asarray(x, dtype=float) for x in args]
+	N = len(B)
+	k = len(diagonals)//2
+	if N <= 1000:
+		A = sum(np.diag(d[:N-(k-i)],k-i) if i < k else np.diag(d[i-k:],k-i) for i,d in enumerate(diagonals))
+		return np.linalg.solve(A,B)
+
+	# W[j][k+m] is the coefficient of the column j+m in the row j
+	W = [[float(diagonals[k-m][j]) for m in range(-k,k+1)] for j in range(N)]
+	X = B.tolist()
+	for c in range(N):
+		for r in range(c+1,min(c+k+1,N)):
+			f = W[r][k+c-r]/W[c][k]
+			for m in range(1,min(k+1,N-c)): W[r][k+c+m-r] -= f*W[c][k+m]
+			X[r] -= f*X[c]
+	for j in reversed(range(N)):
+		X[j] = (X[j] - sum(W[j][k+m]*X[j+m] for m in range(1,min(k+1,N-j))))/W[j][k]
+	return np.array(X)
+
+# <function simpson>
+#	@returns <float> : composite Simpson rule of the non-uniform mesh (the
+# 		parabola of each pair of intervals), the last interval of an even
+# 		number of points by the trapezoidal rule
+def simpson(args):
+	X, Y = (np.asarray(x, dtype=float) for x in args)
+	n = 2*((len(X)-1)//2)
+	h0, h1 = np.diff(X[:n+1])[0::2], np.diff(X[:n+1])[1::2]
+	y0, y1, y2 = Y[0:n:2], Y[1:n:2], Y[2:n+1:2]
+	inte = np.sum((h0+h1)/6*((2-h1/h0)*y0 + (h0+h1)**2/(h0*h1)*y1 + (2-h0/h1)*y2))
+	if len(X) % 2 == 0: inte += (X[-1]-X[-2])*(Y[-1]+Y[-2])/2
+	return float(inte)
+
+# <function spline>
+# 	@argument <tuple args> : new_X, X, Y and the bounds of the case
+# 	@argument <bool first> : the bounds are first derivatives (inpsp_cf),
+# 		second derivatives (inpsp_cs) if not
+#
+#	@returns <tuple> : (new_Y,) of the cubic spline of the library, the system
+# 		of the interior moments (the bounds only fix the first and the last
+# 		ones) is solved with banded and the first derivatives become moments
+# 		with the formulas of inpsp_cf (compared with the first result of the
+# 		routine)
+def spline(args, first=False):
+	new_X, X, Y = (np.asarray(x, dtype=float) for x in args[:3])
+	Ci, Cf = args[3], args[4]
+	N, H = len(X), np.diff(X)
+	D = np.diff(Y)/H
+	S = H[:-1]+H[1:]
+	Alow, Aupp = H[:-1]/S, H[1:]/S
+	Alow[0], Aupp[-1] = 0.0, 0.0
+	M = np.concatenate(([0.0], banded((Aupp, 2*np.ones(N-2), Alow, 6/S*(D[1:]-D[:-1]))), [0.0]))
+	if first:
+		Ci = M[1]*H[0]**2 - 6*H[0]*Ci + 6*(Y[1]-Y[0]) + 6*X[1]*X[0] - 3*(X[0]**2 + X[1]**2)
+		Cf = -M[-2]*H[-1] + 6*H[-1]*Cf + 6*D[-1]/H[-1] + 6*X[-1]*X[-2] - 3*(X[-1]**2 + X[-2]**2)
+	M[0], M[-1] = Ci, Cf
+
+	j = np.clip(np.searchsorted(X, new_X, side='right')-1, 0, N-2)
+	h, a, b = H[j], X[j+1]-new_X, new_X-X[j]
+	return ((M[j]*a**3 + M[j+1]*b**3)/(6*h) + (Y[j]-M[j]*h**2/6)*a/h + (Y[j+1]-M[j+1]*h**2/6)*b/h,)
+
+# <function cases>
+# 	@argument <bool quick> : small sweep
+#
+#	@returns <list<tuple>> : (routine, parameters, builder, kwargs, exact) of
+# 		every case, exact is None (the backends are compared with PYT), the
+# 		exact result or a function exact(args) of the arguments of the case
+# 		(numpy as reference)
+def cases(quick):
+	matrices = [4,16,64] if quick else [4,16,64,128]
+	vectors = [10,100,1000] if quick else [10,100,1000,10000,100000]
+	batches = [10,1000] if quick else [10,1000,100000]
+	splines = [10,100] if quick else [10,100,1000,10000]
+	bvps = [11,51] if quick else [11,51,101]
+	result = []
+	for mode in ('list','array'):
+		for N in matrices:
+			result.append(('mxinv_gj',dict(N=N,mode=mode),lambda rng,N=N,m=mode: case_matrix(N,m,rng),{},lambda args: np.linalg.inv(args[0])))
+			result.append(('solve',dict(N=N,mode=mode),lambda rng,N=N,m=mode: case_solve(N,m,rng),{},lambda args: np.linalg.solve(*args)))
+		for N in vectors:
+			result.append(('slesv_tr',dict(N=N,mode=mode),lambda rng,N=N,m=mode: case_tridiagonal(N,m,rng),{},banded))
+			result.append(('slesv_pt',dict(N=N,mode=mode),lambda rng,N=N,m=mode: case_pentadiagonal(N,m,rng),{},banded))
+			result.append(('intsm_ue',dict(N=N+1,mode=mode),lambda rng,N=N+1,m=mode: case_integration(N,m,rng),{},simpson))
+			result.append(('inttp_ue',dict(N=N,mode=mode),lambda rng,N=N,m=mode: case_integration(N,m,rng),{},lambda args: float(trapezoid_numpy(args[1],args[0]))))
+		for N in splines:
+			result.append(('inpsp_cs',dict(N=N,mode=mode),lambda rng,N=N,m=mode: case_spline(N,m,rng),{},spline))
+			result.append(('inpsp_cf',dict(N=N,mode=mode),lambda rng,N=N,m=mode: case_spline(N,m,rng,True),{},lambda args: spline(args,True)))
+		for N in bvps:
+			result.append(('bvp2o1d1euei_fd1',dict(N=N,mode=mode),lambda rng,N=N,m=mode: (bvp_f,) + case_bvp(N,m,rng),dict(tol=0.0,max_iters=200),bvp_exact))
+			result.append(('bvp2o1d1euec_diffusion',dict(N=N,mode=mode),lambda rng,N=N,m=mode: (diffusion_D,diffusion_dDdx,diffusion_K,diffusion_q) + case_bvp(N,m,rng),{},diffusion_exact))
+	for N in batches:
+		result.append(('mxinv_gj_batch',dict(N=N,mode='array'),lambda rng,N=N: case_batch(N,'array',rng),{},
+			lambda args: (np.linalg.inv(args[0]),np.zeros(len(args[0]),dtype=bool))))
+		result.append(('solve_batch',dict(N=N,mode='array'),lambda rng,N=N: case_batch(N,'array',rng,True),{},
+			lambda args: (np.linalg.solve(args[0],args[1][:,:,None])[:,:,0],np.zeros(len(args[0]),dtype=bool))))
+	for method in rtf1d_mu_methods:
+		b = None if method == 'newtonraphson' else 1.0
+		result.append(('rtf1d_mu',dict(N=1,mode=method),lambda rng,b=b: (root_f,0.0,b),dict(method=method,dfdx=root_dfdx,tol=1e-12),0.7390851332151607))
+	return result
+
+################################################################################
+# BENCHMARK
+################################################################################
+# <function difference>
+# 	@argument value, reference : results of two backends (or the exact one)
+#
+#	@returns <float> : largest relative difference between value and reference
+def difference(value, reference):
+	if isinstance(value, tuple):
+		return max(difference(v,r) for v,r in zip(value,reference))
+	value, reference = np.asarray(value, dtype=float), np.asarray(reference, dtype=float)
+	if value.shape != reference.shape: return math.inf
+	if value.size == 0: return 0.0
+	scale = max(1.0, float(np.max(np.abs(reference))))
+	return float(np.max(np.abs(value - reference))) / scale
+
+# <function run_case>
+# 	@argument <Routine routine> : routine of rivpy
+# 	@argument <str kind> : backend
+# 	@argument <function builder> : case builder
+# 	@argument <dict kwargs> : keyword arguments of the routine
+# 	@argument <int repeat> : number of timed calls (the best, the mean and the
+# 		median times are kept)
+# 	@argument <int seed> : seed of the data
+#
+#	@returns <dict>, value : measures of the case and result of the routine
+def run_case(routine, kind, builder, kwargs, repeat, seed):
+	times = []
+	for r in range(repeat):
+		args = builder(np.random.default_rng(seed))
+		t = time.perf_counter()
+		value = routine(*args, backend=kind, **kwargs)
+		times.append(time.perf_counter()-t)
+
+	# Peak memory in a separate call (tracemalloc slows down the call)
+	args = builder(np.random.default_rng(seed))
+	tracemalloc.start()
+	routine(*args, backend=kind, **kwargs)
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+
+	return dict(time=min(times), time_mean=sum(times)/len(times), time_median=statistics.median(times), peak_memory=peak), value
+
+# <function run_routine>
+#	@returns <list<dict>> : measures of a case on every backend of its routine,
+# 		with the status ('ok', 'unavailable' or the error) and the agreement
+def run_routine(name, parameters, builder, kwargs, exact, repeat, seed):
+	routine = routines[name]
+	records, values = [], {}
+	for kind in kinds:
+		if kind not in routine.backends: continue
+		record = dict(case=name, backend=kind, **parameters, status='ok')
+		try:
+			routine.backends[kind].load()
+			measures, values[kind] = run_case(routine, kind, builder, kwargs, repeat, seed)
+			record.update(measures)
+		except RivpyBackendError:
+			record['status'] = 'unavailable'
+		except Exception as error:
+			record['status'] = type(error).__name__ + ": " + str(error)
+		records.append(record)
+
+	# Agreement with the exact result or the reference backend
+	if callable(exact): exact = exact(builder(np.random.default_rng(seed)))
+	reference = 'PYT' if 'PYT' in values else ('CPY' if 'CPY' in values else None)
+	for record in records:
+		if record['status'] != 'ok': continue
+		kind = record['backend']
+		tolerance = tolerances[kind]
+		if exact is not None:
+			record['difference'] = difference(values[kind], exact)
+			if name in allowances: tolerance = max(tolerance, allowances[name](parameters['N']))
+		elif reference != None and kind != reference:
+			record['reference'] = reference
+			record['difference'] = difference(values[kind], values[reference])
+		else:
+			continue
+		record['agrees'] = record['difference'] <= tolerance
+	return records
+
+# <function key>
+#	@returns <tuple> : identification of a record between runs
+def key(r):
+	return (r['case'],r['N'],r['mode'],r['backend'])
+
+# <function compare>
+# 	@argument <list results> : results of this run
+# 	@argument <dict old> : JSON of the old run
+# 	@argument <float threshold> : time ratio considered a regression
+# 	@argument <float floor> : slowdowns under floor seconds are timer noise,
+# 		not regressions (the ratios of the microsecond cases are random)
+#
+#	@returns <list> : descriptions of the regressions, the median times are
+# 		compared (the best time of the runs without it)
+def compare(results, old, threshold, floor):
+	previous = {key(r):r for r in old['results']}
+	regressions = []
+	for r in results:
+		p = previous.get(key(r))
+		if p == None: continue
+		if p['status'] == 'ok' and r['status'] != 'ok':
+			regressions.append(str(key(r)) + " " + p['status'] + " -> " + r['status'])
+			continue
+		if r['status'] != 'ok' or p['status'] != 'ok': continue
+		t, t0 = r.get('time_median',r['time']), p.get('time_median',p['time'])
+		if t - t0 > floor and t > threshold*t0:
+			regressions.append(str(key(r)) + " time x" + (format(t/t0,'.2f') if t0 > 0 else "inf"))
+		if p.get('agrees',True) and not r.get('agrees',True):
+			regressions.append(str(key(r)) + " disagrees, difference " + format(r['difference'],'.3g'))
+	return regressions
+
+# <function mismatches>
+# 	@argument <dict meta>, <dict old> : meta of this run and of the old one
+#
+#	@returns <list<str>> : differences of the conditions of the runs that make
+# 		their times not comparable
+def mismatches(meta, old):
+	return [name + " " + str(old.get(name)) + " -> " + str(meta[name]) for name in ('python','machine','quick') if old.get(name) != meta[name]]
+
+# <function fastest>
+#	@returns <list<str>> : fastest backend of every case (case, N, mode)
+def fastest(results):
+	best = {}
+	for r in results:
+		if r['status'] != 'ok' or not r.get('agrees',True): continue
+		case = (r['case'],r['N'],r['mode'])
+		if case not in best or r['time'] < best[case]['time']: best[case] = r
+	return [format(c[0],'24s') + " N=" + format(c[1],'<7d') + " " + format(c[2],'14s') + r['backend'] for c,r in best.items()]
+
+# <function main>
+# 	@description : runs the benchmark from the command line
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Benchmark of the backends of rivpy')
+	parser.add_argument('--quick', action='store_true', help='small sweep')
+	parser.add_argument('--repeat', type=int, default=5, help='timed calls of each case')
+	parser.add_argument('--seed', type=int, default=0, help='seed of the data')
+	parser.add_argument('--case', action='append', help='only these routines (' + ", ".join(routines) + ')')
+	parser.add_argument('--output', help='JSON file of the results')
+	parser.add_argument('--compare', help='JSON file of an old run')
+	parser.add_argument('--threshold', type=float, default=1.25, help='time ratio considered a regression')
+	parser.add_argument('--floor', type=float, default=1e-4, help='slowdowns under these seconds are ignored')
+	args = parser.parse_args(argv)
+
+	results = []
+	for name,parameters,builder,kwargs,exact in cases(args.quick):
+		if args.case and name not in args.case: continue
+		for record in run_routine(name, parameters, builder, kwargs, exact, max(1,args.repeat), args.seed):
+			results.append(record)
+			line = format(name,'24s') + " N=" + format(parameters['N'],'<7d') + " " + format(parameters['mode'],'14s') + record['backend']
+			if record['status'] != 'ok':
+				print(line + " " + record['status'])
+				continue
+			line += " time=" + format(record['time'],'.6f') + " s peak=" + format(record['peak_memory']/1e6,'.3f') + " MB"
+			if 'agrees' in record:
+				line += " difference=" + format(record['difference'],'.2e') + ("" if record['agrees'] else " DISAGREES")
+			print(line)
+
+	print("\nFastest backends:")
+	for line in fastest(results): print(line)
+
+	report = dict(meta=dict(python=platform.python_version(), numpy=np.__version__, machine=platform.machine(),
+		platform=platform.platform(), date=time.strftime('%Y-%m-%dT%H:%M:%S'), repeat=args.repeat, seed=args.seed,
+		quick=args.quick), results=results)
+	if args.output:
+		with open(args.output,'w') as file: json.dump(report,file,indent=1)
+
+	status = 0
+	disagreements = [r for r in results if not r.get('agrees',True)]
+	for r in disagreements: print("DISAGREES " + str(key(r)) + " difference " + format(r['difference'],'.3g'))
+	if len(disagreements) > 0: status = 1
+	if args.compare:
+		with open(args.compare) as file: old = json.load(file)
+		for m in mismatches(report['meta'],old.get('meta',{})): print("WARNING baseline of other conditions, " + m)
+		regressions = compare(results,old,args.threshold,args.floor)
+		for r in regressions: print("REGRESSION " + r)
+		if len(regressions) > 0: status = 1
+	return status
+
+if __name__ == '__main__':
+	sys.exit(main())
+
+# End of file : benchmark.py
@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+
+"""
+rivpy.registry
+	@version : 0.1.0
+
+	@author : Daniel Ríos Linares (c) 2017, hasbornasu@gmail.com
+
+	@description : backends of the routines of the library, the same
+		algorithm is implemented in pure Python (PYT), with the C API (CPY)
+		and with f2py (F90) in the folders '(PYT) name', '(CPY) name' and
+		'(F90) name'. A Routine keeps its Backends and chooses at every call
+		the first available one of its rank (a function of the inputs). The
+		modules of the backends are loaded the first time they are
+		chosen, a backend without build (or built for other Python) is
+		skipped. The choice can be forced with the backend argument of the
+		calls, with force(kind) or with the environment variable
+		RIVPY_BACKEND (benchmarks), a kind forced for every routine only
+		applies to the routines with that backend, the others use their rank.
+
+	@license : GPL-3.0
+		This program is free software: you can redistribute it and/or modify
+		it under the terms of the GNU General Public License as published by
+		the Free Software Foundation, either version 3 of the License, or
+		(at your option) any later version.
+
+		This program is distributed in the hope that it will be useful,
+		but WITHOUT ANY WARRANTY; without even the implied warranty of
+		MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+		GNU General Public License for more details.
+
+		You should have received a copy of the GNU General Public License
+		along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Required for the lazy loading of the modules
+from contextlib import contextmanager
+import importlib.machinery
+import importlib.util
+import importlib
+import os
+
+''' [ Paths ] '''
+# Folder of the library (the folders of the backends are inside)
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Other folders with builds of the modules, searched before the folders of the
+# backends (RIVPY_PATH, separated by os.pathsep)
+paths = [path for path in os.environ.get('RIVPY_PATH','').split(os.pathsep) if path != '']
+
+''' [ Overrides ] '''
+# Backends forced by force(), the key None applies to every routine
+forced = {}
+if os.environ.get('RIVPY_BACKEND','') != '': forced[None] = os.environ['RIVPY_BACKEND'].upper()
+
+# Kinds of backends
+kinds = ('CPY','F90','PYT')
+
+
+# <class Backend>
+# 	@variable <str self.kind> : 'CPY', 'F90' or 'PYT'
+# 	@variable <str self.folder> : folder of the module in the library
+# 	@variable <str self.module> : name of the module (file without suffix)
+# 	@variable <function self.adapter> : adapter(module) returns the function
+# 		of the routine with the arguments of the rivpy routine
+# 	@variable <function self.function> : function of the backend, None until
+# 		it is loaded
+# 	@variable <str self.error> : reason of the failed load, None if not tried
+# 		or loaded
+#
+# 	@description : implementation of a routine, the module is loaded by its
+# 		path (the names of the modules are repeated between backends) and not
+# 		added to sys.modules
+#
+# 	@author : Daniel Ríos Linares
+class Backend:
+	''' [ Constructors ] '''
+	# <function Backend>
+	# 	@argument <str kind> : 'CPY', 'F90' or 'PYT'
+	# 	@argument <str folder> : folder of the module, None for a module of
+	# 		sys.path (modules built by instant)
+	# 	@argument <str module> : name of the module
+	# 	@argument <function adapter> : adapter(module) -> function
+	def __init__(self, kind, folder, module, adapter):
+		if kind not in kinds:
+			raise ValueError("Unknown backend '" + str(kind) + "', use one of " + str(kinds))
+		self.kind = kind
+		self.folder = folder
+		self.module = module
+		self.adapter = adapter
+		self.function = None
+		self.error = None
+
+	''' [ Load ] '''
+	# <method load>
+	#	@returns <function> : function of the backend
+	#
+	# 	@description : loads the module the first time, the failure is kept
+	# 		so the next calls don't try it again
+	def load(self):
+		if self.function != None: return self.function
+		if self.error != None: raise RivpyBackendError(self.error)
+		try:
+			self.function = self.adapter(self.find())
+		except (ImportError, OSError) as error:
+			self.error = self.kind + " " + self.module + ": " + str(error)
+			raise RivpyBackendError(self.error) from error
+		return self.function
+
+	# <method available>
+	#	@returns <bool> : True if the module can be loaded
+	def available(self):
+		try:
+			self.load()
+		except RivpyBackendError:
+			return False
+		return True
+
+	''' [ Internal functions ] '''
+	# <method find>
+	#	@returns <module> : module of the backend
+	def find(self):
+		if self.folder == None: return importlib.import_module(self.module)
+		if self.kind == 'PYT': suffixes = importlib.machinery.SOURCE_SUFFIXES
+		else: suffixes = importlib.machinery.EXTENSION_SUFFIXES
+		errors = []
+		for folder in paths + [os.path.join(root,self.folder)]:
+			for suffix in suffixes:
+				path = os.path.join(folder,self.module + suffix)
+				if not os.path.isfile(path): continue
+				try:
+					return self.load_file(path)
+				except ImportError as error:
+					errors.append(str(error)) # other build (an older Python)
+		if len(errors) > 0: raise ImportError("; ".join(errors))
+		raise ImportError("No build of " + self.module + " in '" + self.folder + "'")
+
+	# <method load_file>
+	#	@returns <module> : module of the file, named rivpy.<kind>.<module> (the
+	# 		last name must be the module, it is the name of the init function)
+	def load_file(self, path):
+		spec = importlib.util.spec_from_file_location("rivpy." + self.kind + "." + self.module, path)
+		module = importlib.util.module_from_spec(spec)
+		spec.loader.exec_module(module)
+		return module
+# End of <class Backend>
+
+
+# <class Routine>
+# 	@variable <str self.name> : name of the routine
+# 	@variable <dict self.backends> : Backend of each kind
+# 	@variable <function self.rank> : rank(*args) returns the kinds in order
+# 		of preference for these arguments
+#
+# 	@description : routine of the library, self(*args) runs the first
+# 		available backend of the rank (or the forced one)
+#
+# 	@author : Daniel Ríos Linares
+class Routine:
+	''' [ Constructors ] '''
+	# <function Routine>
+	# 	@argument <str name> : name of the routine
+	# 	@argument <list<Backend>> backends : implementations of the routine
+	# 	@argument <function rank> : rank(*args) -> kinds in order of preference
+	# 	@argument *doc : documentation of the routine
+	def __init__(self, name, backends, rank, doc=None):
+		self.name = name
+		self.backends = {backend.kind:backend for backend in backends}
+		self.rank = rank
+		self.__doc__ = doc
+
+	''' [ Call ] '''
+	# <method __call__>
+	# 	@argument *args, **kwargs : arguments of the routine
+	# 	@argument *backend : kind of backend for this call, None to choose it
+	#
+	#	@returns : result of the routine (lists for lists, numpy arrays for
+	# 		buffers)
+	def __call__(self, *args, backend=None, **kwargs):
+		return self.function(self.select(*args, backend=backend))(*args, **kwargs)
+
+	# <method select>
+	# 	@argument *args : arguments of the routine
+	# 	@argument *backend : kind forced for this call, None to choose it
+	#
+	#	@returns <str> : kind of the backend for these arguments
+	def select(self, *args, backend=None):
+		if backend == None: backend = forced.get(self.name)
+		if backend == None and forced.get(None) in self.backends: backend = forced[None]
+		if backend != None:
+			backend = backend.upper()
+			if backend not in self.backends:
+				raise ValueError("Backend '" + backend + "' of " + self.name + " doesn't exist, use one of " + str(tuple(self.backends)))
+			self.backends[backend].load()
+			return backend
+		errors = []
+		for kind in self.rank(*args):
+			if kind not in self.backends: continue
+			if self.backends[kind].available(): return kind
+			errors.append(self.backends[kind].error)
+		raise RivpyBackendError("No backend of " + self.name + " available (" + "; ".join(errors) + ")")
+
+	# <method function>
+	#	@returns <function> : function of the backend kind
+	def function(self, kind):
+		return self.backends[kind].load()
+
+	# <method available>
+	#	@returns <list<str>> : kinds of the backends that can be loaded
+	def available(self):
+		return [kind for kind in kinds if kind in self.backends and self.backends[kind].available()]
+
+	def __repr__(self): return "<rivpy routine " + self.name + " " + str(tuple(self.backends)) + ">"
+# End of <class Routine>
+
+
+# <function force>
+# 	@argument <str kind> : 'CPY', 'F90', 'PYT' or None to choose again
+# 	@argument *routine : name of the routine, None for every routine (the
+# 		routines without that backend keep their rank)
+#
+# 	@description : forces a backend (benchmarks and comparisons)
+def force(kind, routine=None):
+	if kind == None:
+		forced.pop(routine, None)
+		return
+	if kind.upper() not in kinds:
+		raise ValueError("Unknown backend '" + str(kind) + "', use one of " + str(kinds))
+	forced[routine] = kind.upper()
+
+# <function using>
+# 	@argument <str kind>, *routine : see force
+#
+# 	@description : with using('PYT'): ... forces the backend inside the block
+@contextmanager
+def using(kind, routine=None):
+	previous = forced.get(routine)
+	force(kind, routine)
+	try:
+		yield
+	finally:
+		force(previous, routine)
+
+
+''' [ Input treatment ] '''
+# <function is_buffer>
+#	@returns <bool> : True if x is a buffer (numpy array, array.array,
+# 		memoryview...) and not a list or a tuple
+def is_buffer(x):
+	if isinstance(x, (list, tuple, int, float)): return False
+	try:
+		memoryview(x)
+	except TypeError:
+		return False
+	return True
+
+# <function size>
+#	@returns <int> : length of x (0 for the objects without length)
+def size(x):
+	try:
+		return len(x)
+	except TypeError:
+		return 0
+
+# <function lists>
+#	@returns <list> : x as a new list (a list of lists for a matrix), the pure
+# 		Python backends modify some of their inputs
+def lists(x):
+	if hasattr(x, 'tolist'): return x.tolist()
+	return [lists(row) if isinstance(row, (list, tuple)) else row for row in x]
+
+# <function output>
+# 	@argument value : result of a backend
+# 	@argument <bool buffers> : True if the inputs were buffers
+#
+#	@returns : numpy array of doubles for buffers (without copies if possible),
+# 		list for lists, tuples element by element
+def output(value, buffers):
+	if isinstance(value, tuple): return tuple(output(v, buffers) for v in value)
+	if isinstance(value, (int, float)): return value
+	if buffers:
+		import numpy as np
+		return np.asarray(value, dtype=float)
+	if hasattr(value, 'tolist'): return value.tolist()
+	return value
+
+
+''' [ Exception treatment ] '''
+class RivpyBackendError(ImportError):
+	def __init__(self, msg = None):
+		if msg == None: msg = "Unknown error encountered"
+		super(RivpyBackendError,self).__init__(msg)
+
+# End of file : registry.py
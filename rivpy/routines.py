@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+
+"""
+rivpy.routines
+	@version : 0.1.0
+
+	@author : Daniel Ríos Linares (c) 2017, hasbornasu@gmail.com
+
+	@description : routines of the library with their backends, the adapters
+		give the same arguments and results to every backend (lists for
+		lists, numpy arrays of doubles for buffers) and the ranks order the
+		backends of each routine by the type and the size of the inputs
+		inside each precision: CPY (without copies of the buffers), PYT,
+		F90, except for the small lists of the CPY modules built by instant
+		(intsm_ue, inttp_ue), whose conversion to numpy arrays costs more
+		than the pure Python loop, so PYT goes first. Most F90 subroutines
+		are single precision (real), the automatic choice must not change
+		the precision of the results, so they only run when no double
+		precision backend is available (or when they are forced),
+		slesv_pt, inpsp_cs and rtf1d_mu keep theirs.
+
+	@license : GPL-3.0
+		This program is free software: you can redistribute it and/or modify
+		it under the terms of the GNU General Public License as published by
+		the Free Software Foundation, either version 3 of the License, or
+		(at your option) any later version.
+
+		This program is distributed in the hope that it will be useful,
+		but WITHOUT ANY WARRANTY; without even the implied warranty of
+		MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+		GNU General Public License for more details.
+
+		You should have received a copy of the GNU General Public License
+		along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from rivpy.registry import Backend, Routine, is_buffer, size, lists, output
+
+''' [ Ranks ] '''
+# <function rank_of>
+#	@returns <function> : rank(*args) with always the same order
+def rank_of(*kinds):
+	return lambda *args: kinds
+
+# <function rank_by>
+# 	@argument <int small> : largest size of the small lists
+#
+#	@returns <function> : rank(*args) of the double precision backends by the
+# 		type and the size of the first argument, PYT before CPY for the small
+# 		lists (without conversions), the single precision F90 always last
+def rank_by(small):
+	def rank(*args):
+		if len(args) > 0 and not is_buffer(args[0]) and size(args[0]) <= small: return ('PYT','CPY','F90')
+		return ('CPY','PYT','F90')
+	return rank
+
+# <function buffers>
+#	@returns <bool> : True if some of the arguments is a buffer
+def buffers(*args):
+	return any(is_buffer(x) for x in args)
+
+# <function check_square>
+# 	@description : raises RivpyMatrixcalcError if C is not square
+def check_square(C):
+	N = size(C)
+	M = size(C[0]) if N > 0 else 0
+	if N != M:
+		raise RivpyMatrixcalcError("Matrix N x M is not invertable, N = " + str(N) + ", M = " + str(M))
+
+# <function matrixcalc>
+#	@returns <function> : function of the backend with its errors of the
+# 		matrices (ValueError of CPY, RivpyMatrixcalcError of PYT) raised as
+# 		rivpy.RivpyMatrixcalcError
+def matrixcalc(function, errors):
+	def run(*args):
+		try:
+			return function(*args)
+		except errors as error:
+			raise RivpyMatrixcalcError(str(error)) from error
+	return run
+
+
+''' [ mxinv_gj ] '''
+def mxinv_gj_CPY(module):
+	return matrixcalc(lambda C: output(module.mxinv_gj(C), is_buffer(C)), ValueError)
+
+def mxinv_gj_F90(module):
+	def mxinv_gj(C):
+		check_square(C)
+		import numpy as np
+		A = module.mxinv_gj(C,len(C))
+		# Without pivoting a zero pivot gives inf or NaN in any element
+		if not np.isfinite(A).all():
+			raise RivpyMatrixcalcError("Singular matrix")
+		return output(A, is_buffer(C))
+	return mxinv_gj
+
+def mxinv_gj_PYT(module):
+	return matrixcalc(lambda C: output(module.mxinv_gj(lists(C)), is_buffer(C)), module.RivpyMatrixcalcError)
+
+mxinv_gj = Routine('mxinv_gj', [
+	Backend('CPY', '(CPY) mxinv_gj', 'mxinv_gj', mxinv_gj_CPY),
+	Backend('F90', '(F90) mxinv_gj', 'mxinv_gj_f90', mxinv_gj_F90),
+	Backend('PYT', '(PYT) mxinv_gj', 'mxinv_gj', mxinv_gj_PYT)],
+	rank_of('CPY','PYT','F90'), "mxinv_gj(C) : inverse of the square matrix C (Gauss-Jordan)")
+
+''' [ solve ] '''
+def solve_CPY(module):
+	def solve(A, B):
+		import numpy as np
+		check_square(A)
+		W = np.ascontiguousarray(A, dtype=float)[None]
+		X = np.array(B, dtype=float)[None]
+		if X.shape[1] != W.shape[1]:
+			raise RivpyMatrixcalcError("Right hand side of " + str(X.shape[1]) + " rows, expected " + str(W.shape[1]))
+		if module.mxinv_gj_solve_batch(W, X, X)[0]:
+			raise RivpyMatrixcalcError("Singular matrix")
+		return output(X[0], buffers(A,B))
+	return solve
+
+def solve_PYT(module):
+	return matrixcalc(lambda A, B: output(module.solve(lists(A), lists(B)), buffers(A,B)), module.RivpyMatrixcalcError)
+
+solve = Routine('solve', [
+	Backend('CPY', '(CPY) mxinv_gj', 'mxinv_gj', solve_CPY),
+	Backend('PYT', '(PYT) mxinv_gj', 'mxinv_gj', solve_PYT)],
+	rank_of('CPY','PYT'), "solve(A, B) : solution X of A X = B (B a vector or N x K matrix)")
+
+''' [ mxinv_gj_batch and solve_batch ] '''
+def mxinv_gj_batch_CPY(module):
+	def mxinv_gj_batch(C):
+		import numpy as np
+		A = np.ascontiguousarray(C, dtype=float)
+		if A.ndim != 3 or A.shape[1] != A.shape[2]:
+			raise RivpyMatrixcalcError("Stack of shape " + str(A.shape) + " is not K x N x N")
+		X = np.empty_like(A)
+		return X, np.frombuffer(module.mxinv_gj_batch(A, X), dtype=bool)
+	return mxinv_gj_batch
+
+def solve_batch_CPY(module):
+	def solve_batch(A, B):
+		import numpy as np
+		W = np.ascontiguousarray(A, dtype=float)
+		X = np.array(B, dtype=float)
+		if W.ndim != 3 or W.shape[1] != W.shape[2] or X.ndim not in (2,3) or X.shape[:2] != W.shape[:2]:
+			raise RivpyMatrixcalcError("Stacks of shape " + str(W.shape) + " and " + str(X.shape) + ", expected K x N x N and K x N (x R)")
+		return X, np.frombuffer(module.mxinv_gj_solve_batch(W, X, X), dtype=bool)
+	return solve_batch
+
+def batch_PYT(name):
+	return lambda module: matrixcalc(getattr(module,name), module.RivpyMatrixcalcError)
+
+mxinv_gj_batch = Routine('mxinv_gj_batch', [
+	Backend('CPY', '(CPY) mxinv_gj', 'mxinv_gj', mxinv_gj_batch_CPY),
+	Backend('PYT', '(PYT) mxinv_gj', 'mxinv_gj', batch_PYT('mxinv_gj_batch'))],
+	rank_of('CPY','PYT'), "mxinv_gj_batch(C) : inverses of a K x N x N stack, (inverses, singular mask)")
+
+solve_batch = Routine('solve_batch', [
+	Backend('CPY', '(CPY) mxinv_gj', 'mxinv_gj', solve_batch_CPY),
+	Backend('PYT', '(PYT) mxinv_gj', 'mxinv_gj', batch_PYT('solve_batch'))],
+	rank_of('CPY','PYT'), "solve_batch(A, B) : solutions of a stack of systems, (solutions, singular mask)")
+
+''' [ slesv_tr and slesv_pt ] '''
+slesv_tr = Routine('slesv_tr', [
+	Backend('CPY', '(CPY) slesv_tr', 'slesv_tr',
+		lambda module: lambda Aupp, Adia, Alow, B: output(module.slesv_tr(Aupp, Adia, Alow, B), buffers(Aupp, Adia, Alow, B))),
+	Backend('F90', '(F90) slesv_tr', 'slesv_tr_f90',
+		lambda module: lambda Aupp, Adia, Alow, B: output(module.slesv_tr(Aupp, Adia, Alow, B, len(Adia)), buffers(Aupp, Adia, Alow, B))),
+	Backend('PYT', '(PYT) slesv_tr', 'slesv_tr',
+		lambda module: lambda Aupp, Adia, Alow, B: output(module.slesv_tr(lists(Aupp), lists(Adia), lists(Alow), lists(B)), buffers(Aupp, Adia, Alow, B)))],
+	rank_of('CPY','PYT','F90'), "slesv_tr(Aupp, Adia, Alow, B) : solution of a tridiagonal system")
+
+slesv_pt = Routine('slesv_pt', [
+	Backend('F90', '(F90) slesv_pt', 'slesv_pt_f90',
+		lambda module: lambda Aupp2, Aupp, Adia, Alow, Alow2, B: output(module.slesv_pt(Aupp2, Aupp, Adia, Alow, Alow2, B, len(Adia)), buffers(Aupp2, Aupp, Adia, Alow, Alow2, B)))],
+	rank_of('F90'), "slesv_pt(Aupp2, Aupp, Adia, Alow, Alow2, B) : solution of a pentadiagonal system")
+
+''' [ inpsp_cs and inpsp_cf ] '''
+def inpsp(name):
+	return lambda module: lambda new_X, X, Y, Ci, Cf: output(getattr(module,name)(new_X, X, Y, Ci, Cf), buffers(new_X, X, Y))
+
+inpsp_cs = Routine('inpsp_cs', [
+	Backend('CPY', '(CPY) inpsp_cX', 'inpsp_cX', inpsp('inpsp_cs')),
+	Backend('F90', '(F90) inpsp_cX', 'inpsp_cX_f90', inpsp('inpsp_cs'))],
+	rank_of('CPY','F90'), "inpsp_cs(new_X, X, Y, M_i, M_f) : cubic spline with the second derivatives at the bounds, (new_Y, A, M)")
+
+inpsp_cf = Routine('inpsp_cf', [
+	Backend('CPY', '(CPY) inpsp_cX', 'inpsp_cX', inpsp('inpsp_cf')),
+	Backend('F90', '(F90) inpsp_cX', 'inpsp_cX_f90', inpsp('inpsp_cf'))],
+	rank_of('CPY','F90'), "inpsp_cf(new_X, X, Y, C_i, C_f) : cubic spline with the first derivatives at the bounds, (new_Y, A, M)")
+
+''' [ intsm_ue and inttp_ue ] '''
+# <function integration_CPY>
+#	@returns <function> : adapter of the modules built by instant (setup.py),
+# 		they are imported from sys.path and require numpy arrays of doubles
+def integration_CPY(name):
+	def adapter(module):
+		import numpy as np
+		function = getattr(module,name)
+		return lambda X, Y: float(function(np.ascontiguousarray(X, dtype=float), np.ascontiguousarray(Y, dtype=float)))
+	return adapter
+
+def integration_F90(name):
+	return lambda module: lambda X, Y: float(getattr(module,name)(X, Y, len(X)))
+
+def integration_PYT(name):
+	return lambda module: lambda X, Y: float(getattr(module,name)(X, Y))
+
+intsm_ue = Routine('intsm_ue', [
+	Backend('CPY', None, 'intsm_ue_c', integration_CPY('intsm_ue')),
+	Backend('F90', '(F90) intsm_ue', 'intsm_ue_f90', integration_F90('intsm_ue')),
+	Backend('PYT', 'intsm_ue', 'intsm_ue', integration_PYT('intsm_ue'))],
+	rank_by(8), "intsm_ue(X, Y) : Simpson integration of Y(X), non-uniform mesh")
+
+inttp_ue = Routine('inttp_ue', [
+	Backend('CPY', None, 'inttp_ue_c', integration_CPY('inttp_ue')),
+	Backend('F90', '(F90) inttp_ue', 'inttp_ue_f90', integration_F90('inttp_ue')),
+	Backend('PYT', 'inttp_ue', 'inttp_ue', integration_PYT('inttp_ue'))],
+	rank_by(8), "inttp_ue(X, Y) : trapezoidal integration of Y(X), non-uniform mesh")
+
+''' [ bvp2o1d1euei_fd1 and bvp2o1d1euec_diffusion ] '''
+def bvp2o1d1euei_fd1_F90(module):
+	def bvp2o1d1euei_fd1(f, X, y0, yf, tol=1e-12, max_iters=10000):
+		Y = [y0 + (yf-y0)/(len(X)-1)*i for i in range(len(X))]
+		return output(module.bvp2o1d1euei_fd1(f, X, Y, tol, max_iters, len(X)), is_buffer(X))
+	return bvp2o1d1euei_fd1
+
+bvp2o1d1euei_fd1 = Routine('bvp2o1d1euei_fd1', [
+	Backend('F90', '(F90) bvp2o1d1euei_fd1', 'bvp2o1d1euei_fd1_f90', bvp2o1d1euei_fd1_F90),
+	Backend('PYT', 'bvp2o1d1euei_fd1', 'bvp2o1d1euei_fd1',
+		lambda module: lambda f, X, y0, yf, tol=1e-12, max_iters=10000: output(module.bvp2o1d1euei_fd1(f, lists(X), y0, yf, tol, max_iters), is_buffer(X)))],
+	rank_of('PYT','F90'), "bvp2o1d1euei_fd1(f, X, y0, yf) : solution of y'' = f(y,x), y(X[0]) = y0, y(X[-1]) = yf")
+
+bvp2o1d1euec_diffusion = Routine('bvp2o1d1euec_diffusion', [
+	Backend('PYT', 'bvp2o1d1euec_diffusion', 'bvp2o1d1euec_diffusion',
+		lambda module: lambda fD, dfDdx, fK, fq, X, y0, yf: output(module.bvp2o1d1euec_diffusion(fD, dfDdx, fK, fq, lists(X), y0, yf), is_buffer(X)))],
+	rank_of('PYT'), "bvp2o1d1euec_diffusion(fD, dfDdx, fK, fq, X, y0, yf) : solution of - d/dx ( D(x) dy/dx ) + K(x) y(x) = q(x)")
+
+''' [ rtf1d_mu ] '''
+# Methods of rtf1d_mu (newtonraphson only uses a as initial guess)
+rtf1d_mu_methods = ('bisection','secant','regulafalsi','ridders','brent','newtonraphson')
+
+def rtf1d_mu_F90(module):
+	def rtf1d_mu(f, a, b=None, method='brent', dfdx=None, tol=1e-14, max_iters=1000):
+		if method not in rtf1d_mu_methods:
+			raise ValueError("Unknown method '" + str(method) + "', use one of " + str(rtf1d_mu_methods))
+		if method == 'newtonraphson':
+			if dfdx == None: dfdx = lambda x: (f(x+1e-7) - f(x-1e-7)) / 2e-7
+			return float(module.newtonraphson(lambda x, i: f(x) if i == 0 else dfdx(x), a, tol, max_iters))
+		if method in ('bisection','regulafalsi') and a > b: a,b = b,a
+		return float(getattr(module,method)(f, a, b, tol, max_iters))
+	return rtf1d_mu
+
+rtf1d_mu = Routine('rtf1d_mu', [
+	Backend('F90', '(F90) rtf1d_mu', 'rtf1d_mu_f90', rtf1d_mu_F90)],
+	rank_of('F90'), "rtf1d_mu(f, a, b, method='brent') : root of f(x) (methods " + ", ".join(rtf1d_mu_methods) + ")")
+
+# Routines of the package
+routines = {routine.name:routine for routine in (mxinv_gj, solve, mxinv_gj_batch, solve_batch,
+	slesv_tr, slesv_pt, inpsp_cs, inpsp_cf, intsm_ue, inttp_ue, bvp2o1d1euei_fd1,
+	bvp2o1d1euec_diffusion, rtf1d_mu)}
+
+
+''' [ Exception treatment ] '''
+class RivpyMatrixcalcError(Exception):
+	def __init__(self, msg = None):
+		if msg == None: msg = "Unknown error encountered"
+		super(RivpyMatrixcalcError,self).__init__(msg)
+
+# End of file : routines.py